@@ -8,6 +8,7 @@ from authlib.integrations.django_client import OAuth
 from urllib.parse import quote_plus, urlencode
 import logging
 from .models import User
+from personal_training.services.engagement import EngagementTracker
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +63,8 @@ def callback(request):
             }
         )
         
+        EngagementTracker().record_login(user.id)
+
         # Store user info in session
         request.session['user'] = {
             'id': str(user.id),
@@ -87,6 +87,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'Skills_backend.wsgi.application'
+ASGI_APPLICATION = 'Skills_backend.asgi.application'
 
 
 # Database
@@ -198,15 +199,161 @@ SESSION_COOKIE_HTTPONLY = True
 
 AUTH0_CALLBACK_URL = "http://localhost:8000/auth/callback/"
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+# Structured (schema-constrained JSON) output needs a Gemini 1.5+ model
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
+GEMINI_STRUCTURED_OUTPUT = os.environ.get("GEMINI_STRUCTURED_OUTPUT", "true").lower() == "true"
 
 LOGIN_URL = '/auth/login/'  # This should match your Auth0 login URL
 
+# Redis shared by the Django cache and the personal_training services (see
+# personal_training/services/redis_pool.py). REDIS_MAX_CONNECTIONS caps each pool: the
+# process-wide sync pool and one asyncio pool per event loop; asyncio callers wait up to
+# REDIS_POOL_TIMEOUT seconds for a free connection
+REDIS_URL = os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/1")
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", 50))
+REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", 5))
+REDIS_POOL_TIMEOUT = float(os.environ.get("REDIS_POOL_TIMEOUT", 5))
+
 CACHES = {
     'default': {
         'BACKEND': 'django_redis.cache.RedisCache',
-        'LOCATION': 'redis://127.0.0.1:6379/1',
+        'LOCATION': REDIS_URL,
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'CONNECTION_POOL_KWARGS': {
+                'max_connections': REDIS_MAX_CONNECTIONS,
+                'socket_timeout': REDIS_SOCKET_TIMEOUT,
+            },
         }
     }
-}   
\ No newline at end of file
+}   
+
+# Channel layer used to push feedback job results over WebSockets
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': [os.environ.get("CHANNEL_LAYER_REDIS_URL", "redis://127.0.0.1:6379/2")],
+        },
+    },
+}
+
+# Quiz feedback fan-out: max concurrent feedback calls per submission and per-answer timeout (seconds)
+QUIZ_FEEDBACK_CONCURRENCY = int(os.environ.get("QUIZ_FEEDBACK_CONCURRENCY", 8))
+QUIZ_FEEDBACK_TIMEOUT = float(os.environ.get("QUIZ_FEEDBACK_TIMEOUT", 20))
+
+# Quiz feedback mode: 'batched' sends all answers of a submission in as few prompts as the
+# token budget allows, 'per_question' sends one prompt per answer
+QUIZ_FEEDBACK_MODE = os.environ.get("QUIZ_FEEDBACK_MODE", "batched")
+QUIZ_FEEDBACK_BATCH_TOKEN_BUDGET = int(os.environ.get("QUIZ_FEEDBACK_BATCH_TOKEN_BUDGET", 6000))
+QUIZ_FEEDBACK_BATCH_TIMEOUT = float(os.environ.get("QUIZ_FEEDBACK_BATCH_TIMEOUT", 60))
+
+# Generated quiz cache: entry TTL, single-flight lock lifetime and how long waiters poll (seconds)
+QUIZ_CACHE_TTL = int(os.environ.get("QUIZ_CACHE_TTL", 60 * 60 * 24))
+QUIZ_CACHE_LOCK_TIMEOUT = int(os.environ.get("QUIZ_CACHE_LOCK_TIMEOUT", 120))
+QUIZ_CACHE_WAIT_TIMEOUT = int(os.environ.get("QUIZ_CACHE_WAIT_TIMEOUT", 90))
+
+# Per-module quiz bank: question mix of banked quizzes, target and low-water sizes per
+# module/difficulty, serves before a quiz is retired and how many recent quizzes a user won't see again
+QUIZ_BANK_QUESTION_TYPES = {'mcq': 5}
+QUIZ_BANK_TARGET_SIZE = int(os.environ.get("QUIZ_BANK_TARGET_SIZE", 10))
+QUIZ_BANK_LOW_WATER_MARK = int(os.environ.get("QUIZ_BANK_LOW_WATER_MARK", 3))
+QUIZ_BANK_MAX_SERVES = int(os.environ.get("QUIZ_BANK_MAX_SERVES", 200))
+QUIZ_BANK_RECENT_WINDOW = int(os.environ.get("QUIZ_BANK_RECENT_WINDOW", 5))
+QUIZ_BANK_REFILL_CONCURRENCY = int(os.environ.get("QUIZ_BANK_REFILL_CONCURRENCY", 3))
+
+# Answer feedback memo: Redis entry TTL (seconds), max entries before LRU eviction and
+# size of the in-process LRU in front of Redis
+FEEDBACK_MEMO_TTL = int(os.environ.get("FEEDBACK_MEMO_TTL", 60 * 60 * 24 * 7))
+FEEDBACK_MEMO_MAX_ENTRIES = int(os.environ.get("FEEDBACK_MEMO_MAX_ENTRIES", 50000))
+FEEDBACK_MEMO_LOCAL_SIZE = int(os.environ.get("FEEDBACK_MEMO_LOCAL_SIZE", 1024))
+
+# Follow-up requests allowed for missing questions when a generated quiz fails validation
+QUIZ_REPAIR_ATTEMPTS = int(os.environ.get("QUIZ_REPAIR_ATTEMPTS", 2))
+
+
+# LLM gateway: max Gemini calls in flight per process, caps per prompt type, and the window (ms)
+# and size for folding single-answer feedback prompts into one batched call (0 disables)
+LLM_GATEWAY_MAX_CONCURRENCY = int(os.environ.get("LLM_GATEWAY_MAX_CONCURRENCY", 12))
+LLM_GATEWAY_TYPE_CONCURRENCY = {'quiz': 4, 'feedback': 8, 'analysis': 2}
+LLM_GATEWAY_BATCH_WINDOW_MS = int(os.environ.get("LLM_GATEWAY_BATCH_WINDOW_MS", 25))
+LLM_GATEWAY_BATCH_MAX_SIZE = int(os.environ.get("LLM_GATEWAY_BATCH_MAX_SIZE", 10))
+
+# Prompt budgets (estimated tokens): whole quiz prompt, answer context inside feedback prompts and
+# JSON payloads in analytics prompts; long module content is split into sections of
+# PROMPT_SECTION_TOKENS and the split is cached per content hash for PROMPT_DIGEST_TTL seconds
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", 8000))
+PROMPT_CONTEXT_TOKEN_BUDGET = int(os.environ.get("PROMPT_CONTEXT_TOKEN_BUDGET", 600))
+PROMPT_PAYLOAD_TOKEN_BUDGET = int(os.environ.get("PROMPT_PAYLOAD_TOKEN_BUDGET", 3000))
+PROMPT_SECTION_TOKENS = int(os.environ.get("PROMPT_SECTION_TOKENS", 400))
+PROMPT_DIGEST_TTL = int(os.environ.get("PROMPT_DIGEST_TTL", 60 * 60 * 24 * 7))
+
+# Gemini resilience: request rate shared by all workers (token bucket), breaker trip threshold
+# (consecutive failures) and cool-down (seconds), per-prompt-type deadlines (seconds), and prompt
+# types that send a hedged duplicate request once a call runs past their recent p95 latency
+GEMINI_RATE_LIMIT_PER_MINUTE = int(os.environ.get("GEMINI_RATE_LIMIT_PER_MINUTE", 300))
+GEMINI_RATE_LIMIT_BURST = int(os.environ.get("GEMINI_RATE_LIMIT_BURST", 20))
+LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("LLM_CIRCUIT_FAILURE_THRESHOLD", 5))
+LLM_CIRCUIT_RESET_TIMEOUT = int(os.environ.get("LLM_CIRCUIT_RESET_TIMEOUT", 30))
+LLM_DEADLINES = {'quiz': 60, 'feedback': 15, 'analysis': 30}
+LLM_DEFAULT_DEADLINE = 30
+LLM_HEDGE_PROMPT_TYPES = ['feedback']
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", 20))
+
+# LLM provider: 'gemini', or 'fake' for the offline stand-in used by load tests. The fake's
+# latency is lognormal around FAKE_LLM_LATENCY_MS; FAKE_LLM_ERROR_RATE of calls fail and
+# FAKE_LLM_HANG_RATE never return
+LLM_PROVIDER = os.environ.get("LLM_PROVIDER", "gemini")
+FAKE_LLM_LATENCY_MS = float(os.environ.get("FAKE_LLM_LATENCY_MS", 800))
+FAKE_LLM_LATENCY_SIGMA = float(os.environ.get("FAKE_LLM_LATENCY_SIGMA", 0.5))
+FAKE_LLM_ERROR_RATE = float(os.environ.get("FAKE_LLM_ERROR_RATE", 0.0))
+FAKE_LLM_HANG_RATE = float(os.environ.get("FAKE_LLM_HANG_RATE", 0.0))
+FAKE_LLM_SEED = int(os.environ["FAKE_LLM_SEED"]) if os.environ.get("FAKE_LLM_SEED") else None
+
+# Background feedback jobs. Web processes only queue jobs in Redis; they are run by
+# `manage.py run_feedback_jobs` worker processes, deployed next to the ASGI server.
+# Jobs run at once per worker process, max queued jobs, how long job status and
+# results stay in Redis (seconds), the lease a worker holds on a running job
+# (seconds; a job whose worker died is queued again once it runs out), runs before
+# a job is failed, and how often an idle worker polls the queue (seconds)
+FEEDBACK_JOB_WORKERS = int(os.environ.get("FEEDBACK_JOB_WORKERS", 4))
+FEEDBACK_JOB_MAX_QUEUE = int(os.environ.get("FEEDBACK_JOB_MAX_QUEUE", 500))
+FEEDBACK_JOB_TTL = int(os.environ.get("FEEDBACK_JOB_TTL", 60 * 60 * 24))
+FEEDBACK_JOB_LEASE = int(os.environ.get("FEEDBACK_JOB_LEASE", 120))
+FEEDBACK_JOB_MAX_ATTEMPTS = int(os.environ.get("FEEDBACK_JOB_MAX_ATTEMPTS", 3))
+FEEDBACK_JOB_POLL_INTERVAL = float(os.environ.get("FEEDBACK_JOB_POLL_INTERVAL", 1.0))
+
+# Adaptive difficulty history: scores kept per user and module, and how long an idle
+# history lives in Redis (seconds)
+QUIZ_HISTORY_WINDOW = int(os.environ.get("QUIZ_HISTORY_WINDOW", 10))
+QUIZ_HISTORY_TTL = int(os.environ.get("QUIZ_HISTORY_TTL", 60 * 60 * 24 * 30))
+
+# Days of per-day completed-item counters kept per learner and course for progress velocity
+PROGRESS_HISTORY_RETENTION_DAYS = int(os.environ.get("PROGRESS_HISTORY_RETENTION_DAYS", 90))
+
+# Engagement scoring: event rates decay with a time constant of ENGAGEMENT_DECAY_DAYS, session
+# length is an EWMA with weight ENGAGEMENT_SESSION_ALPHA, and rates at the targets (per day)
+# earn full marks
+ENGAGEMENT_DECAY_DAYS = float(os.environ.get("ENGAGEMENT_DECAY_DAYS", 7))
+ENGAGEMENT_SESSION_ALPHA = float(os.environ.get("ENGAGEMENT_SESSION_ALPHA", 0.2))
+ENGAGEMENT_LOGIN_TARGET = float(os.environ.get("ENGAGEMENT_LOGIN_TARGET", 1))
+ENGAGEMENT_INTERACTION_TARGET = float(os.environ.get("ENGAGEMENT_INTERACTION_TARGET", 10))
+ENGAGEMENT_TTL = int(os.environ.get("ENGAGEMENT_TTL", 60 * 60 * 24 * 90))
+
+# Cohort analytics: learners loaded and analyzed per chunk
+COHORT_ANALYTICS_CHUNK_SIZE = int(os.environ.get("COHORT_ANALYTICS_CHUNK_SIZE", 5000))
+
+# Learner analytics: Redis TTL of the keys cached in front of the LearnerAnalytics table,
+# and learners recomputed per batch of queries
+LEARNER_ANALYTICS_CACHE_TTL = int(os.environ.get("LEARNER_ANALYTICS_CACHE_TTL", 60 * 60 * 24))
+LEARNER_ANALYTICS_BATCH_SIZE = int(os.environ.get("LEARNER_ANALYTICS_BATCH_SIZE", 1000))
+
+# Performance feedback: lifetime of generated feedback cached per data version
+PERFORMANCE_FEEDBACK_CACHE_TTL = int(os.environ.get("PERFORMANCE_FEEDBACK_CACHE_TTL", 60 * 60 * 24 * 7))
+# Most recent metrics and quiz attempts (each) read into a performance feedback prompt
+PERFORMANCE_HISTORY_MAX_EVENTS = int(os.environ.get("PERFORMANCE_HISTORY_MAX_EVENTS", 200))
+
+# Feedback retrieval: default and maximum page sizes, and rows per batch when streaming exports
+FEEDBACK_PAGE_SIZE = int(os.environ.get("FEEDBACK_PAGE_SIZE", 50))
+FEEDBACK_PAGE_MAX_SIZE = int(os.environ.get("FEEDBACK_PAGE_MAX_SIZE", 200))
+FEEDBACK_EXPORT_CHUNK_SIZE = int(os.environ.get("FEEDBACK_EXPORT_CHUNK_SIZE", 1000))
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PersonalTrainingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'personal_training'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,25 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .services.feedback_jobs import FeedbackJobService
+
+
+class FeedbackJobConsumer(AsyncJsonWebsocketConsumer):
+    """Pushes the signed-in user's feedback job results as they finish"""
+
+    async def connect(self):
+        session = self.scope.get('session')
+        session_user = await session.aget('user') if session is not None else None
+        if not session_user:
+            await self.close()
+            return
+
+        self.group_name = FeedbackJobService.group_name(session_user['id'])
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def feedback_job(self, event):
+        await self.send_json(event['job'])
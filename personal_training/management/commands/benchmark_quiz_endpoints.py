@@ -0,0 +1,307 @@
+import asyncio
+import json
+import math
+import subprocess
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from asgiref.sync import SyncToAsync
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.urls import reverse
+
+from personal_training.services.quiz_store import QuizStore
+
+SCENARIOS = ['generate_quiz', 'validate_answer', 'evaluate_quiz']
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the quiz endpoints through the ASGI app against the offline LLM stand-in "
+        "and report latency percentiles, throughput and thread-pool saturation. "
+        "Runs against a test database, so the quizzes it stores never reach the configured one"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                            help="Endpoint to benchmark (repeatable, defaults to all)")
+        parser.add_argument('--requests', type=int, default=300, help="Requests per scenario")
+        parser.add_argument('--concurrency', type=int, default=100, help="Requests in flight at once")
+        parser.add_argument('--provider', default='fake', choices=['fake', 'gemini'],
+                            help="LLM provider to run against (gemini uses real quota)")
+        parser.add_argument('--latency-ms', type=float, help="Override FAKE_LLM_LATENCY_MS")
+        parser.add_argument('--error-rate', type=float, help="Override FAKE_LLM_ERROR_RATE")
+        parser.add_argument('--rate-limit', type=int, default=1_000_000,
+                            help="GEMINI_RATE_LIMIT_PER_MINUTE during the run")
+        parser.add_argument('--cache-hits', action='store_true',
+                            help="Repeat identical payloads so quiz cache and feedback memo hit")
+        parser.add_argument('--keepdb', action='store_true',
+                            help="Reuse the test database between runs instead of creating it each time")
+        parser.add_argument('--output', help="Results file (defaults to benchmark-results/<commit>.json)")
+        parser.add_argument('--compare', help="Earlier results file to print deltas against")
+
+    def handle(self, *args, **options):
+        overrides = {
+            'LLM_PROVIDER': options['provider'],
+            'GEMINI_RATE_LIMIT_PER_MINUTE': options['rate_limit'],
+            'GEMINI_RATE_LIMIT_BURST': options['rate_limit'],
+            # Requests are sent in-process with this Host header, whatever DEBUG is
+            'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'localhost'],
+        }
+        if options['latency_ms'] is not None:
+            overrides['FAKE_LLM_LATENCY_MS'] = options['latency_ms']
+        if options['error_rate'] is not None:
+            overrides['FAKE_LLM_ERROR_RATE'] = options['error_rate']
+
+        scenarios = options['scenario'] or SCENARIOS
+        # The quizzes and attempts every run writes go to a throwaway test database
+        databases = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            with override_settings(**overrides):
+                config = {
+                    'provider': settings.LLM_PROVIDER,
+                    'fake_latency_ms': getattr(settings, 'FAKE_LLM_LATENCY_MS', None),
+                    'fake_error_rate': getattr(settings, 'FAKE_LLM_ERROR_RATE', None),
+                    'requests': options['requests'],
+                    'concurrency': options['concurrency'],
+                    'cache_hits': options['cache_hits'],
+                    'quiz_feedback_mode': getattr(settings, 'QUIZ_FEEDBACK_MODE', None),
+                }
+                results = asyncio.run(self._run(scenarios, options))
+        finally:
+            teardown_databases(databases, verbosity=0, keepdb=options['keepdb'])
+
+        commit, dirty = self._git_revision()
+        report = {
+            'commit': commit,
+            'dirty': dirty,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'config': config,
+            'scenarios': results,
+        }
+
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name}: {stats['requests']} requests, {stats['errors']} errors, "
+                f"p50 {stats['p50_ms']:.0f}ms, p95 {stats['p95_ms']:.0f}ms, p99 {stats['p99_ms']:.0f}ms, "
+                f"{stats['throughput_rps']:.1f} req/s, peak threads {stats['peak_threads']}, "
+                f"peak executor queue {stats['peak_executor_queue']}"
+            )
+
+        output = Path(options['output'] or f"benchmark-results/{commit[:12]}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Wrote results to {output}"))
+
+        if options['compare']:
+            self._print_comparison(json.loads(Path(options['compare']).read_text()), report)
+
+    async def _run(self, scenarios: List[str], options: Dict) -> Dict[str, Dict]:
+        app = get_asgi_application()
+        run_id = 'bench' if options['cache_hits'] else uuid.uuid4().hex[:8]
+        results = {}
+        for scenario in scenarios:
+            path = reverse(f'personal_training:{scenario}')
+            payloads = [
+                json.dumps(await getattr(self, f'_{scenario}_payload')(run_id, 0 if options['cache_hits'] else index))
+                for index in range(options['requests'])
+            ]
+            results[scenario] = await self._drive(app, path, payloads, options['concurrency'])
+        return results
+
+    async def _drive(self, app, path: str, payloads: List[str], concurrency: int) -> Dict:
+        """Send every payload with at most concurrency requests in flight and summarise the run"""
+        semaphore = asyncio.Semaphore(concurrency)
+        sampler = _SaturationSampler()
+        sampler_task = asyncio.create_task(sampler.run())
+
+        async def _one(body: str) -> Tuple[int, float]:
+            async with semaphore:
+                started = time.perf_counter()
+                status = await _asgi_post(app, path, body.encode('utf-8'))
+                return status, time.perf_counter() - started
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(_one(body) for body in payloads))
+        elapsed = time.perf_counter() - started
+        sampler_task.cancel()
+
+        latencies = sorted(duration for _, duration in outcomes)
+        return {
+            'requests': len(outcomes),
+            'errors': sum(1 for status, _ in outcomes if status >= 400),
+            'p50_ms': _percentile(latencies, 50) * 1000,
+            'p95_ms': _percentile(latencies, 95) * 1000,
+            'p99_ms': _percentile(latencies, 99) * 1000,
+            'max_ms': latencies[-1] * 1000 if latencies else 0.0,
+            'throughput_rps': len(outcomes) / elapsed if elapsed else 0.0,
+            'elapsed_s': elapsed,
+            **sampler.summary(),
+        }
+
+    async def _generate_quiz_payload(self, run_id: str, index: int) -> Dict:
+        return {
+            'course_content': f"Benchmark module {run_id}-{index}\n\n"
+                              + "Cells convert nutrients into energy through respiration. " * 40,
+            'difficulty': 'intermediate'
+        }
+
+    async def _validate_answer_payload(self, run_id: str, index: int) -> Dict:
+        return {
+            'question_type': 'scenario',
+            'answer': f"I would escalate the issue to my manager ({run_id}-{index})",
+            'correct_answer': "Document the incident and follow the reporting procedure",
+            'context': "A colleague reports a data breach on a Friday evening."
+        }
+
+    async def _evaluate_quiz_payload(self, run_id: str, index: int) -> Dict:
+        questions = [
+            {
+                'question_text': f"Benchmark question {number} ({run_id}-{index})?",
+                'question_type': 'mcq',
+                'difficulty_level': 'intermediate',
+                'explanation': "Explanation",
+                'choices': [
+                    {'choice_text': f"Option {letter}", 'is_correct': letter == 'A'} for letter in 'ABCD'
+                ]
+            }
+            for number in range(5)
+        ] + [
+            {
+                'question_text': f"Benchmark scenario {number} ({run_id}-{index})?",
+                'question_type': 'scenario',
+                'difficulty_level': 'intermediate',
+                'scenario_context': "A customer escalates a delayed order.",
+                'model_answer': "Acknowledge, investigate and follow up",
+                'explanation': "Explanation"
+            }
+            for number in range(2)
+        ]
+        # Stored before the timed run, as generate_quiz would have done
+        quiz_store = QuizStore()
+        quiz = await quiz_store.save_quiz({'questions': questions}, difficulty='intermediate')
+        stored_questions = await quiz_store.load_questions(quiz.id)
+
+        # Three correct MCQs, two incorrect MCQs and two open answers needing model feedback
+        chosen = [0, 0, 0, 1, 2]
+        answers = [
+            {'question_id': question.id, 'choice_id': list(question.choices.all())[choice_index].id}
+            for question, choice_index in zip(stored_questions, chosen)
+        ] + [
+            {'question_id': question.id, 'answer': f"Apologise and follow up ({run_id}-{index}-{number})"}
+            for number, question in enumerate(stored_questions[len(chosen):])
+        ]
+        return {'quiz_id': quiz.id, 'answers': answers}
+
+    def _git_revision(self) -> Tuple[str, bool]:
+        try:
+            commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                                    text=True, check=True, cwd=settings.BASE_DIR).stdout.strip()
+            dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                        capture_output=True, text=True, cwd=settings.BASE_DIR).stdout.strip())
+            return commit, dirty
+        except (OSError, subprocess.CalledProcessError):
+            return 'unknown', False
+
+    def _print_comparison(self, baseline: Dict, report: Dict) -> None:
+        if baseline.get('config') != report['config']:
+            self.stdout.write(self.style.WARNING("Benchmark configurations differ; deltas may not be comparable"))
+        self.stdout.write(f"Compared with {baseline.get('commit', 'unknown')[:12]}:")
+        for name, stats in report['scenarios'].items():
+            previous = baseline.get('scenarios', {}).get(name)
+            if not previous:
+                continue
+            deltas = ", ".join(
+                f"{metric} {stats[metric] - previous[metric]:+.1f} ({_relative(previous[metric], stats[metric])})"
+                for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps')
+            )
+            self.stdout.write(f"{name}: {deltas}")
+
+
+class _SaturationSampler:
+    """Samples thread count and queued sync_to_async work while a scenario runs"""
+
+    INTERVAL = 0.005
+
+    def __init__(self):
+        self.peak_threads = threading.active_count()
+        self.peak_queue = 0
+        self.queue_samples = []
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            queued = SyncToAsync.single_thread_executor._work_queue.qsize()
+            default_executor = getattr(loop, '_default_executor', None)
+            if default_executor is not None:
+                queued += default_executor._work_queue.qsize()
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            self.peak_queue = max(self.peak_queue, queued)
+            self.queue_samples.append(queued)
+            await asyncio.sleep(self.INTERVAL)
+
+    def summary(self) -> Dict:
+        return {
+            'peak_threads': self.peak_threads,
+            'peak_executor_queue': self.peak_queue,
+            'mean_executor_queue': sum(self.queue_samples) / len(self.queue_samples) if self.queue_samples else 0.0,
+        }
+
+
+async def _asgi_post(app, path: str, body: bytes) -> int:
+    """POST body to the ASGI app in-process and return the response status"""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'POST',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode('utf-8'),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [
+            (b'host', b'localhost'),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('ascii')),
+        ],
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+    request_sent = False
+    status = 0
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        # The client never disconnects; the handler stops listening once it has responded
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    if not status:
+        raise CommandError(f"No response from {path}")
+    return status
+
+
+def _percentile(ordered: List[float], percentile: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(len(ordered) * percentile / 100) - 1)]
+
+
+def _relative(previous: float, current: float) -> str:
+    return f"{(current - previous) / previous * 100:+.1f}%" if previous else "n/a"
@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from personal_training.models import Course
+from personal_training.services.cohort_analytics import CohortAnalytics, learner_rows
+
+
+class Command(BaseCommand):
+    help = "Compute learning analytics for every learner of a course in vectorized chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id', type=int)
+        parser.add_argument('--timeframe-days', type=int, default=30,
+                            help="Days of completed items reported as timeframe progress (default 30)")
+        parser.add_argument('--chunk-size', type=int,
+                            help="Learners loaded per chunk (default COHORT_ANALYTICS_CHUNK_SIZE)")
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Processes to spread chunks over (default 1, in process)")
+        parser.add_argument('--output', help="Write the summary and per-learner results to this JSON file")
+
+    def handle(self, *args, **options):
+        if not Course.objects.filter(id=options['course_id']).exists():
+            raise CommandError(f"Course {options['course_id']} does not exist")
+        if options['timeframe_days'] < 1:
+            raise CommandError("--timeframe-days must be at least 1")
+
+        result = CohortAnalytics(
+            options['course_id'], options['timeframe_days'], options['chunk_size']
+        ).run(workers=max(options['workers'], 1))
+        summary = result['summary']
+
+        self.stdout.write(json.dumps(summary, indent=2))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({
+                    'course_id': result['course_id'],
+                    'timeframe_days': result['timeframe_days'],
+                    'summary': summary,
+                    'learners': learner_rows(result),
+                }, output)
+            self.stdout.write(f"Wrote per-learner results to {options['output']}")
+        self.stdout.write(self.style.SUCCESS(f"Analyzed {summary['learners']} learners"))
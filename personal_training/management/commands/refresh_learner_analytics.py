@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_datetime
+
+from personal_training.services.learner_analytics import LearnerAnalyticsStore
+
+
+class Command(BaseCommand):
+    help = "Refresh LearnerAnalytics rows whose source data changed and warm their Redis keys"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, help="Only refresh and warm this course")
+        parser.add_argument('--since', type=parse_datetime,
+                            help="Refresh pairs changed since this ISO datetime (default: the last successful run)")
+        parser.add_argument('--full', action='store_true', help="Recompute every learner and course")
+        parser.add_argument('--warm', action='store_true',
+                            help="Afterwards write every stored row to Redis, e.g. after a flush")
+
+    def handle(self, *args, **options):
+        store = LearnerAnalyticsStore()
+
+        refreshed = store.refresh_changed(options['since'], options['course'], full=options['full'])
+        self.stdout.write(f"Refreshed {refreshed} learner analytics rows")
+
+        if options['warm']:
+            self.stdout.write(f"Cached {store.warm(options['course'])} learner analytics rows")
+        self.stdout.write(self.style.SUCCESS("Learner analytics up to date"))
@@ -0,0 +1,31 @@
+import asyncio
+import signal
+
+from django.core.management.base import BaseCommand
+
+from personal_training.services.feedback_jobs import FeedbackJobWorker
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the feedback jobs queued by the web processes until SIGINT or SIGTERM, "
+        "then finish the running ones. Run at least one of these next to the ASGI server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int,
+                            help="Jobs run at once by this process (default: FEEDBACK_JOB_WORKERS)")
+
+    def handle(self, *args, **options):
+        worker = FeedbackJobWorker(options['concurrency'])
+        self.stdout.write(f"Running feedback jobs, {worker.concurrency} at a time")
+        asyncio.run(self._run(worker))
+        self.stdout.write(self.style.SUCCESS("Feedback job worker stopped"))
+
+    @staticmethod
+    async def _run(worker: FeedbackJobWorker) -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        await worker.run(stop)
@@ -0,0 +1,29 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from personal_training.services.quiz_bank import QuizBankService
+
+
+class Command(BaseCommand):
+    help = "Pre-generate quiz bank entries for every published module of a course"
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id', type=int)
+        parser.add_argument(
+            '--difficulty',
+            action='append',
+            choices=QuizBankService.DIFFICULTIES,
+            help="Difficulty to warm (repeatable, defaults to all)"
+        )
+
+    def handle(self, *args, **options):
+        results = asyncio.run(
+            QuizBankService().warm_course(options['course_id'], options['difficulty'])
+        )
+
+        for bank, added in results.items():
+            self.stdout.write(f"{bank}: added {added} quizzes")
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {len(results)} quiz banks with {sum(results.values())} quizzes"
+        ))
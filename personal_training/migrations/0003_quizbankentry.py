@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personal_training', '0002_userfeedback_performancemetric_learningactivity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizBankEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('difficulty', models.CharField(choices=[('beginner', 'Beginner'), ('intermediate', 'Intermediate'), ('advanced', 'Advanced')], max_length=20)),
+                ('question_types', models.JSONField(default=dict)),
+                ('quiz_data', models.JSONField()),
+                ('prompt_version', models.PositiveIntegerField(default=1)),
+                ('times_served', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_bank_entries', to='personal_training.module')),
+            ],
+            options={
+                'verbose_name_plural': 'Quiz Bank Entries',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['module', 'difficulty'], name='personal_tr_module__be012c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:40
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Oauth', '0002_user_age_user_specialization'),
+        ('personal_training', '0003_quizbankentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Question',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveIntegerField()),
+                ('question_type', models.CharField(choices=[('mcq', 'Multiple Choice'), ('scenario', 'Scenario'), ('application', 'Application'), ('reflection', 'Reflection'), ('discussion', 'Discussion')], max_length=20)),
+                ('question_text', models.TextField()),
+                ('difficulty_level', models.CharField(blank=True, max_length=20)),
+                ('scenario_context', models.TextField(blank=True)),
+                ('model_answer', models.TextField(blank=True)),
+                ('explanation', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['quiz', 'order'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Choice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveIntegerField()),
+                ('choice_text', models.TextField()),
+                ('is_correct', models.BooleanField(default=False)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='choices', to='personal_training.question')),
+            ],
+            options={
+                'ordering': ['question', 'order'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Quiz',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('difficulty', models.CharField(blank=True, max_length=20)),
+                ('fingerprint', models.CharField(max_length=64, unique=True)),
+                ('prompt_version', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('module', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='quizzes', to='personal_training.module')),
+            ],
+            options={
+                'verbose_name_plural': 'Quizzes',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='quiz',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='personal_training.quiz'),
+        ),
+        migrations.CreateModel(
+            name='QuizAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(default=0, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('correct_answers', models.PositiveIntegerField(default=0)),
+                ('total_questions', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='personal_training.quiz')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='quiz_attempts', to='Oauth.user')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='QuizAttemptAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answer_text', models.TextField(blank=True)),
+                ('is_correct', models.BooleanField(null=True)),
+                ('feedback', models.JSONField(default=dict)),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='personal_training.quizattempt')),
+                ('choice', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attempt_answers', to='personal_training.choice')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_answers', to='personal_training.question')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='question',
+            unique_together={('quiz', 'order')},
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['user', 'created_at'], name='personal_tr_user_id_b8a9d3_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='quizattemptanswer',
+            unique_together={('attempt', 'question')},
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Oauth', '0002_user_age_user_specialization'),
+        ('personal_training', '0004_quiz_attempts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LearnerAnalytics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_items', models.PositiveIntegerField(default=0)),
+                ('total_items', models.PositiveIntegerField(default=0)),
+                ('topic_performance', models.JSONField(default=dict)),
+                ('learning_patterns', models.JSONField(default=dict)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='learner_analytics', to='personal_training.course')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='learner_analytics', to='Oauth.user')),
+            ],
+            options={
+                'verbose_name_plural': 'Learner Analytics',
+                'indexes': [models.Index(fields=['refreshed_at'], name='personal_tr_refresh_6242e9_idx')],
+                'unique_together': {('user', 'course')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Oauth', '0002_user_age_user_specialization'),
+        ('personal_training', '0005_learneranalytics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userfeedback',
+            name='quiz_feedback',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddIndex(
+            model_name='userfeedback',
+            index=models.Index(fields=['updated_at', 'id'], name='personal_tr_updated_63ec81_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userfeedback',
+            index=models.Index(fields=['course', 'updated_at', 'id'], name='personal_tr_course__e5cc11_idx'),
+        ),
+    ]
@@ -187,6 +187,9 @@ class UserFeedback(models.Model):
     total_time_spent = models.PositiveIntegerField(default=0)  # Time in minutes
     login_frequency = models.PositiveIntegerField(default=0)  # Logins per week
     
+    # Course delivery, platform and learning experience feedback (FeedbackModule)
+    quiz_feedback = models.JSONField(default=dict)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -194,6 +197,11 @@ class UserFeedback(models.Model):
     class Meta:
         ordering = ['-updated_at']
         unique_together = ['user', 'course', 'module']
+        indexes = [
+            # Keyset pagination and date range retrieval, overall and per course
+            models.Index(fields=['updated_at', 'id']),
+            models.Index(fields=['course', 'updated_at', 'id'])
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.course.title} Feedback"
@@ -225,4 +233,148 @@ class LearningActivity(models.Model):
         verbose_name_plural = "Learning Activities"
 
     def __str__(self):
-        return f"{self.user_feedback.user.email} - {self.activity_type}"
\ No newline at end of file
+        return f"{self.user_feedback.user.email} - {self.activity_type}"
+
+class QuizBankEntry(models.Model):
+    """Pre-generated quiz stored per module and difficulty for fast serving"""
+    DIFFICULTY_CHOICES = [
+        ('beginner', 'Beginner'),
+        ('intermediate', 'Intermediate'),
+        ('advanced', 'Advanced')
+    ]
+
+    module = models.ForeignKey(Module, related_name='quiz_bank_entries', on_delete=models.CASCADE)
+    difficulty = models.CharField(max_length=20, choices=DIFFICULTY_CHOICES)
+    question_types = models.JSONField(default=dict)  # e.g. {'mcq': 5}
+    quiz_data = models.JSONField()
+    prompt_version = models.PositiveIntegerField(default=1)
+    times_served = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = "Quiz Bank Entries"
+        indexes = [
+            models.Index(fields=['module', 'difficulty'])
+        ]
+
+    def __str__(self):
+        return f"{self.module.title} - {self.difficulty} quiz #{self.id}"
+
+
+class Quiz(models.Model):
+    """Generated quiz stored once so submissions can reference it by id"""
+    DIFFICULTY_CHOICES = QuizBankEntry.DIFFICULTY_CHOICES
+
+    module = models.ForeignKey(Module, related_name='quizzes', null=True, blank=True, on_delete=models.SET_NULL)
+    difficulty = models.CharField(max_length=20, blank=True)
+    fingerprint = models.CharField(max_length=64, unique=True)  # SHA-256 of the questions, dedupes identical quizzes
+    prompt_version = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = "Quizzes"
+
+    def __str__(self):
+        return f"Quiz #{self.id} ({self.difficulty})"
+
+
+class Question(models.Model):
+    """A single quiz question; answer keys never leave the server"""
+    QUESTION_TYPES = [
+        ('mcq', 'Multiple Choice'),
+        ('scenario', 'Scenario'),
+        ('application', 'Application'),
+        ('reflection', 'Reflection'),
+        ('discussion', 'Discussion')
+    ]
+
+    quiz = models.ForeignKey(Quiz, related_name='questions', on_delete=models.CASCADE)
+    order = models.PositiveIntegerField()
+    question_type = models.CharField(max_length=20, choices=QUESTION_TYPES)
+    question_text = models.TextField()
+    difficulty_level = models.CharField(max_length=20, blank=True)
+    scenario_context = models.TextField(blank=True)
+    model_answer = models.TextField(blank=True)
+    explanation = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['quiz', 'order']
+        unique_together = ['quiz', 'order']
+
+    def __str__(self):
+        return f"Quiz #{self.quiz_id} Q{self.order + 1}"
+
+
+class Choice(models.Model):
+    """Answer option of a multiple choice question"""
+    question = models.ForeignKey(Question, related_name='choices', on_delete=models.CASCADE)
+    order = models.PositiveIntegerField()
+    choice_text = models.TextField()
+    is_correct = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['question', 'order']
+
+    def __str__(self):
+        return self.choice_text
+
+
+class QuizAttempt(models.Model):
+    """A graded quiz submission"""
+    quiz = models.ForeignKey(Quiz, related_name='attempts', on_delete=models.CASCADE)
+    user = models.ForeignKey('Oauth.User', related_name='quiz_attempts', null=True, blank=True, on_delete=models.SET_NULL)
+    score = models.FloatField(
+        default=0,
+        validators=[MinValueValidator(0), MaxValueValidator(100)]
+    )
+    correct_answers = models.PositiveIntegerField(default=0)
+    total_questions = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'])
+        ]
+
+    def __str__(self):
+        return f"Attempt #{self.id} on quiz #{self.quiz_id}"
+
+
+class QuizAttemptAnswer(models.Model):
+    """One answer of a quiz attempt, written in bulk with the attempt"""
+    attempt = models.ForeignKey(QuizAttempt, related_name='answers', on_delete=models.CASCADE)
+    question = models.ForeignKey(Question, related_name='attempt_answers', on_delete=models.CASCADE)
+    choice = models.ForeignKey(Choice, related_name='attempt_answers', null=True, blank=True, on_delete=models.SET_NULL)
+    answer_text = models.TextField(blank=True)
+    is_correct = models.BooleanField(null=True)  # None for open-ended questions
+    feedback = models.JSONField(default=dict)
+
+    class Meta:
+        unique_together = ['attempt', 'question']
+
+    def __str__(self):
+        return f"Attempt #{self.attempt_id} answer to question #{self.question_id}"
+
+
+class LearnerAnalytics(models.Model):
+    """Materialized analytics per learner and course, cached in Redis by LearnerAnalyticsStore"""
+    user = models.ForeignKey('Oauth.User', related_name='learner_analytics', on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, related_name='learner_analytics', on_delete=models.CASCADE)
+    completed_items = models.PositiveIntegerField(default=0)  # Completed modules
+    total_items = models.PositiveIntegerField(default=0)  # Modules in the course
+    topic_performance = models.JSONField(default=dict)  # Module title -> average quiz score
+    learning_patterns = models.JSONField(default=dict)  # {'content_type_engagement': {content type: minutes}}
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'course']
+        verbose_name_plural = "Learner Analytics"
+        indexes = [
+            models.Index(fields=['refreshed_at'])
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} - {self.course.title} Analytics"
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from . import consumers
+
+websocket_urlpatterns = [
+    path('ws/personal_training/feedback-jobs/', consumers.FeedbackJobConsumer.as_asgi()),
+]
@@ -1,20 +1,38 @@
-import google.generativeai as genai
-from django.conf import settings
-from typing import Dict, List, Optional
 import json
-import os
-from asgiref.sync import sync_to_async
-from django.core.cache import cache
 from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from django.conf import settings
+from django.db.models import Avg, Count
+from django.utils import timezone
+from personal_training.models import PerformanceMetric, QuizAttempt
+from .llm_gateway import get_llm_gateway
+from .feedback_memo import FeedbackMemo
+from .prompt_builder import PromptBuilder, compact_json
+from .learner_snapshot import LearnerSnapshot, LearnerSnapshotLoader
+from .performance_feedback_cache import PerformanceFeedbackCache
+from .redis_pool import get_async_redis
 
 class QuizFeedbackModule:
     """Module for handling comprehensive learning feedback and analytics"""
+
+    # Performance feedback time period -> days of history it covers (None: all of it)
+    TIME_PERIODS = {
+        'last_week': 7,
+        'last_month': 30,
+        'last_quarter': 90,
+        'last_year': 365,
+        'all_time': None,
+    }
     
     def __init__(self):
-        # Initialize Gemini AI for generating personalized feedback
-        api_key = os.getenv('GEMINI_API_KEY') or settings.GEMINI_API_KEY
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        # Shared gateway queueing every Gemini call in the process
+        self.llm = get_llm_gateway()
+        self.feedback_memo = FeedbackMemo('answer')
+        self.prompt_builder = PromptBuilder()
+        self.snapshot_loader = LearnerSnapshotLoader()
+        self.payload_token_budget = getattr(settings, 'PROMPT_PAYLOAD_TOKEN_BUDGET', 3000)
+        self.context_token_budget = getattr(settings, 'PROMPT_CONTEXT_TOKEN_BUDGET', 600)
+        self.history_limit = getattr(settings, 'PERFORMANCE_HISTORY_MAX_EVENTS', 200)
 
     async def generate_quiz_feedback(
         self, 
@@ -44,7 +62,7 @@ class QuizFeedbackModule:
             
             Score: {score_percentage}%
             Correct Answers: {correct_answers}/{total_questions}
-            Question Performance: {json.dumps(quiz_results['answers'], indent=2)}
+            Question Performance: {compact_json(quiz_results['answers'], self.payload_token_budget)}
             
             Provide feedback in this JSON format:
             {{
@@ -57,12 +75,11 @@ class QuizFeedbackModule:
             }}
             """
             
-            response = await sync_to_async(self.model.generate_content)(prompt)
-            feedback = json.loads(response.text)
+            feedback = await self.llm.generate_json(prompt, 'analysis')
             
             # Cache the feedback for future reference
             cache_key = f"quiz_feedback:{user_id}:{module_id}"
-            cache.set(cache_key, feedback, timeout=60*60*24)  # 24 hours
+            await get_async_redis().set(cache_key, json.dumps(feedback), ex=60*60*24)  # 24 hours
             
             return feedback
             
@@ -90,11 +107,22 @@ class QuizFeedbackModule:
             question_type: Type of question (mcq, scenario, etc.)
         """
         try:
+            # Learners who give the same answer to the same question get the same feedback
+            memo_key = self.feedback_memo.make_key(
+                f"{question_context}\x1f{correct_answer}", user_answer, question_type
+            )
+            memoized = await self.feedback_memo.aget(memo_key, question_type)
+            if memoized is not None:
+                return memoized
+
+            context = await self.prompt_builder.afit_content(
+                question_context, self.context_token_budget, query=correct_answer
+            )
             prompt = f"""
             Analyze this answer and provide detailed feedback:
             
             Question Type: {question_type}
-            Context: {question_context}
+            Context: {context}
             Correct Answer: {correct_answer}
             User's Answer: {user_answer}
             
@@ -108,8 +136,9 @@ class QuizFeedbackModule:
             }}
             """
             
-            response = await sync_to_async(self.model.generate_content)(prompt)
-            return json.loads(response.text)
+            feedback = await self.llm.generate_json(prompt, 'feedback')
+            await self.feedback_memo.aset(memo_key, feedback)
+            return feedback
             
         except Exception as e:
             return {
@@ -129,18 +158,27 @@ class QuizFeedbackModule:
         Args:
             user_id: The ID of the user
             module_id: The module ID
-            time_period: Time period for analysis ("last_week", "last_month", etc.)
+            time_period: One of TIME_PERIODS
         """
         try:
-            # Fetch historical performance data
-            cache_key = f"performance_history:{user_id}:{module_id}"
-            performance_history = cache.get(cache_key, {})
-            
+            since = self._period_start(time_period)
+            # The window start is part of the cache key, so cached feedback slides with it daily
+            period_key = f"{time_period}:{since.date()}" if since else time_period
+
+            # Served from cache until a new metric or quiz result bumps the data version
+            feedback_cache = PerformanceFeedbackCache()
+            version, cached = await feedback_cache.get(user_id, module_id, period_key)
+            if cached is not None:
+                return cached
+
+            performance_history = await self._performance_history(user_id, module_id, since)
+
             prompt = f"""
             Analyze this learning performance history and provide insights:
             
-            Performance History: {json.dumps(performance_history, indent=2)}
             Time Period: {time_period}
+            Summary: {compact_json(performance_history['summary'])}
+            Performance History (newest first): {compact_json(performance_history['events'], self.payload_token_budget)}
             
             Provide analysis in this JSON format:
             {{
@@ -153,8 +191,9 @@ class QuizFeedbackModule:
             }}
             """
             
-            response = await sync_to_async(self.model.generate_content)(prompt)
-            return json.loads(response.text)
+            feedback = await self.llm.generate_json(prompt, 'analysis')
+            await feedback_cache.set(user_id, module_id, period_key, version, feedback)
+            return feedback
             
         except Exception as e:
             return {
@@ -177,18 +216,11 @@ class QuizFeedbackModule:
             timeframe_days: Number of days to analyze
         """
         try:
-            # Calculate key metrics
-            completion_rate = self._calculate_completion_rate(user_id, course_id)
-            engagement_score = self._calculate_engagement_score(user_id, course_id)
-            progress_velocity = self._calculate_progress_velocity(user_id, course_id)
-            
+            # Every cached value the analysis needs, in one round trip
+            snapshot = self.snapshot_loader.load(user_id, course_id, progress_days=max(timeframe_days, 7))
             return {
-                "completion_rate": completion_rate,
-                "engagement_score": engagement_score,
-                "progress_velocity": progress_velocity,
-                "learning_style": self._determine_learning_style(user_id),
-                "strength_areas": self._identify_strength_areas(user_id, course_id),
-                "challenge_areas": self._identify_challenge_areas(user_id, course_id)
+                **self._learning_metrics(snapshot),
+                "timeframe_progress": self._calculate_progress_total(snapshot, timeframe_days)
             }
             
         except Exception as e:
@@ -213,12 +245,14 @@ class QuizFeedbackModule:
         """
         try:
             # Gather user's learning data
-            performance_data = self._gather_performance_data(user_id, course_id, module_id)
+            performance_data = self._gather_performance_data(
+                await self.snapshot_loader.aload(user_id, course_id, module_id)
+            )
             
             prompt = f"""
             Generate personalized improvement suggestions based on this data:
             
-            Performance Data: {json.dumps(performance_data, indent=2)}
+            Performance Data: {compact_json(performance_data, self.payload_token_budget)}
             
             Provide suggestions in this JSON format:
             {{
@@ -230,8 +264,7 @@ class QuizFeedbackModule:
             }}
             """
             
-            response = await sync_to_async(self.model.generate_content)(prompt)
-            return json.loads(response.text)
+            return await self.llm.generate_json(prompt, 'analysis')
             
         except Exception as e:
             return {
@@ -240,68 +273,87 @@ class QuizFeedbackModule:
             }
 
     # Helper methods
-    def _calculate_completion_rate(self, user_id: int, course_id: int) -> float:
+    def _period_start(self, time_period: str) -> Optional[datetime]:
+        """Start of the time period's window (midnight, local time), or None for all time"""
+        if time_period not in self.TIME_PERIODS:
+            raise ValueError(f"Unknown time period: {time_period}")
+        days = self.TIME_PERIODS[time_period]
+        if days is None:
+            return None
+        start = timezone.localdate() - timedelta(days=days)
+        return timezone.make_aware(datetime.combine(start, datetime.min.time()))
+
+    async def _performance_history(self, user_id: int, module_id: int, since: Optional[datetime]) -> Dict:
+        """
+        The learner's module metrics and quiz attempts since since
+
+        Returns per-type counts and averages over the whole window plus the
+        most recent PERFORMANCE_HISTORY_MAX_EVENTS metrics and attempts as one
+        list of events, newest first.
+        """
+        metrics = PerformanceMetric.objects.filter(
+            user_feedback__user_id=user_id, user_feedback__module_id=module_id
+        )
+        attempts = QuizAttempt.objects.filter(user_id=user_id, quiz__module_id=module_id)
+        if since is not None:
+            metrics = metrics.filter(timestamp__gte=since)
+            attempts = attempts.filter(created_at__gte=since)
+
+        summary = {}
+        async for row in metrics.values('metric_type').annotate(count=Count('id'), average=Avg('value')):
+            summary[row['metric_type']] = {'count': row['count'], 'average': round(row['average'], 2)}
+        totals = await attempts.aaggregate(count=Count('id'), average=Avg('score'))
+        if totals['count']:
+            summary['quiz_attempt'] = {'count': totals['count'], 'average': round(totals['average'], 2)}
+
+        events = [
+            {'type': metric.metric_type, 'value': metric.value, 'at': metric.timestamp}
+            async for metric in metrics.order_by('-timestamp')[:self.history_limit]
+        ] + [
+            {'type': 'quiz_attempt', 'score': attempt.score,
+             'correct_answers': f"{attempt.correct_answers}/{attempt.total_questions}", 'at': attempt.created_at}
+            async for attempt in attempts.order_by('-created_at')[:self.history_limit]
+        ]
+        events.sort(key=lambda event: event['at'], reverse=True)
+        for event in events:
+            event['at'] = event['at'].isoformat()
+        return {'summary': summary, 'events': events}
+
+    def _learning_metrics(self, snapshot: LearnerSnapshot) -> Dict:
+        """Metrics shared by learning pattern analysis and improvement suggestions"""
+        return {
+            "completion_rate": self._calculate_completion_rate(snapshot),
+            "engagement_score": self._calculate_engagement_score(snapshot),
+            "progress_velocity": self._calculate_progress_velocity(snapshot),
+            "learning_style": self._determine_learning_style(snapshot),
+            "strength_areas": self._identify_strength_areas(snapshot),
+            "challenge_areas": self._identify_challenge_areas(snapshot)
+        }
+
+    def _calculate_completion_rate(self, snapshot: LearnerSnapshot) -> float:
         """Calculate the percentage of completed content in a course"""
         try:
-            redis_key = f"course_progress:{user_id}:{course_id}"
-            completed_items = cache.get(f"{redis_key}:completed", 0)
-            total_items = cache.get(f"{redis_key}:total", 1)  # Default to 1 to avoid division by zero
-            
-            return (completed_items / total_items) * 100
+            return (snapshot.completed_items / snapshot.total_items) * 100
         except Exception:
             return 0.0
 
-    def _calculate_engagement_score(self, user_id: int, course_id: int) -> float:
+    def _calculate_engagement_score(self, snapshot: LearnerSnapshot) -> float:
         """Calculate user engagement score based on activity frequency and interaction quality"""
-        try:
-            # Get activity logs from the last 30 days
-            redis_key = f"user_activity:{user_id}:{course_id}"
-            activity_data = cache.get(redis_key, {})
-            
-            if not activity_data:
-                return 0.0
-            
-            # Calculate engagement metrics
-            login_frequency = activity_data.get('login_count', 0)
-            content_interactions = activity_data.get('content_interactions', 0)
-            avg_session_duration = activity_data.get('avg_session_duration', 0)
-            
-            # Weighted scoring (customize weights based on importance)
-            engagement_score = (
-                (login_frequency * 0.3) +
-                (content_interactions * 0.4) +
-                (min(avg_session_duration / 3600, 1) * 0.3)  # Normalize to 1 hour
-            ) * 100
-            
-            return min(engagement_score, 100)  # Cap at 100
-        except Exception:
-            return 0.0
+        # Kept up to date by EngagementTracker as events arrive
+        return snapshot.engagement.get('engagement_score', 0.0)
 
-    def _calculate_progress_velocity(self, user_id: int, course_id: int) -> float:
+    def _calculate_progress_velocity(self, snapshot: LearnerSnapshot) -> float:
         """Calculate the rate of progress (completed items per week)"""
-        try:
-            redis_key = f"progress_history:{user_id}:{course_id}"
-            progress_data = cache.get(redis_key, [])
-            
-            if not progress_data:
-                return 0.0
-            
-            # Calculate items completed in the last week
-            week_ago = datetime.now() - timedelta(days=7)
-            recent_progress = [
-                p for p in progress_data 
-                if datetime.fromisoformat(p['timestamp']) > week_ago
-            ]
-            
-            return sum(p['completed_items'] for p in recent_progress)
-        except Exception:
-            return 0.0
+        return self._calculate_progress_total(snapshot, 7)
+
+    def _calculate_progress_total(self, snapshot: LearnerSnapshot, days: int) -> float:
+        """Items completed over the last days, from the snapshot's daily counters"""
+        return sum(snapshot.daily_progress[-days:]) if days > 0 else 0.0
 
-    def _determine_learning_style(self, user_id: int) -> str:
+    def _determine_learning_style(self, snapshot: LearnerSnapshot) -> str:
         """Analyze user behavior to determine preferred learning style"""
         try:
-            redis_key = f"learning_patterns:{user_id}"
-            pattern_data = cache.get(redis_key, {})
+            pattern_data = snapshot.learning_patterns
             
             if not pattern_data:
                 return "visual"  # Default learning style
@@ -320,18 +372,12 @@ class QuizFeedbackModule:
         except Exception:
             return "visual"
 
-    def _identify_strength_areas(self, user_id: int, course_id: int) -> List[str]:
+    def _identify_strength_areas(self, snapshot: LearnerSnapshot) -> List[str]:
         """Identify topics where the user performs well"""
         try:
-            redis_key = f"topic_performance:{user_id}:{course_id}"
-            performance_data = cache.get(redis_key, {})
-            
-            if not performance_data:
-                return []
-            
             # Filter topics with score >= 80%
             strength_areas = [
-                topic for topic, score in performance_data.items()
+                topic for topic, score in snapshot.topic_performance.items()
                 if score >= 80
             ]
             
@@ -339,18 +385,12 @@ class QuizFeedbackModule:
         except Exception:
             return []
 
-    def _identify_challenge_areas(self, user_id: int, course_id: int) -> List[str]:
+    def _identify_challenge_areas(self, snapshot: LearnerSnapshot) -> List[str]:
         """Identify topics where the user needs improvement"""
         try:
-            redis_key = f"topic_performance:{user_id}:{course_id}"
-            performance_data = cache.get(redis_key, {})
-            
-            if not performance_data:
-                return []
-            
             # Filter topics with score < 70%
             challenge_areas = [
-                topic for topic, score in performance_data.items()
+                topic for topic, score in snapshot.topic_performance.items()
                 if score < 70
             ]
             
@@ -358,30 +398,22 @@ class QuizFeedbackModule:
         except Exception:
             return []
 
-    def _gather_performance_data(self, user_id: int, course_id: int, module_id: Optional[int]) -> Dict:
+    def _gather_performance_data(self, snapshot: LearnerSnapshot) -> Dict:
         """Gather comprehensive performance data for analysis"""
         try:
-            base_key = f"performance:{user_id}"
-            
             # Get general performance metrics
             performance_data = {
-                "completion_rate": self._calculate_completion_rate(user_id, course_id),
-                "engagement_score": self._calculate_engagement_score(user_id, course_id),
-                "progress_velocity": self._calculate_progress_velocity(user_id, course_id),
-                "learning_style": self._determine_learning_style(user_id),
-                "strength_areas": self._identify_strength_areas(user_id, course_id),
-                "challenge_areas": self._identify_challenge_areas(user_id, course_id),
-                "recent_activities": cache.get(f"{base_key}:recent_activities", []),
-                "assessment_scores": cache.get(f"{base_key}:assessment_scores", [])
+                **self._learning_metrics(snapshot),
+                "recent_activities": snapshot.recent_activities,
+                "assessment_scores": snapshot.assessment_scores
             }
             
             # Add module-specific data if module_id is provided
-            if module_id:
-                module_key = f"{base_key}:module:{module_id}"
+            if snapshot.module_id:
                 performance_data.update({
-                    "module_progress": cache.get(f"{module_key}:progress", 0),
-                    "module_scores": cache.get(f"{module_key}:scores", []),
-                    "time_spent": cache.get(f"{module_key}:time_spent", 0)
+                    "module_progress": snapshot.module_progress,
+                    "module_scores": snapshot.module_scores,
+                    "time_spent": snapshot.module_time_spent
                 })
             
             return performance_data
@@ -0,0 +1,328 @@
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+
+from personal_training.models import (
+    LearningActivity, Module, PerformanceMetric, UserCourseEnrollment, UserFeedback, UserModuleProgress
+)
+from .engagement import EngagementTracker
+from .progress_history import ProgressHistory
+from .redis_pool import run_pipeline
+
+logger = logging.getLogger(__name__)
+
+# Module score thresholds, as used for a single learner's strength and challenge areas
+STRENGTH_THRESHOLD = 80
+CHALLENGE_THRESHOLD = 70
+
+# Days of completions counted as progress velocity, as for a single learner
+VELOCITY_DAYS = 7
+
+
+class CohortAnalytics:
+    """
+    Learning analytics for every learner enrolled in a course at once
+
+    Learners are processed in chunks of CHUNK_SIZE user ids. Each chunk's
+    UserModuleProgress, UserFeedback, PerformanceMetric and LearningActivity
+    rows are loaded with one values_list query per model into NumPy columns,
+    and its ProgressHistory and EngagementTracker hashes with one Redis
+    pipeline. Every per-learner metric is then computed with vectorized passes
+    over those columns (bincount group-bys keyed by learner, or learner and
+    module) rather than one Python call per learner. Chunks can be spread over
+    a process pool.
+
+    The metrics use the same sources and formulas as a single learner's
+    analysis (QuizFeedbackModule.analyze_learning_patterns):
+        completion_rate: completed UserModuleProgress rows over the course's
+            modules, as a percentage
+        engagement_score: EngagementTracker's score, from the learner's
+            aggregates decayed to the time of the run
+        progress_velocity: completed items over the last week, from ProgressHistory
+        timeframe_progress: completed items over the last timeframe_days days
+        learning_style: content type with the most LearningActivity time,
+            'visual' when there is none
+        strength/challenge areas: modules whose mean quiz score is at least 80 / below 70
+    """
+
+    def __init__(self, course_id: int, timeframe_days: int = 30, chunk_size: Optional[int] = None):
+        self.course_id = course_id
+        self.timeframe_days = timeframe_days
+        self.chunk_size = chunk_size or getattr(settings, 'COHORT_ANALYTICS_CHUNK_SIZE', 5000)
+
+    def run(self, workers: int = 1) -> Dict:
+        """
+        Analyze the whole cohort and return the course summary and per-learner columns
+
+        Args:
+            workers: Processes to spread chunks over; 1 runs them in this process
+        """
+        user_ids = list(
+            UserCourseEnrollment.objects.filter(course_id=self.course_id)
+            .order_by('user_id').values_list('user_id', flat=True).distinct()
+        )
+        module_ids = list(
+            Module.objects.filter(course_id=self.course_id).order_by('order', 'id').values_list('id', flat=True)
+        )
+        # Every chunk decays engagement rates to the same instant
+        now = time.time()
+        chunks = [user_ids[start:start + self.chunk_size] for start in range(0, len(user_ids), self.chunk_size)]
+        arguments = [(self.course_id, chunk, module_ids, self.timeframe_days, now) for chunk in chunks]
+
+        if workers > 1 and len(chunks) > 1:
+            # Workers open their own database connections; the parent's cannot be shared
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                results = list(executor.map(_analyze_chunk, *zip(*arguments)))
+        else:
+            results = [_analyze_chunk(*chunk_arguments) for chunk_arguments in arguments]
+
+        learners = _concatenate(results, len(module_ids))
+        return {
+            'course_id': self.course_id,
+            'timeframe_days': self.timeframe_days,
+            'summary': _summarize(learners, module_ids),
+            'learners': learners,
+            'module_ids': module_ids,
+        }
+
+
+def learner_rows(result: Dict) -> List[Dict]:
+    """Per-learner results of CohortAnalytics.run as dicts, as a single-learner analysis returns them"""
+    learners = result['learners']
+    module_ids = np.asarray(result['module_ids'], dtype=np.int64)
+    return [
+        {
+            'user_id': learners['user_ids'][index],
+            'completion_rate': float(learners['completion_rate'][index]),
+            'engagement_score': float(learners['engagement_score'][index]),
+            'progress_velocity': float(learners['progress_velocity'][index]),
+            'timeframe_progress': float(learners['timeframe_progress'][index]),
+            'learning_style': str(learners['learning_style'][index]),
+            'strength_areas': module_ids[learners['strengths'][index]].tolist(),
+            'challenge_areas': module_ids[learners['challenges'][index]].tolist(),
+        }
+        for index in range(len(learners['user_ids']))
+    ]
+
+
+def _init_worker() -> None:
+    import django
+    from django.db import connections
+
+    django.setup()
+    connections.close_all()
+
+
+def _analyze_chunk(course_id: int, user_ids: List, module_ids: List[int],
+                   timeframe_days: int, now: float) -> Dict[str, np.ndarray]:
+    """Every per-learner metric for one chunk of user ids"""
+    learner_count = len(user_ids)
+    learner_index = {user_id: index for index, user_id in enumerate(user_ids)}
+    module_count = len(module_ids)
+    module_lookup = np.asarray(module_ids, dtype=np.int64)
+    module_order = np.argsort(module_lookup)
+
+    # Completed UserModuleProgress rows over the course's modules, as LearnerAnalytics counts them
+    completed_users = list(
+        UserModuleProgress.objects.filter(
+            user_id__in=user_ids, module__course_id=course_id, completed_at__isnull=False
+        ).values_list('user_id', flat=True).order_by()
+    )
+    completed = np.bincount(_learners(learner_index, completed_users), minlength=learner_count).astype(float)
+    completion_rate = completed / module_count * 100 if module_count else np.zeros(learner_count)
+
+    # ProgressHistory days and EngagementTracker hashes, in one round trip for the chunk
+    days = max(timeframe_days, VELOCITY_DAYS)
+    day_fields = ProgressHistory.day_fields(days)
+
+    def build(pipeline):
+        for user_id in user_ids:
+            pipeline.hmget(ProgressHistory.key(user_id, course_id), day_fields)
+            pipeline.hgetall(EngagementTracker.user_key(user_id))
+            pipeline.hgetall(EngagementTracker.course_key(user_id, course_id))
+
+    replies = run_pipeline(build) if learner_count else []
+    daily = np.array(
+        [[float(value) if value is not None else 0.0 for value in reply] for reply in replies[0::3]]
+    ).reshape(learner_count, days)
+    progress_velocity = daily[:, -VELOCITY_DAYS:].sum(axis=1)
+    timeframe_progress = daily[:, -timeframe_days:].sum(axis=1)
+
+    user_state = _hash_columns(replies[1::3], ('rate', 'last_event_at'))
+    course_state = _hash_columns(replies[2::3], ('rate', 'last_event_at', 'session_duration'))
+    engagement_score = _engagement_scores(
+        _rates_per_day(user_state['rate'], user_state['last_event_at'], now),
+        _rates_per_day(course_state['rate'], course_state['last_event_at'], now),
+        np.nan_to_num(course_state['session_duration'])
+    )
+
+    # PerformanceMetric quiz scores per learner and module
+    metrics = list(
+        PerformanceMetric.objects.filter(
+            user_feedback__course_id=course_id, user_feedback__user_id__in=user_ids,
+            user_feedback__module__isnull=False, metric_type='quiz_score'
+        ).values_list('user_feedback__user_id', 'user_feedback__module_id', 'value').order_by()
+    )
+    pm_user, pm_module, pm_value = _columns(metrics, 3)
+    cell_sum = np.zeros(learner_count * module_count)
+    cell_count = np.zeros(learner_count * module_count)
+    if len(metrics):
+        cells = _cells(_learners(learner_index, pm_user), pm_module, module_lookup, module_order, module_count)
+        valid = cells >= 0
+        cell_sum += np.bincount(cells[valid], weights=pm_value.astype(float)[valid],
+                                minlength=learner_count * module_count)
+        cell_count += np.bincount(cells[valid], minlength=learner_count * module_count)
+
+    # Modules without individual scores fall back to the module row's average quiz score,
+    # unless that is still the 0 of a module with no quiz taken
+    averages = list(
+        UserFeedback.objects.filter(
+            course_id=course_id, user_id__in=user_ids, module__isnull=False, average_quiz_score__gt=0
+        ).values_list('user_id', 'module_id', 'average_quiz_score').order_by()
+    )
+    fb_user, fb_module, fb_quiz = _columns(averages, 3)
+    if len(averages):
+        module_quiz = fb_quiz.astype(float)
+        cells = _cells(_learners(learner_index, fb_user), fb_module, module_lookup, module_order, module_count)
+        fallback = cells >= 0
+        fallback[fallback] = cell_count[cells[fallback]] == 0
+        np.add.at(cell_sum, cells[fallback], module_quiz[fallback])
+        np.add.at(cell_count, cells[fallback], 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        module_scores = (cell_sum / cell_count).reshape(learner_count, module_count)
+    strengths = np.nan_to_num(module_scores, nan=-1) >= STRENGTH_THRESHOLD
+    challenges = np.nan_to_num(module_scores, nan=101) < CHALLENGE_THRESHOLD
+
+    # LearningActivity time per content type, as LearnerAnalytics.learning_patterns sums it
+    activities = list(
+        LearningActivity.objects.filter(
+            user_feedback__course_id=course_id, user_feedback__user_id__in=user_ids
+        ).values_list('user_feedback__user_id', 'content_type', 'duration').order_by()
+    )
+    la_user, la_type, la_duration = _columns(activities, 3)
+    learning_style = np.full(learner_count, 'visual', dtype=object)
+    if len(activities):
+        la_learner = _learners(learner_index, la_user)
+        style_names, style_index = np.unique(la_type.astype(str), return_inverse=True)
+        time_by_style = np.bincount(
+            la_learner * len(style_names) + style_index, weights=la_duration.astype(float),
+            minlength=learner_count * len(style_names)
+        ).reshape(learner_count, len(style_names))
+        active = np.bincount(la_learner, minlength=learner_count) > 0
+        learning_style = np.where(active, style_names[time_by_style.argmax(axis=1)].astype(object), learning_style)
+
+    return {
+        'user_ids': np.array([str(user_id) for user_id in user_ids], dtype=object),
+        'completion_rate': completion_rate,
+        'engagement_score': engagement_score,
+        'progress_velocity': progress_velocity,
+        'timeframe_progress': timeframe_progress,
+        'learning_style': learning_style,
+        'strengths': strengths,
+        'challenges': challenges,
+    }
+
+
+def _hash_columns(states: List[Dict], names: tuple) -> Dict[str, np.ndarray]:
+    """Float column per hash field across learners, NaN where a learner's hash lacks it"""
+    columns = {name: np.full(len(states), np.nan) for name in names}
+    for index, state in enumerate(states):
+        for field, value in state.items():
+            name = field.decode() if isinstance(field, bytes) else field
+            if name in columns:
+                columns[name][index] = float(value)
+    return columns
+
+
+def _rates_per_day(rates: np.ndarray, last_event_at: np.ndarray, now: float) -> np.ndarray:
+    """EngagementTracker's stored event rates decayed to now, per day (0 for no events)"""
+    tau = getattr(settings, 'ENGAGEMENT_DECAY_DAYS', 7) * 24 * 60 * 60
+    elapsed = np.maximum(now - last_event_at, 0)
+    return np.nan_to_num(rates * np.exp(-elapsed / tau) * 24 * 60 * 60)
+
+
+def _engagement_scores(logins_per_day: np.ndarray, interactions_per_day: np.ndarray,
+                       session_seconds: np.ndarray) -> np.ndarray:
+    """EngagementTracker.summarize's score for arrays of learners"""
+    login_target = getattr(settings, 'ENGAGEMENT_LOGIN_TARGET', 1)
+    interaction_target = getattr(settings, 'ENGAGEMENT_INTERACTION_TARGET', 10)
+    score = (
+        np.minimum(logins_per_day / login_target, 1) * 0.3 +
+        np.minimum(interactions_per_day / interaction_target, 1) * 0.4 +
+        np.minimum(session_seconds / 3600, 1) * 0.3
+    ) * 100
+    return np.minimum(score, 100)
+
+
+def _columns(rows: List[tuple], width: int) -> List[np.ndarray]:
+    """values_list rows as one object array per column"""
+    if not rows:
+        return [np.empty(0, dtype=object) for _ in range(width)]
+    table = np.empty((len(rows), width), dtype=object)
+    table[:] = rows
+    return [table[:, column] for column in range(width)]
+
+
+def _learners(learner_index: Dict, users: np.ndarray) -> np.ndarray:
+    """Chunk position of each row's user"""
+    return np.fromiter(map(learner_index.__getitem__, users), dtype=np.int64, count=len(users))
+
+
+def _cells(learners: np.ndarray, modules: np.ndarray, module_lookup: np.ndarray,
+           module_order: np.ndarray, module_count: int) -> np.ndarray:
+    """Flat learner x module index for each row, or -1 for modules not in the course"""
+    if not module_count:
+        return np.full(len(learners), -1, dtype=np.int64)
+    modules = modules.astype(np.int64)
+    positions = np.searchsorted(module_lookup, modules, sorter=module_order)
+    positions = np.minimum(positions, module_count - 1)
+    module_index = module_order[positions]
+    known = module_lookup[module_index] == modules
+    return np.where(known, learners * module_count + module_index, -1)
+
+
+def _concatenate(results: List[Dict[str, np.ndarray]], module_count: int) -> Dict[str, np.ndarray]:
+    if not results:
+        return {
+            'user_ids': np.empty(0, dtype=object),
+            'completion_rate': np.empty(0),
+            'engagement_score': np.empty(0),
+            'progress_velocity': np.empty(0),
+            'timeframe_progress': np.empty(0),
+            'learning_style': np.empty(0, dtype=object),
+            'strengths': np.empty((0, module_count), dtype=bool),
+            'challenges': np.empty((0, module_count), dtype=bool),
+        }
+    return {name: np.concatenate([result[name] for result in results]) for name in results[0]}
+
+
+def _summarize(learners: Dict[str, np.ndarray], module_ids: List[int]) -> Dict:
+    """Course-level distributions over all learners"""
+
+    def distribution(values: np.ndarray) -> Dict:
+        if not len(values):
+            return {'mean': 0.0, 'p10': 0.0, 'median': 0.0, 'p90': 0.0}
+        p10, median, p90 = np.percentile(values, [10, 50, 90])
+        return {'mean': float(values.mean()), 'p10': float(p10), 'median': float(median), 'p90': float(p90)}
+
+    styles, style_counts = np.unique(learners['learning_style'].astype(str), return_counts=True)
+    strength_counts = learners['strengths'].sum(axis=0)
+    challenge_counts = learners['challenges'].sum(axis=0)
+    return {
+        'learners': int(len(learners['user_ids'])),
+        'completion_rate': distribution(learners['completion_rate']),
+        'engagement_score': distribution(learners['engagement_score']),
+        'progress_velocity': distribution(learners['progress_velocity']),
+        'timeframe_progress': distribution(learners['timeframe_progress']),
+        'learning_styles': {str(style): int(count) for style, count in zip(styles, style_counts)},
+        'strength_modules': {
+            int(module_id): int(count) for module_id, count in zip(module_ids, strength_counts) if count
+        },
+        'challenge_modules': {
+            int(module_id): int(count) for module_id, count in zip(module_ids, challenge_counts) if count
+        },
+    }
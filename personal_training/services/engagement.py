@@ -0,0 +1,142 @@
+import logging
+import math
+import time
+from typing import Dict, Optional
+
+from django.conf import settings
+
+from .redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] aggregate hash
+# ARGV[1] now (seconds), ARGV[2] counter field, ARGV[3] duration seconds (0 for none),
+# ARGV[4] rate decay time constant (seconds), ARGV[5] session EWMA weight, ARGV[6] ttl seconds
+RECORD_SCRIPT = """
+local now = tonumber(ARGV[1])
+local tau = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'rate', 'last_event_at', 'session_duration')
+local rate = tonumber(state[1]) or 0
+local last = tonumber(state[2]) or now
+-- Exponentially decayed event rate (events per second over roughly the last tau)
+rate = rate * math.exp(-math.max(now - last, 0) / tau) + 1 / tau
+redis.call('HSET', KEYS[1], 'rate', tostring(rate), 'last_event_at', ARGV[1])
+redis.call('HINCRBY', KEYS[1], ARGV[2], 1)
+
+local duration = tonumber(ARGV[3])
+if duration > 0 then
+    local session = tonumber(state[3])
+    if session then
+        local alpha = tonumber(ARGV[5])
+        session = alpha * duration + (1 - alpha) * session
+    else
+        session = duration
+    end
+    redis.call('HSET', KEYS[1], 'session_duration', tostring(session))
+end
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+return tostring(rate)
+"""
+
+
+class EngagementTracker:
+    """
+    Running engagement aggregates updated as learning events happen
+
+    Logins update a per-user hash and content interactions (every
+    LearningActivity, among others) a per-user/course hash. Each event is one
+    script call that bumps a count, folds the event into an exponentially
+    decayed rate and, when it has a duration, into an exponentially weighted
+    session length. Scoring reads the two hashes and decays the rates to now,
+    so its cost does not depend on how much activity a learner has.
+    """
+
+    KEY_PREFIX = "engagement"
+
+    def __init__(self, redis_client=None):
+        self.redis_client = redis_client or get_redis()
+        self._record = self.redis_client.register_script(RECORD_SCRIPT)
+
+    def record_login(self, user_id: int) -> None:
+        self._record_event(self.user_key(user_id), 'login_count')
+
+    def record_interaction(self, user_id: int, course_id: int, duration_seconds: float = 0) -> None:
+        self._record_event(self.course_key(user_id, course_id), 'interaction_count', duration_seconds)
+
+    def get(self, user_id: int, course_id: int) -> Dict:
+        """Current aggregates and engagement score for a learner in a course"""
+        pipeline = self.redis_client.pipeline(transaction=False)
+        pipeline.hgetall(self.user_key(user_id))
+        pipeline.hgetall(self.course_key(user_id, course_id))
+        return self.summarize(*pipeline.execute())
+
+    @classmethod
+    def user_key(cls, user_id: int) -> str:
+        return f"{cls.KEY_PREFIX}:{user_id}"
+
+    @classmethod
+    def course_key(cls, user_id: int, course_id: int) -> str:
+        return f"{cls.KEY_PREFIX}:{user_id}:{course_id}"
+
+    @staticmethod
+    def summarize(user_state: Dict, course_state: Dict, now: Optional[float] = None) -> Dict:
+        """
+        Turn the raw user and course hashes into aggregates and a 0-100 score
+
+        Args:
+            user_state: HGETALL of user_key (bytes or str fields)
+            course_state: HGETALL of course_key
+            now: Time to decay the rates to, defaults to the current time
+        """
+        now = now or time.time()
+        tau = getattr(settings, 'ENGAGEMENT_DECAY_DAYS', 7) * 24 * 60 * 60
+        user_state = _decode_hash(user_state)
+        course_state = _decode_hash(course_state)
+
+        def rate_per_day(state: Dict) -> float:
+            if 'rate' not in state:
+                return 0.0
+            elapsed = max(now - float(state['last_event_at']), 0)
+            return float(state['rate']) * math.exp(-elapsed / tau) * 24 * 60 * 60
+
+        login_rate = rate_per_day(user_state)
+        interaction_rate = rate_per_day(course_state)
+        session_duration = float(course_state.get('session_duration', 0))
+
+        login_target = getattr(settings, 'ENGAGEMENT_LOGIN_TARGET', 1)
+        interaction_target = getattr(settings, 'ENGAGEMENT_INTERACTION_TARGET', 10)
+        engagement_score = (
+            (min(login_rate / login_target, 1) * 0.3) +
+            (min(interaction_rate / interaction_target, 1) * 0.4) +
+            (min(session_duration / 3600, 1) * 0.3)  # Normalize to 1 hour
+        ) * 100
+
+        return {
+            'login_count': int(user_state.get('login_count', 0)),
+            'interaction_count': int(course_state.get('interaction_count', 0)),
+            'logins_per_day': login_rate,
+            'interactions_per_day': interaction_rate,
+            'avg_session_duration': session_duration,
+            'engagement_score': min(engagement_score, 100)
+        }
+
+    def _record_event(self, key: str, counter: str, duration_seconds: float = 0) -> None:
+        # Tracking must never fail the request or save that produced the event
+        try:
+            self._record(keys=[key], args=[
+                time.time(),
+                counter,
+                max(duration_seconds or 0, 0),
+                getattr(settings, 'ENGAGEMENT_DECAY_DAYS', 7) * 24 * 60 * 60,
+                getattr(settings, 'ENGAGEMENT_SESSION_ALPHA', 0.2),
+                getattr(settings, 'ENGAGEMENT_TTL', 60 * 60 * 24 * 90)
+            ])
+        except Exception as e:
+            logger.error(f"Error recording engagement event {counter} for {key}: {str(e)}")
+
+
+def _decode_hash(state: Dict) -> Dict[str, str]:
+    return {
+        (field.decode() if isinstance(field, bytes) else field): (value.decode() if isinstance(value, bytes) else value)
+        for field, value in (state or {}).items()
+    }
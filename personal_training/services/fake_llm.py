@@ -0,0 +1,129 @@
+import asyncio
+import json
+import random
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from django.conf import settings
+
+from .llm_client import LLMClient
+from .quiz_schema import (
+    BATCH_FEEDBACK_RESPONSE_SCHEMA, FEEDBACK_RESPONSE_SCHEMA, OPEN_ENDED_TYPES,
+    QUESTION_TYPE_DESCRIPTIONS, QUIZ_RESPONSE_SCHEMA
+)
+
+TEMPLATE_FIELD_RE = re.compile(r'"(\w+)":\s*(\[|")')
+BATCH_ANSWER_RE = re.compile(r'^\s*Answer (\d+):\s*$', re.MULTILINE)
+
+
+class FakeLLMClient(LLMClient):
+    """
+    Offline stand-in for the Gemini client, selected with LLM_PROVIDER = 'fake'
+
+    Returns schema-valid quizzes and feedback built from the prompt, after a
+    lognormal latency around FAKE_LLM_LATENCY_MS. A FAKE_LLM_ERROR_RATE share
+    of calls raise ConnectionError and a FAKE_LLM_HANG_RATE share never return
+    (until cancelled), which lets load tests exercise deadlines and the circuit
+    breaker without using API quota.
+    """
+
+    STREAM_CHUNK_CHARS = 64
+
+    def __init__(self, model_name: Optional[str] = None):
+        super().__init__(model_name or 'fake')
+        self.latency_ms = getattr(settings, 'FAKE_LLM_LATENCY_MS', 800)
+        self.latency_sigma = getattr(settings, 'FAKE_LLM_LATENCY_SIGMA', 0.5)
+        self.error_rate = getattr(settings, 'FAKE_LLM_ERROR_RATE', 0.0)
+        self.hang_rate = getattr(settings, 'FAKE_LLM_HANG_RATE', 0.0)
+        self.random = random.Random(getattr(settings, 'FAKE_LLM_SEED', None))
+
+    @property
+    def model(self):
+        raise RuntimeError("FakeLLMClient has no Gemini model")
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        generation_config = kwargs.get('generation_config') or {}
+        response_schema = generation_config.get('response_schema')
+        await self._simulate_call()
+        return json.dumps(self._respond(prompt, response_schema))
+
+    async def generate_json(self, prompt: str, response_schema: Optional[Dict] = None) -> Any:
+        await self._simulate_call()
+        return self._respond(prompt, response_schema)
+
+    async def stream(self, prompt: str, response_schema: Optional[Dict] = None, **kwargs) -> AsyncIterator[str]:
+        await self._simulate_call()
+        text = json.dumps(self._respond(prompt, response_schema))
+        for start in range(0, len(text), self.STREAM_CHUNK_CHARS):
+            await asyncio.sleep(0)
+            yield text[start:start + self.STREAM_CHUNK_CHARS]
+
+    async def _simulate_call(self) -> None:
+        roll = self.random.random()
+        if roll < self.hang_rate:
+            await asyncio.Event().wait()
+        latency = self.latency_ms / 1000 * self.random.lognormvariate(0, self.latency_sigma)
+        await asyncio.sleep(latency)
+        if roll < self.hang_rate + self.error_rate:
+            raise ConnectionError("Simulated Gemini failure")
+
+    def _respond(self, prompt: str, response_schema: Optional[Dict]) -> Dict:
+        if response_schema is QUIZ_RESPONSE_SCHEMA:
+            return self._quiz(prompt)
+        if response_schema is BATCH_FEEDBACK_RESPONSE_SCHEMA:
+            return {
+                'feedback': [
+                    {'index': int(index), **self._feedback()} for index in BATCH_ANSWER_RE.findall(prompt)
+                ]
+            }
+        if response_schema is FEEDBACK_RESPONSE_SCHEMA:
+            return self._feedback()
+        return self._from_template(prompt)
+
+    def _quiz(self, prompt: str) -> Dict:
+        """A quiz with the question counts requested in the prompt"""
+        difficulty_match = re.search(r'Difficulty Level:\s*(\w+)', prompt)
+        difficulty = difficulty_match.group(1) if difficulty_match else 'intermediate'
+
+        questions = []
+        for qtype, description in QUESTION_TYPE_DESCRIPTIONS.items():
+            count_match = re.search(rf'(\d+) {re.escape(description)}', prompt)
+            for number in range(int(count_match.group(1)) if count_match else 0):
+                questions.append(self._question(qtype, difficulty, number))
+        return {'questions': questions}
+
+    def _question(self, qtype: str, difficulty: str, number: int) -> Dict:
+        token = self.random.randrange(10 ** 6)
+        question = {
+            'question_text': f"Simulated {qtype} question {number + 1} ({token})?",
+            'question_type': qtype,
+            'difficulty_level': difficulty,
+            'explanation': "Simulated explanation of the key point"
+        }
+        if qtype == 'mcq':
+            correct = self.random.randrange(4)
+            question['choices'] = [
+                {'choice_text': f"Option {letter}", 'is_correct': index == correct}
+                for index, letter in enumerate('ABCD')
+            ]
+        elif qtype == 'scenario':
+            question['scenario_context'] = "Simulated scenario describing a workplace situation"
+        if qtype in OPEN_ENDED_TYPES or qtype == 'scenario':
+            question['model_answer'] = "Simulated model answer covering the main ideas"
+        return question
+
+    def _feedback(self) -> Dict:
+        return {
+            'strengths': "Simulated strengths",
+            'areas_for_improvement': "Simulated areas for improvement",
+            'key_concepts': "Simulated key concepts",
+            'suggestions': "Simulated suggestions"
+        }
+
+    def _from_template(self, prompt: str) -> Dict:
+        """Fill the JSON format example at the end of a free-form prompt"""
+        template = prompt[prompt.rfind('JSON format'):] if 'JSON format' in prompt else prompt
+        response = {}
+        for field, opener in TEMPLATE_FIELD_RE.findall(template):
+            response[field] = [f"Simulated {field}"] if opener == '[' else f"Simulated {field}"
+        return response
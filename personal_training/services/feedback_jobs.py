@@ -0,0 +1,283 @@
+import asyncio
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from .Quizfeedback_module import QuizFeedbackModule
+from .redis_pool import async_script, get_async_redis, run_async_pipeline
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] queue, KEYS[2] processing set; ARGV[1] lease in milliseconds
+# Moves the oldest queued job id into the processing set, leased until now + lease
+CLAIM_SCRIPT = """
+local job_id = redis.call('RPOP', KEYS[1])
+if not job_id then
+    return false
+end
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[1]), job_id)
+return job_id
+"""
+
+# KEYS[1] processing set; ARGV[1] job id, ARGV[2] lease in milliseconds
+# Renews a claimed job's lease; returns 0 if the job is no longer claimed
+EXTEND_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+return redis.call('ZADD', KEYS[1], 'XX', 'CH', now + tonumber(ARGV[2]), ARGV[1])
+"""
+
+# KEYS[1] processing set, KEYS[2] queue; ARGV[1] maximum jobs to recover
+# Puts jobs whose lease ran out (their worker died) back at the front of the queue
+RECOVER_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'LIMIT', 0, tonumber(ARGV[1]))
+for _, job_id in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], job_id)
+    redis.call('RPUSH', KEYS[2], job_id)
+end
+return expired
+"""
+
+
+class FeedbackJobQueueFull(Exception):
+    """Raised when the job queue cannot accept another job"""
+
+
+class FeedbackJobService:
+    """
+    Runs slow QuizFeedbackModule generations as background jobs
+
+    submit() stores a queued job in Redis, pushes its id onto a Redis list and
+    returns the id at once. Jobs are run by separate worker processes
+    (``manage.py run_feedback_jobs``, see FeedbackJobWorker), never by the web
+    process that queued them, so a web restart loses nothing. A worker claims
+    a job by moving it into a processing set under a lease it keeps renewing;
+    if the worker dies the lease runs out and the job is queued again, up to
+    FEEDBACK_JOB_MAX_ATTEMPTS runs. Results are stored under the job and pushed
+    to the user's WebSocket group, and jobs can be polled from any process.
+    """
+
+    KEY_PREFIX = "feedback:job"
+    QUEUE_KEY = "feedback:job:queue"  # list of job ids waiting for a worker
+    PROCESSING_KEY = "feedback:job:processing"  # sorted set of claimed job ids scored by lease expiry (ms)
+
+    # Job kind -> QuizFeedbackModule coroutine method and its allowed keyword arguments
+    JOB_KINDS = {
+        'quiz_feedback': ('generate_quiz_feedback', ['quiz_results', 'module_id', 'course_id']),
+        'performance_feedback': ('generate_performance_feedback', ['module_id', 'time_period']),
+        'improvement_suggestions': ('get_improvement_suggestions', ['course_id', 'module_id']),
+    }
+
+    def __init__(self):
+        self.redis_client = get_async_redis()
+        self.ttl = getattr(settings, 'FEEDBACK_JOB_TTL', 60 * 60 * 24)
+        self.max_queue = getattr(settings, 'FEEDBACK_JOB_MAX_QUEUE', 500)
+        self.max_attempts = getattr(settings, 'FEEDBACK_JOB_MAX_ATTEMPTS', 3)
+
+    async def submit(self, kind: str, user_id: str, params: Dict) -> str:
+        """
+        Queue a feedback generation and return the job id
+
+        Args:
+            kind: One of JOB_KINDS
+            user_id: The user the feedback is for; only they receive the push
+            params: Keyword arguments for the QuizFeedbackModule method
+        """
+        if kind not in self.JOB_KINDS:
+            raise ValueError(f"Unknown feedback job kind: {kind}")
+        _, allowed = self.JOB_KINDS[kind]
+        params = {name: value for name, value in params.items() if name in allowed}
+
+        if await self.redis_client.llen(self.QUEUE_KEY) >= self.max_queue:
+            raise FeedbackJobQueueFull("Feedback job queue is full, try again later")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            'job_id': job_id,
+            'kind': kind,
+            'user_id': user_id,
+            'params': params,
+            'status': 'queued',
+            'attempts': 0,
+            'created_at': datetime.now().isoformat(),
+            'result': None
+        }
+
+        def build(pipeline):
+            pipeline.setex(self._job_key(job_id), self.ttl, json.dumps(job))
+            pipeline.lpush(self.QUEUE_KEY, job_id)
+
+        await run_async_pipeline(build, transaction=True, redis_client=self.redis_client)
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        """Return the stored job, or None if it is unknown or expired"""
+        cached = await self.redis_client.get(self._job_key(job_id))
+        return json.loads(cached) if cached else None
+
+    async def claim(self, lease: float) -> Optional[str]:
+        """Take the oldest queued job id under a lease of lease seconds, or None if the queue is empty"""
+        return await async_script(CLAIM_SCRIPT)(
+            keys=[self.QUEUE_KEY, self.PROCESSING_KEY], args=[int(lease * 1000)]
+        )
+
+    async def extend(self, job_id: str, lease: float) -> bool:
+        """Renew a claimed job's lease; False if it was already recovered or finished"""
+        return bool(await async_script(EXTEND_SCRIPT)(
+            keys=[self.PROCESSING_KEY], args=[job_id, int(lease * 1000)]
+        ))
+
+    async def recover_expired(self, limit: int = 100) -> List[str]:
+        """Queue again the claimed jobs whose lease ran out and return their ids"""
+        return await async_script(RECOVER_SCRIPT)(
+            keys=[self.PROCESSING_KEY, self.QUEUE_KEY], args=[limit]
+        )
+
+    async def run_job(self, job_id: str) -> None:
+        """
+        Run a claimed job, store and push its outcome, then release the claim
+
+        If this raises, the claim is left to expire so the job is queued again.
+        """
+        job = await self.get(job_id)
+        if job is None:
+            logger.warning(f"Feedback job {job_id} expired before it ran")
+        else:
+            if job['attempts'] >= self.max_attempts:
+                job['status'] = 'failed'
+                job['result'] = {'error': f"Gave up after {job['attempts']} attempts"}
+            else:
+                await self._run(job)
+
+            job['finished_at'] = datetime.now().isoformat()
+            await self._save(job)
+            await self._push(job)
+        await self.redis_client.zrem(self.PROCESSING_KEY, job_id)
+
+    @staticmethod
+    def group_name(user_id: str) -> str:
+        """Channel layer group receiving a user's job updates"""
+        return f"feedback_jobs.{user_id}"
+
+    async def _run(self, job: Dict) -> None:
+        method_name, _ = self.JOB_KINDS[job['kind']]
+        job['status'] = 'running'
+        job['attempts'] += 1
+        await self._save(job)
+
+        try:
+            result = await getattr(QuizFeedbackModule(), method_name)(user_id=job['user_id'], **job['params'])
+            # The feedback methods report their own failures as a dict with an error key
+            job['status'] = 'failed' if 'error' in result else 'completed'
+            job['result'] = result
+        except Exception as e:
+            logger.error(f"Feedback job {job['job_id']} failed: {str(e)}")
+            job['status'] = 'failed'
+            job['result'] = {'error': str(e)}
+
+    async def _push(self, job: Dict) -> None:
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        try:
+            await channel_layer.group_send(
+                self.group_name(job['user_id']),
+                {'type': 'feedback.job', 'job': job}
+            )
+        except Exception as e:
+            logger.warning(f"Failed to push feedback job {job['job_id']}: {str(e)}")
+
+    async def _save(self, job: Dict) -> None:
+        await self.redis_client.setex(self._job_key(job['job_id']), self.ttl, json.dumps(job))
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{job_id}"
+
+
+class FeedbackJobWorker:
+    """
+    Consumes the feedback job queue, running up to FEEDBACK_JOB_WORKERS jobs at once
+
+    Each running job's lease is renewed every third of FEEDBACK_JOB_LEASE
+    seconds. The queue is polled every FEEDBACK_JOB_POLL_INTERVAL seconds while
+    empty, and at that interval jobs whose worker died are queued again.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None):
+        self.concurrency = concurrency or getattr(settings, 'FEEDBACK_JOB_WORKERS', 4)
+        self.lease = getattr(settings, 'FEEDBACK_JOB_LEASE', 120)
+        self.poll_interval = getattr(settings, 'FEEDBACK_JOB_POLL_INTERVAL', 1.0)
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """Process jobs until stop is set, then wait for the running ones to finish"""
+        stop = stop or asyncio.Event()
+        service = FeedbackJobService()
+        slots = asyncio.Semaphore(self.concurrency)
+        running = set()
+        last_recovery = 0.0
+        loop = asyncio.get_running_loop()
+
+        while not stop.is_set():
+            await slots.acquire()
+            if stop.is_set():
+                slots.release()
+                break
+            try:
+                if loop.time() - last_recovery >= self.poll_interval:
+                    last_recovery = loop.time()
+                    recovered = await service.recover_expired()
+                    if recovered:
+                        logger.warning(f"Requeued {len(recovered)} feedback jobs with expired leases")
+                job_id = await service.claim(self.lease)
+            except Exception as e:
+                logger.error(f"Feedback job queue unavailable: {str(e)}")
+                job_id = None
+
+            if job_id is None:
+                slots.release()
+                await self._wait(stop, self.poll_interval)
+                continue
+
+            task = loop.create_task(self._process(service, job_id))
+            running.add(task)
+            task.add_done_callback(running.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+    async def _process(self, service: FeedbackJobService, job_id: str) -> None:
+        heartbeat = asyncio.get_running_loop().create_task(self._heartbeat(service, job_id))
+        try:
+            await service.run_job(job_id)
+        except Exception as e:
+            # The claim stays leased, so the job is retried once the lease runs out
+            logger.error(f"Feedback job worker error on {job_id}: {str(e)}")
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, service: FeedbackJobService, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                if not await service.extend(job_id, self.lease):
+                    logger.warning(f"Lost the lease on feedback job {job_id}")
+                    return
+            except Exception as e:
+                logger.warning(f"Failed to renew the lease on feedback job {job_id}: {str(e)}")
+
+    @staticmethod
+    async def _wait(stop: asyncio.Event, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(stop.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
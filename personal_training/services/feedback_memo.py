@@ -0,0 +1,260 @@
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .redis_pool import get_async_redis, get_redis, run_async_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+class FeedbackMemo:
+    """
+    Memoized answer feedback keyed by question, normalized answer and question type
+
+    Lookups hit a small in-process LRU first and Redis second. Redis entries
+    expire after a TTL and are also evicted least-recently-used once the index
+    grows past FEEDBACK_MEMO_MAX_ENTRIES. Hit/miss counters are kept per
+    question type. Coroutines use aget(), aget_many() and aset(), which run on
+    the asyncio client. Entries are copied in and out of the in-process LRU,
+    so a caller changing its feedback cannot change it for later requests.
+    """
+
+    KEY_PREFIX = "feedback:memo"
+    INDEX_KEY = "feedback:memo:index"  # sorted set of memo keys scored by last access
+    STATS_KEY_PREFIX = "feedback:memo:stats"
+    STATS_FLUSH_INTERVAL = 10  # seconds between pushes of local counters to Redis
+
+    # Process-wide LRU shared by all instances: key -> (expires_at, feedback)
+    _local = OrderedDict()
+    _local_lock = threading.Lock()
+    _pending_stats = Counter()
+    _last_stats_flush = 0.0
+
+    def __init__(self, namespace: str, redis_client=None, async_redis_client=None):
+        self.namespace = namespace
+        self.redis_client = redis_client or get_redis()
+        # Defaults to the shared asyncio client of whichever loop is calling
+        self.async_redis_client = async_redis_client
+        self.ttl = getattr(settings, 'FEEDBACK_MEMO_TTL', 60 * 60 * 24 * 7)
+        self.max_entries = getattr(settings, 'FEEDBACK_MEMO_MAX_ENTRIES', 50000)
+        self.local_size = getattr(settings, 'FEEDBACK_MEMO_LOCAL_SIZE', 1024)
+
+    def make_key(self, question_identity: str, user_answer: str, question_type: str) -> str:
+        """
+        Build the memo key for an answer
+
+        Args:
+            question_identity: Text identifying the question (question text, context, correct answer)
+            user_answer: The user's answer, normalized before hashing
+            question_type: Type of question (mcq, scenario, etc.)
+        """
+        question_hash = hashlib.sha256(question_identity.encode('utf-8')).hexdigest()[:24]
+        answer_hash = hashlib.sha256(self._normalize(user_answer).encode('utf-8')).hexdigest()[:24]
+        return f"{self.KEY_PREFIX}:{self.namespace}:{question_type}:{question_hash}:{answer_hash}"
+
+    def get(self, key: str, question_type: str) -> Optional[Dict]:
+        """Return memoized feedback for key, or None on a miss"""
+        feedback = self._get_local(key)
+        if feedback is None:
+            try:
+                pipeline = self.redis_client.pipeline()
+                pipeline.get(key)
+                pipeline.zadd(self.INDEX_KEY, {key: time.time()}, xx=True)
+                cached, _ = pipeline.execute()
+                if cached:
+                    feedback = json.loads(cached)
+                    self._set_local(key, feedback)
+            except Exception as e:
+                logger.warning(f"Feedback memo lookup failed: {str(e)}")
+
+        self._record(question_type, 'hits' if feedback is not None else 'misses')
+        return feedback
+
+    async def aget(self, key: str, question_type: str) -> Optional[Dict]:
+        """Async get() on the asyncio client"""
+        feedback = self._get_local(key)
+        if feedback is None:
+            try:
+                def build(pipeline):
+                    pipeline.get(key)
+                    pipeline.zadd(self.INDEX_KEY, {key: time.time()}, xx=True)
+
+                cached, _ = await run_async_pipeline(build, transaction=True, redis_client=self._async_client())
+                if cached:
+                    feedback = json.loads(cached)
+                    self._set_local(key, feedback)
+            except Exception as e:
+                logger.warning(f"Feedback memo lookup failed: {str(e)}")
+
+        await self._arecord(question_type, 'hits' if feedback is not None else 'misses')
+        return feedback
+
+    async def aget_many(self, lookups: List[Tuple[str, str]]) -> List[Optional[Dict]]:
+        """
+        aget() for several (key, question_type) pairs, with one Redis round trip for all local misses
+
+        Returns the memoized feedback (None on a miss) in the order of lookups.
+        """
+        results = [self._get_local(key) for key, _ in lookups]
+        missing = [key for (key, _), feedback in zip(lookups, results) if feedback is None]
+        if missing:
+            try:
+                def build(pipeline):
+                    pipeline.mget(missing)
+                    now = time.time()
+                    for key in missing:
+                        pipeline.zadd(self.INDEX_KEY, {key: now}, xx=True)
+
+                cached, *_ = await run_async_pipeline(build, transaction=True, redis_client=self._async_client())
+                found = {key: json.loads(value) for key, value in zip(missing, cached) if value}
+                for key, feedback in found.items():
+                    self._set_local(key, feedback)
+                results = [
+                    found.get(key) if feedback is None else feedback
+                    for (key, _), feedback in zip(lookups, results)
+                ]
+            except Exception as e:
+                logger.warning(f"Feedback memo lookup failed: {str(e)}")
+
+        for (_, question_type), feedback in zip(lookups, results):
+            self._count(question_type, 'hits' if feedback is not None else 'misses')
+        await self._aflush_stats()
+        return results
+
+    def set(self, key: str, feedback: Dict) -> None:
+        """Memoize feedback for key, evicting the least recently used entries beyond the size bound"""
+        self._set_local(key, feedback)
+        try:
+            pipeline = self.redis_client.pipeline()
+            pipeline.setex(key, self.ttl, json.dumps(feedback))
+            pipeline.zadd(self.INDEX_KEY, {key: time.time()})
+            pipeline.zcard(self.INDEX_KEY)
+            _, _, size = pipeline.execute()
+
+            if size > self.max_entries:
+                evicted = [member for member, _ in self.redis_client.zpopmin(self.INDEX_KEY, size - self.max_entries)]
+                if evicted:
+                    self.redis_client.delete(*evicted)
+        except Exception as e:
+            logger.warning(f"Feedback memo store failed: {str(e)}")
+
+    async def aset(self, key: str, feedback: Dict) -> None:
+        """Async set() on the asyncio client"""
+        self._set_local(key, feedback)
+        redis_client = self._async_client()
+        try:
+            def build(pipeline):
+                pipeline.setex(key, self.ttl, json.dumps(feedback))
+                pipeline.zadd(self.INDEX_KEY, {key: time.time()})
+                pipeline.zcard(self.INDEX_KEY)
+
+            _, _, size = await run_async_pipeline(build, transaction=True, redis_client=redis_client)
+
+            if size > self.max_entries:
+                evicted = [member for member, _ in await redis_client.zpopmin(self.INDEX_KEY, size - self.max_entries)]
+                if evicted:
+                    await redis_client.delete(*evicted)
+        except Exception as e:
+            logger.warning(f"Feedback memo store failed: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Return hit/miss counts and hit rate per question type"""
+        self._flush_stats(force=True)
+        stats = {}
+        for stats_key in self.redis_client.scan_iter(match=f"{self.STATS_KEY_PREFIX}:{self.namespace}:*"):
+            stats_key = stats_key.decode() if isinstance(stats_key, bytes) else stats_key
+            question_type = stats_key.rsplit(':', 1)[-1]
+            counters = {
+                (field.decode() if isinstance(field, bytes) else field): int(value)
+                for field, value in self.redis_client.hgetall(stats_key).items()
+            }
+            lookups = counters.get('hits', 0) + counters.get('misses', 0)
+            stats[question_type] = {
+                'hits': counters.get('hits', 0),
+                'misses': counters.get('misses', 0),
+                'hit_rate': counters.get('hits', 0) / lookups if lookups else 0.0
+            }
+        return stats
+
+    def _get_local(self, key: str) -> Optional[Dict]:
+        with self._local_lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, feedback = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+        # Entries are shared by every request in the process, so callers only ever see copies
+        return copy.deepcopy(feedback)
+
+    def _set_local(self, key: str, feedback: Dict) -> None:
+        feedback = copy.deepcopy(feedback)
+        with self._local_lock:
+            self._local[key] = (time.monotonic() + self.ttl, feedback)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def _record(self, question_type: str, counter: str) -> None:
+        """Count locally and push to Redis periodically so hits stay off the network"""
+        self._count(question_type, counter)
+        self._flush_stats()
+
+    async def _arecord(self, question_type: str, counter: str) -> None:
+        self._count(question_type, counter)
+        await self._aflush_stats()
+
+    def _count(self, question_type: str, counter: str) -> None:
+        with self._local_lock:
+            FeedbackMemo._pending_stats[(self.namespace, question_type, counter)] += 1
+
+    def _flush_stats(self, force: bool = False) -> None:
+        pending = self._take_pending(force)
+        if not pending:
+            return
+        try:
+            pipeline = self.redis_client.pipeline()
+            self._queue_stats(pipeline, pending)
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Failed to flush feedback memo stats: {str(e)}")
+
+    async def _aflush_stats(self) -> None:
+        pending = self._take_pending()
+        if not pending:
+            return
+        try:
+            await run_async_pipeline(lambda pipeline: self._queue_stats(pipeline, pending),
+                                     redis_client=self._async_client())
+        except Exception as e:
+            logger.warning(f"Failed to flush feedback memo stats: {str(e)}")
+
+    def _take_pending(self, force: bool = False) -> Counter:
+        with self._local_lock:
+            now = time.monotonic()
+            if not force and now - FeedbackMemo._last_stats_flush < self.STATS_FLUSH_INTERVAL:
+                return Counter()
+            pending = FeedbackMemo._pending_stats
+            FeedbackMemo._pending_stats = Counter()
+            FeedbackMemo._last_stats_flush = now
+        return pending
+
+    def _queue_stats(self, pipeline, pending: Counter) -> None:
+        for (namespace, question_type, counter), count in pending.items():
+            pipeline.hincrby(f"{self.STATS_KEY_PREFIX}:{namespace}:{question_type}", counter, count)
+
+    def _async_client(self):
+        return self.async_redis_client or get_async_redis()
+
+    @staticmethod
+    def _normalize(answer: str) -> str:
+        return ' '.join(str(answer).split()).casefold()
@@ -1,7 +1,11 @@
-from typing import Dict, Optional
+from typing import Dict, Iterator, Optional, Tuple, Union
+from datetime import datetime
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
 from ..models import UserFeedback, UserCourseEnrollment, Module
 from Oauth.models import User
+import base64
 import logging
 import uuid
 
@@ -12,6 +16,9 @@ class FeedbackModule:
 
     def __init__(self):
         self.logger = logger
+        self.page_size = getattr(settings, 'FEEDBACK_PAGE_SIZE', 50)
+        self.max_page_size = getattr(settings, 'FEEDBACK_PAGE_MAX_SIZE', 200)
+        self.export_chunk_size = getattr(settings, 'FEEDBACK_EXPORT_CHUNK_SIZE', 1000)
 
     def create_course_feedback(
         self, 
@@ -33,7 +40,7 @@ class FeedbackModule:
             
             feedback = UserFeedback.objects.create(
                 user_id=user_id,
-                enrollment=enrollment,
+                course_id=enrollment.course_id,
                 module_id=module_id,
                 quiz_feedback={
                     'content_delivery': content_delivery_feedback or {},
@@ -63,7 +70,7 @@ class FeedbackModule:
             )
             feedback, _ = UserFeedback.objects.get_or_create(
                 user_id=user_id,
-                enrollment=enrollment,
+                course_id=enrollment.course_id,
                 module_id=module_id
             )
             
@@ -95,7 +102,7 @@ class FeedbackModule:
             )
             feedback, _ = UserFeedback.objects.get_or_create(
                 user_id=user_id,
-                enrollment=enrollment,
+                course_id=enrollment.course_id,
                 module_id=module_id
             )
             
@@ -121,7 +128,9 @@ class FeedbackModule:
         try:
             enrollment = UserCourseEnrollment.objects.get(id=enrollment_id)
             feedback, _ = UserFeedback.objects.get_or_create(
-                enrollment=enrollment
+                user_id=enrollment.user_id,
+                course_id=enrollment.course_id,
+                module_id=None
             )
             
             current_feedback = feedback.quiz_feedback.get('learning_experience', {})
@@ -138,38 +147,152 @@ class FeedbackModule:
         self, 
         user_id: Optional[uuid.UUID] = None,
         enrollment_id: Optional[int] = None,
-        module_id: Optional[int] = None
+        module_id: Optional[int] = None,
+        course_id: Optional[int] = None,
+        updated_after: Optional[datetime] = None,
+        updated_before: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[Union[int, str]] = None
     ) -> Dict:
         """
-        Retrieve feedback for course delivery and platform experience
+        Retrieve one page of feedback for course delivery and platform experience, newest first
+
+        Args:
+            updated_after: Only feedback updated at or after this time
+            updated_before: Only feedback updated before this time
+            cursor: next_cursor of the previous page
+            limit: Page size (a positive integer, or its string from a query parameter),
+                capped at FEEDBACK_PAGE_MAX_SIZE
+
+        Raises:
+            ValidationError: If cursor or limit is malformed
+
+        Returns:
+            Dict with the page's feedbacks and the next_cursor (None on the last page)
         """
+        position = self._decode_cursor(cursor) if cursor else None
+        limit = min(self._parse_limit(limit) if limit is not None else self.page_size, self.max_page_size)
         try:
-            query = UserFeedback.objects.all()
-            
-            if user_id:
-                query = query.filter(user_id=user_id)
-            if enrollment_id:
-                query = query.filter(enrollment_id=enrollment_id)
-            if module_id:
-                query = query.filter(module_id=module_id)
-
-            feedbacks = query.order_by('-updated_at')
-            
+            query = self.feedback_queryset(
+                user_id, enrollment_id, module_id, course_id, updated_after, updated_before
+            )
+            # One extra row tells whether there is a next page
+            feedbacks = list(self._after(query, position)[:limit + 1])
+            next_cursor = None
+            if len(feedbacks) > limit:
+                feedbacks = feedbacks[:limit]
+                next_cursor = self._encode_cursor(feedbacks[-1])
+
             return {
-                'feedbacks': [
-                    {
-                        'user_id': feedback.user_id,
-                        'user_email': feedback.user.email,
-                        'course_name': feedback.enrollment.course.title,
-                        'module_id': feedback.module_id,
-                        'content_delivery': feedback.quiz_feedback.get('content_delivery', {}),
-                        'platform_experience': feedback.quiz_feedback.get('platform_experience', {}),
-                        'learning_experience': feedback.quiz_feedback.get('learning_experience', {}),
-                        'updated_at': feedback.updated_at
-                    }
-                    for feedback in feedbacks
-                ]
+                'feedbacks': [self._serialize(feedback) for feedback in feedbacks],
+                'next_cursor': next_cursor
             }
         except Exception as e:
             self.logger.error(f"Error retrieving course feedback: {str(e)}")
-            return {'feedbacks': []}
\ No newline at end of file
+            return {'feedbacks': [], 'next_cursor': None}
+
+    def iter_course_feedback(
+        self,
+        user_id: Optional[uuid.UUID] = None,
+        enrollment_id: Optional[int] = None,
+        module_id: Optional[int] = None,
+        course_id: Optional[int] = None,
+        updated_after: Optional[datetime] = None,
+        updated_before: Optional[datetime] = None
+    ) -> Iterator[Dict]:
+        """
+        Stream every matching feedback, newest first, for exports
+
+        Walks the same keyset as get_course_feedback in FEEDBACK_EXPORT_CHUNK_SIZE
+        batches, so memory stays flat and no query holds a cursor open between batches.
+        """
+        query = self.feedback_queryset(user_id, enrollment_id, module_id, course_id, updated_after, updated_before)
+        position = None
+        while True:
+            feedbacks = list(self._after(query, position)[:self.export_chunk_size])
+            for feedback in feedbacks:
+                yield self._serialize(feedback)
+            if len(feedbacks) < self.export_chunk_size:
+                return
+            position = (feedbacks[-1].updated_at, feedbacks[-1].id)
+
+    def feedback_queryset(
+        self,
+        user_id: Optional[uuid.UUID] = None,
+        enrollment_id: Optional[int] = None,
+        module_id: Optional[int] = None,
+        course_id: Optional[int] = None,
+        updated_after: Optional[datetime] = None,
+        updated_before: Optional[datetime] = None
+    ) -> QuerySet:
+        """Filtered feedback in keyset order, joined with and projected to the columns serialized"""
+        query = UserFeedback.objects.select_related('user', 'course').only(
+            'id', 'user_id', 'module_id', 'quiz_feedback', 'updated_at', 'user__email', 'course__title'
+        )
+
+        if user_id:
+            query = query.filter(user_id=user_id)
+        if enrollment_id:
+            # Feedback belongs to the enrollment's learner and course
+            enrollment = UserCourseEnrollment.objects.filter(id=enrollment_id).values('user_id', 'course_id').first()
+            if enrollment is None:
+                return query.none()
+            query = query.filter(**enrollment)
+        if module_id:
+            query = query.filter(module_id=module_id)
+        if course_id:
+            query = query.filter(course_id=course_id)
+        if updated_after:
+            query = query.filter(updated_at__gte=updated_after)
+        if updated_before:
+            query = query.filter(updated_at__lt=updated_before)
+
+        return query.order_by('-updated_at', '-id')
+
+    @staticmethod
+    def _after(query: QuerySet, position: Optional[Tuple[datetime, int]]) -> QuerySet:
+        """Rows after a (updated_at, id) keyset position in newest-first order"""
+        if position is None:
+            return query
+        updated_at, feedback_id = position
+        return query.filter(Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=feedback_id))
+
+    @staticmethod
+    def _serialize(feedback: UserFeedback) -> Dict:
+        return {
+            'user_id': feedback.user_id,
+            'user_email': feedback.user.email,
+            'course_name': feedback.course.title,
+            'module_id': feedback.module_id,
+            'content_delivery': feedback.quiz_feedback.get('content_delivery', {}),
+            'platform_experience': feedback.quiz_feedback.get('platform_experience', {}),
+            'learning_experience': feedback.quiz_feedback.get('learning_experience', {}),
+            'updated_at': feedback.updated_at
+        }
+
+    @staticmethod
+    def _parse_limit(limit) -> int:
+        # bool is an int subclass, and int() would silently truncate floats
+        if isinstance(limit, (bool, float)):
+            raise ValidationError("Invalid feedback page size")
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            raise ValidationError("Invalid feedback page size")
+        if limit < 1:
+            raise ValidationError("Feedback page size must be at least 1")
+        return limit
+
+    @staticmethod
+    def _encode_cursor(feedback: UserFeedback) -> str:
+        position = f"{feedback.updated_at.isoformat()}|{feedback.id}"
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        try:
+            updated_at, feedback_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            position = (datetime.fromisoformat(updated_at), int(feedback_id))
+        except (ValueError, UnicodeDecodeError):
+            raise ValidationError("Invalid feedback cursor")
+        return position
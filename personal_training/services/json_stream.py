@@ -0,0 +1,101 @@
+import json
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalArrayParser:
+    """
+    Incremental parser that extracts objects from a JSON array as text streams in
+
+    Feed it chunks of a response such as {"questions": [{...}, {...}]} and it
+    returns every element of the named array as soon as its closing brace
+    arrives, without waiting for the rest of the document.
+    """
+
+    def __init__(self, array_key: str = 'questions'):
+        self.array_key = array_key
+        self._buffer = ''
+        self._position = 0  # next character of the buffer to scan
+        self._in_array = False
+        self._depth = 0  # brace depth inside the current array element
+        self._in_string = False
+        self._escaped = False
+        self._object_start: Optional[int] = None
+        self.finished = False
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """
+        Add a chunk of response text
+
+        Returns:
+            Array elements completed by this chunk, in order
+        """
+        self._buffer += chunk
+        completed = []
+
+        if not self._in_array and not self._find_array_start():
+            return completed
+
+        while self._position < len(self._buffer) and not self.finished:
+            char = self._buffer[self._position]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                if self._depth == 0:
+                    self._object_start = self._position
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0 and self._object_start is not None:
+                    element = self._decode(self._buffer[self._object_start:self._position + 1])
+                    if element is not None:
+                        completed.append(element)
+                    self._object_start = None
+            elif char == ']' and self._depth == 0:
+                self.finished = True
+
+            self._position += 1
+
+        self._compact()
+        return completed
+
+    def _find_array_start(self) -> bool:
+        """Skip ahead to the opening bracket of the target array"""
+        key_index = self._buffer.find(f'"{self.array_key}"')
+        if key_index == -1:
+            return False
+
+        bracket_index = self._buffer.find('[', key_index)
+        if bracket_index == -1:
+            return False
+
+        self._in_array = True
+        self._position = bracket_index + 1
+        return True
+
+    def _compact(self) -> None:
+        """Drop text that has already been consumed"""
+        keep_from = self._object_start if self._object_start is not None else self._position
+        if keep_from > 0:
+            self._buffer = self._buffer[keep_from:]
+            self._position -= keep_from
+            if self._object_start is not None:
+                self._object_start = 0
+
+    @staticmethod
+    def _decode(text: str) -> Optional[Dict]:
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            logger.warning("Skipping malformed array element in streamed response")
+            return None
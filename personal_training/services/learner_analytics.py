@@ -0,0 +1,232 @@
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db.models import Avg, Count, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from personal_training.models import (
+    LearnerAnalytics, LearningActivity, Module, PerformanceMetric, UserFeedback, UserModuleProgress
+)
+from .redis_pool import get_redis, run_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+class LearnerAnalyticsStore:
+    """
+    The LearnerAnalytics table and the Redis keys cached in front of it
+
+    Rows are recomputed from UserModuleProgress, PerformanceMetric and
+    LearningActivity for just the learner/course pairs whose source rows
+    changed: one pair when a source row is saved, or every pair touched since
+    the last catch-up run for catch-up runs. Each refresh writes the row and
+    its Redis keys. Readers go to Redis first and fall back to the row (computing
+    it when absent) on a miss, so evicted or flushed keys never read as zeros.
+    """
+
+    FIELDS = ('completed_items', 'total_items', 'learning_patterns', 'topic_performance')
+    WATERMARK_KEY = "learner_analytics:watermark"  # start time of the last successful catch-up run
+
+    def __init__(self, redis_client=None):
+        self.redis_client = redis_client
+        self.cache_ttl = getattr(settings, 'LEARNER_ANALYTICS_CACHE_TTL', 60 * 60 * 24)
+        self.batch_size = getattr(settings, 'LEARNER_ANALYTICS_BATCH_SIZE', 1000)
+
+    @staticmethod
+    def keys(user_id, course_id: int) -> Dict[str, str]:
+        """LearnerAnalytics field -> Redis key caching it"""
+        course_key = f"course_progress:{user_id}:{course_id}"
+        return {
+            'completed_items': f"{course_key}:completed",
+            'total_items': f"{course_key}:total",
+            'learning_patterns': f"learning_patterns:{user_id}:{course_id}",
+            'topic_performance': f"topic_performance:{user_id}:{course_id}",
+        }
+
+    def get(self, user_id, course_id: int) -> Dict:
+        """Field values for a learner and course, from the table, caching them again"""
+        row = LearnerAnalytics.objects.filter(user_id=user_id, course_id=course_id).first()
+        if row is None:
+            row = self.refresh(user_id, course_id)
+        else:
+            self.cache([row])
+        return self._values(row)
+
+    def refresh(self, user_id, course_id: int) -> LearnerAnalytics:
+        """Recompute one learner's row for a course and cache it"""
+        return self.refresh_pairs([(user_id, course_id)])[0]
+
+    def refresh_pairs(self, pairs: Iterable[Tuple]) -> List[LearnerAnalytics]:
+        """Recompute the rows of (user_id, course_id) pairs in batches per course, then cache them"""
+        users_by_course = defaultdict(list)
+        for user_id, course_id in dict.fromkeys(pairs):
+            users_by_course[course_id].append(user_id)
+
+        refreshed = []
+        for course_id, user_ids in users_by_course.items():
+            for start in range(0, len(user_ids), self.batch_size):
+                rows = self._compute(course_id, user_ids[start:start + self.batch_size])
+                LearnerAnalytics.objects.bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=['user', 'course'],
+                    update_fields=['completed_items', 'total_items', 'topic_performance',
+                                   'learning_patterns', 'refreshed_at']
+                )
+                self.cache(rows)
+                refreshed.extend(rows)
+        return refreshed
+
+    def refresh_changed(self, since: Optional[datetime] = None, course_id: Optional[int] = None,
+                        full: bool = False) -> int:
+        """
+        Refresh every pair whose source rows changed since a time
+
+        A run that starts from the stored watermark (or a full run) records
+        its own start time as the next watermark once it succeeds, so changes
+        saved while it ran are picked up by the next run. Course runs keep
+        their own watermark and never advance the all-courses one.
+
+        Args:
+            since: Defaults to the watermark of the last successful run;
+                everything is refreshed when there is none
+            course_id: Only refresh this course
+            full: Refresh every pair regardless of since
+
+        Returns:
+            Number of rows refreshed
+        """
+        started_at = timezone.now()
+        from_watermark = since is None or full
+        if full:
+            since = None
+        elif since is None:
+            since = self.watermark(course_id)
+
+        refreshed = len(self.refresh_pairs(self.changed_pairs(since, course_id)))
+        if from_watermark:
+            self._redis().set(self._watermark_key(course_id), started_at.isoformat())
+        return refreshed
+
+    def watermark(self, course_id: Optional[int] = None) -> Optional[datetime]:
+        """Start time of the last successful catch-up run (of the course, else of every course)"""
+        keys = [self._watermark_key(course_id)]
+        if course_id is not None:
+            keys.append(self._watermark_key(None))
+        marks = [parse_datetime(value.decode() if isinstance(value, bytes) else value)
+                 for value in self._redis().mget(keys) if value is not None]
+        return max(marks) if marks else None
+
+    @staticmethod
+    def changed_pairs(since: Optional[datetime], course_id: Optional[int] = None) -> Set[Tuple]:
+        """(user_id, course_id) pairs with source rows saved at or after since (all pairs for None)"""
+        sources = [
+            (UserModuleProgress.objects, 'user_id', 'module__course_id', 'last_accessed'),
+            (PerformanceMetric.objects, 'user_feedback__user_id', 'user_feedback__course_id', 'timestamp'),
+            (LearningActivity.objects, 'user_feedback__user_id', 'user_feedback__course_id', 'timestamp'),
+            (UserFeedback.objects, 'user_id', 'course_id', 'updated_at'),
+        ]
+        pairs = set()
+        for manager, user_field, course_field, changed_field in sources:
+            queryset = manager.order_by()
+            if since is not None:
+                queryset = queryset.filter(**{f"{changed_field}__gte": since})
+            if course_id is not None:
+                queryset = queryset.filter(**{course_field: course_id})
+            pairs.update(queryset.values_list(user_field, course_field).distinct())
+        return pairs
+
+    def warm(self, course_id: Optional[int] = None) -> int:
+        """Write the cached keys of every stored row (optionally one course's) to Redis"""
+        queryset = LearnerAnalytics.objects.order_by()
+        if course_id is not None:
+            queryset = queryset.filter(course_id=course_id)
+        batch = []
+        count = 0
+        for row in queryset.iterator(chunk_size=self.batch_size):
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                count += self.cache(batch)
+                batch = []
+        return count + self.cache(batch)
+
+    def cache(self, rows: List[LearnerAnalytics]) -> int:
+        """Write the rows' Redis keys in one pipeline and return how many rows were written"""
+        if not rows:
+            return 0
+        values = {}
+        for row in rows:
+            row_values = self._values(row)
+            for name, key in self.keys(row.user_id, row.course_id).items():
+                values[key] = json.dumps(row_values[name])
+
+        def build(pipeline):
+            for key, value in values.items():
+                pipeline.set(key, value, ex=self.cache_ttl)
+
+        try:
+            run_pipeline(build, redis_client=self.redis_client)
+        except Exception as e:
+            # The table stays correct; the next read repopulates the keys
+            logger.error(f"Error caching learner analytics for {len(rows)} rows: {str(e)}")
+            return 0
+        return len(rows)
+
+    def _redis(self):
+        return self.redis_client or get_redis()
+
+    def _watermark_key(self, course_id: Optional[int]) -> str:
+        return self.WATERMARK_KEY if course_id is None else f"{self.WATERMARK_KEY}:{course_id}"
+
+    @staticmethod
+    def _values(row: LearnerAnalytics) -> Dict:
+        return {name: getattr(row, name) for name in LearnerAnalyticsStore.FIELDS}
+
+    @staticmethod
+    def _compute(course_id: int, user_ids: List) -> List[LearnerAnalytics]:
+        """Fresh (unsaved) rows for a batch of learners of one course, a fixed number of queries per batch"""
+        total_items = Module.objects.filter(course_id=course_id).count()
+
+        completed = dict(
+            UserModuleProgress.objects.filter(
+                user_id__in=user_ids, module__course_id=course_id, completed_at__isnull=False
+            ).order_by().values_list('user_id').annotate(count=Count('id'))
+        )
+
+        topic_performance = defaultdict(dict)
+        scores = PerformanceMetric.objects.filter(
+            user_feedback__user_id__in=user_ids, user_feedback__course_id=course_id,
+            user_feedback__module__isnull=False, metric_type='quiz_score'
+        ).order_by().values_list('user_feedback__user_id', 'user_feedback__module__title').annotate(score=Avg('value'))
+        for user_id, topic, score in scores:
+            topic_performance[user_id][topic] = score
+        # Modules without individual scores use the stored average, unless no quiz was taken yet
+        averages = UserFeedback.objects.filter(
+            user_id__in=user_ids, course_id=course_id, module__isnull=False, average_quiz_score__gt=0
+        ).values_list('user_id', 'module__title', 'average_quiz_score')
+        for user_id, topic, score in averages:
+            topic_performance[user_id].setdefault(topic, score)
+
+        content_time = defaultdict(dict)
+        durations = LearningActivity.objects.filter(
+            user_feedback__user_id__in=user_ids, user_feedback__course_id=course_id
+        ).order_by().values_list('user_feedback__user_id', 'content_type').annotate(minutes=Sum('duration'))
+        for user_id, content_type, minutes in durations:
+            content_time[user_id][content_type] = minutes
+
+        return [
+            LearnerAnalytics(
+                user_id=user_id,
+                course_id=course_id,
+                completed_items=completed.get(user_id, 0),
+                total_items=total_items,
+                topic_performance=topic_performance.get(user_id, {}),
+                learning_patterns={'content_type_engagement': content_time.get(user_id, {})}
+            )
+            for user_id in user_ids
+        ]
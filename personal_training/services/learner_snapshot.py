@@ -0,0 +1,152 @@
+import json
+import logging
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+
+from .engagement import EngagementTracker
+from .learner_analytics import LearnerAnalyticsStore
+from .progress_history import ProgressHistory
+from .redis_pool import run_async_pipeline, run_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LearnerSnapshot:
+    """Every cached value a learner analysis for one user, course and optional module reads"""
+
+    user_id: int
+    course_id: int
+    module_id: Optional[int] = None
+    completed_items: float = 0
+    total_items: float = 1
+    # EngagementTracker.summarize output: counts, decayed rates, session length and score
+    engagement: Dict = field(default_factory=dict)
+    # Items completed per day over the loaded window, oldest first (today last)
+    daily_progress: List[float] = field(default_factory=list)
+    learning_patterns: Dict = field(default_factory=dict)
+    topic_performance: Dict[str, float] = field(default_factory=dict)
+    recent_activities: List = field(default_factory=list)
+    assessment_scores: List = field(default_factory=list)
+    module_progress: float = 0
+    module_scores: List = field(default_factory=list)
+    module_time_spent: float = 0
+
+
+class LearnerSnapshotLoader:
+    """
+    Loads a LearnerSnapshot in one pipelined round trip
+
+    The JSON values come from a single MGET, the daily progress window from a
+    single HMGET on the ProgressHistory hash and the engagement aggregates
+    from the EngagementTracker hashes. Missing keys and values
+    that are not valid JSON keep the snapshot's defaults, so an analysis over
+    a new learner sees empty data rather than an error.
+
+    The keys materialized in LearnerAnalytics are read through: when any of
+    them is missing from Redis, the values come from the table (which caches
+    them again) instead of defaulting to zeros.
+    """
+
+    def __init__(self, redis_client=None, async_redis_client=None):
+        self.redis_client = redis_client
+        self.async_redis_client = async_redis_client
+        self.analytics_store = LearnerAnalyticsStore(redis_client)
+
+    def load(self, user_id: int, course_id: int, module_id: Optional[int] = None,
+             progress_days: int = 7) -> LearnerSnapshot:
+        """Fetch the snapshot with the sync client, with daily progress for the last progress_days"""
+        keys = self.keys(user_id, course_id, module_id)
+        values, daily, user_engagement, course_engagement = run_pipeline(
+            self._queue(user_id, course_id, keys, progress_days), redis_client=self.redis_client
+        )
+        if self._analytics_missing(keys, values):
+            values = self._with_analytics(keys, values, self._read_through(user_id, course_id))
+        return self._build(user_id, course_id, module_id, keys, values, daily,
+                           EngagementTracker.summarize(user_engagement, course_engagement))
+
+    async def aload(self, user_id: int, course_id: int, module_id: Optional[int] = None,
+                    progress_days: int = 7) -> LearnerSnapshot:
+        """Fetch the snapshot with the event loop's asyncio client"""
+        keys = self.keys(user_id, course_id, module_id)
+        values, daily, user_engagement, course_engagement = await run_async_pipeline(
+            self._queue(user_id, course_id, keys, progress_days), redis_client=self.async_redis_client
+        )
+        if self._analytics_missing(keys, values):
+            analytics = await sync_to_async(self._read_through)(user_id, course_id)
+            values = self._with_analytics(keys, values, analytics)
+        return self._build(user_id, course_id, module_id, keys, values, daily,
+                           EngagementTracker.summarize(user_engagement, course_engagement))
+
+    @staticmethod
+    def keys(user_id: int, course_id: int, module_id: Optional[int] = None) -> Dict[str, str]:
+        """Snapshot field -> Redis key holding its value"""
+        performance_key = f"performance:{user_id}"
+        keys = {
+            **LearnerAnalyticsStore.keys(user_id, course_id),
+            'recent_activities': f"{performance_key}:recent_activities",
+            'assessment_scores': f"{performance_key}:assessment_scores",
+        }
+        if module_id:
+            module_key = f"{performance_key}:module:{module_id}"
+            keys.update({
+                'module_progress': f"{module_key}:progress",
+                'module_scores': f"{module_key}:scores",
+                'module_time_spent': f"{module_key}:time_spent",
+            })
+        return keys
+
+    def _read_through(self, user_id: int, course_id: int) -> Dict:
+        try:
+            return self.analytics_store.get(user_id, course_id)
+        except Exception as e:
+            # Unknown learner or course, or the database is unavailable: keep the defaults
+            logger.warning(f"Learner analytics read-through failed for {user_id}:{course_id}: {str(e)}")
+            return {}
+
+    @staticmethod
+    def _analytics_missing(keys: Dict[str, str], values: List[Any]) -> bool:
+        return any(
+            value is None for name, value in zip(keys, values) if name in LearnerAnalyticsStore.FIELDS
+        )
+
+    @staticmethod
+    def _with_analytics(keys: Dict[str, str], values: List[Any], analytics: Dict) -> List[Any]:
+        """MGET values with the materialized fields replaced by the table's values, as JSON"""
+        return [
+            json.dumps(analytics[name]) if name in analytics else value
+            for name, value in zip(keys, values)
+        ]
+
+    @staticmethod
+    def _queue(user_id: int, course_id: int, keys: Dict[str, str], progress_days: int):
+        def build(pipeline):
+            pipeline.mget(list(keys.values()))
+            pipeline.hmget(ProgressHistory.key(user_id, course_id), ProgressHistory.day_fields(progress_days))
+            pipeline.hgetall(EngagementTracker.user_key(user_id))
+            pipeline.hgetall(EngagementTracker.course_key(user_id, course_id))
+        return build
+
+    @staticmethod
+    def _build(user_id: int, course_id: int, module_id: Optional[int],
+               keys: Dict[str, str], values: List[Any], daily: List[Any],
+               engagement: Dict) -> LearnerSnapshot:
+        snapshot = LearnerSnapshot(user_id=user_id, course_id=course_id, module_id=module_id,
+                                   daily_progress=ProgressHistory.parse(daily), engagement=engagement)
+        defaults = {snapshot_field.name: getattr(snapshot, snapshot_field.name) for snapshot_field in fields(snapshot)}
+        for name, key, value in zip(keys, keys.values(), values):
+            if value is None:
+                continue
+            try:
+                decoded = json.loads(value)
+            except ValueError:
+                logger.warning(f"Ignoring malformed learner data at {key}")
+                continue
+            # Keep the default when the stored value has the wrong shape
+            if isinstance(defaults[name], (dict, list)) and not isinstance(decoded, type(defaults[name])):
+                logger.warning(f"Ignoring learner data of unexpected type at {key}")
+                continue
+            setattr(snapshot, name, decoded)
+        return snapshot
@@ -0,0 +1,118 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, AsyncIterator, Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClient:
+    """
+    Process-wide Gemini client shared by every service that talks to the model
+
+    The SDK is imported and configured on first use, so processes that never
+    call the model (management commands, workers) skip the slow import. Calls
+    go through the SDK's native async API, whose channel stays open between
+    requests instead of hopping through a thread per call.
+    """
+
+    def __init__(self, model_name: Optional[str] = None):
+        self.model_name = model_name or getattr(settings, 'GEMINI_MODEL', 'gemini-1.5-flash')
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        """The configured GenerativeModel, created on first access"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import google.generativeai as genai
+
+                    api_key = os.getenv('GEMINI_API_KEY') or settings.GEMINI_API_KEY
+                    genai.configure(api_key=api_key)
+                    self._model = genai.GenerativeModel(self.model_name)
+                    logger.info(f"Initialized Gemini model {self.model_name}")
+        return self._model
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        """Generate a complete response and return its text"""
+        response = await self.model.generate_content_async(prompt, **kwargs)
+        return response.text
+
+    async def generate_json(self, prompt: str, response_schema: Optional[Dict] = None) -> Any:
+        """
+        Generate a JSON response and parse it in a single pass
+        
+        Args:
+            prompt: The prompt to send
+            response_schema: Optional Gemini schema constraining the response shape
+        """
+        response_text = await self.generate(
+            prompt, generation_config=self._json_generation_config(response_schema)
+        )
+        return parse_json_response(response_text)
+
+    async def stream(self, prompt: str, response_schema: Optional[Dict] = None, **kwargs) -> AsyncIterator[str]:
+        """Generate a response and yield its text chunk by chunk"""
+        if response_schema is not None:
+            kwargs['generation_config'] = self._json_generation_config(response_schema)
+        response = await self.model.generate_content_async(prompt, stream=True, **kwargs)
+        async for chunk in response:
+            yield chunk.text
+
+    def _json_generation_config(self, response_schema: Optional[Dict]) -> Optional[Dict]:
+        """Ask the model for schema-constrained JSON when structured output is enabled"""
+        if not getattr(settings, 'GEMINI_STRUCTURED_OUTPUT', True):
+            return None
+        generation_config = {'response_mime_type': 'application/json'}
+        if response_schema is not None:
+            generation_config['response_schema'] = response_schema
+        return generation_config
+
+
+def parse_json_response(response_text: str) -> Any:
+    """
+    Parse a model response as JSON
+    
+    Structured output is plain JSON and parses directly; otherwise the outermost
+    JSON object is cut out of any surrounding text (e.g. markdown fences) first.
+    """
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        pass
+
+    start = response_text.find('{')
+    end = response_text.rfind('}') + 1
+    if start == -1 or end == 0:
+        raise ValueError("No JSON object found in response")
+
+    try:
+        return json.loads(response_text[start:end])
+    except json.JSONDecodeError:
+        raise ValueError("Invalid JSON structure in response")
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Return the shared LLM client for the configured LLM_PROVIDER, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                provider = getattr(settings, 'LLM_PROVIDER', 'gemini')
+                if provider == 'fake':
+                    from .fake_llm import FakeLLMClient
+                    _client = FakeLLMClient()
+                elif provider == 'gemini':
+                    _client = LLMClient()
+                else:
+                    raise ValueError(f"Unknown LLM_PROVIDER: {provider}")
+    return _client
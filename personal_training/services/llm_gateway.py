@@ -0,0 +1,309 @@
+import asyncio
+import copy
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+import weakref
+from collections import Counter
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from django.conf import settings
+
+from .llm_client import LLMClient, get_llm_client
+from .llm_resilience import LLMResilience, LLMUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+class _LoopState:
+    """Scheduler state for one event loop (asyncio primitives cannot cross loops)"""
+
+    def __init__(self):
+        self.queue = []  # heap of (priority, seq, prompt_type, waiter future)
+        self.running = Counter()  # prompt type -> calls in flight
+        self.total_running = 0
+        self.in_flight: Dict[str, '_SharedCall'] = {}  # prompt key -> shared call
+        self.batches: Dict[str, '_PendingBatch'] = {}
+        self.tasks = set()  # strong references to shared call and batch tasks
+
+
+class _SharedCall:
+    """A model call in flight and the number of callers still waiting for it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _PendingBatch:
+    """Items collected for one micro-batch while its window is open"""
+
+    def __init__(self, run_batch: Callable[[List[Any]], Awaitable[List[Any]]]):
+        self.run_batch = run_batch
+        self.items = []
+        self.futures = []
+        self.flush_handle = None
+
+
+class LLMGateway:
+    """
+    Single entry point for every Gemini call in the process
+
+    Calls wait in a priority queue and are admitted under a global concurrency
+    cap and a cap per prompt type, so background work (bank refills, analytics)
+    cannot starve interactive feedback. Identical prompts already in flight
+    share one model call, and small feedback prompts arriving within a short
+    window can be folded into a single batched call. Each admitted call then
+    runs under LLMResilience (shared rate limit, circuit breaker, deadline and
+    optional hedging).
+    """
+
+    PRIORITY_INTERACTIVE = 0
+    PRIORITY_NORMAL = 1
+    PRIORITY_BACKGROUND = 2
+
+    # Default priority per prompt type; callers may override per call
+    PROMPT_TYPE_PRIORITIES = {
+        'feedback': PRIORITY_INTERACTIVE,
+        'quiz': PRIORITY_NORMAL,
+        'analysis': PRIORITY_BACKGROUND
+    }
+
+    def __init__(self, client: Optional[LLMClient] = None, resilience: Optional[LLMResilience] = None):
+        self.client = client or get_llm_client()
+        self.resilience = resilience or LLMResilience()
+        self.max_concurrency = getattr(settings, 'LLM_GATEWAY_MAX_CONCURRENCY', 12)
+        self.type_concurrency = getattr(settings, 'LLM_GATEWAY_TYPE_CONCURRENCY', {})
+        self.batch_window = getattr(settings, 'LLM_GATEWAY_BATCH_WINDOW_MS', 25) / 1000
+        self.batch_max_size = getattr(settings, 'LLM_GATEWAY_BATCH_MAX_SIZE', 10)
+        self.stats = Counter()
+        self._seq = itertools.count()
+        self._states = weakref.WeakKeyDictionary()
+
+    async def generate_json(self, prompt: str, prompt_type: str,
+                            response_schema: Optional[Dict] = None,
+                            priority: Optional[int] = None) -> Any:
+        """
+        Generate and parse a JSON response through the queue
+
+        Args:
+            prompt: The prompt to send
+            prompt_type: Caller category used for concurrency caps ('quiz', 'feedback', 'analysis')
+            response_schema: Optional Gemini schema constraining the response shape
+            priority: Lower runs first; defaults to the prompt type's priority
+        """
+        state = self._state()
+        key = self._prompt_key(prompt_type, prompt, response_schema)
+        self.stats['requests'] += 1
+
+        shared = state.in_flight.get(key)
+        if shared is None:
+            # The call runs in a task no caller owns, so a cancelled caller cannot cancel it for the others
+            task = asyncio.get_running_loop().create_task(
+                self._call(state, prompt, prompt_type, response_schema, priority)
+            )
+            shared = state.in_flight[key] = _SharedCall(task)
+            state.tasks.add(task)
+            task.add_done_callback(state.tasks.discard)
+            task.add_done_callback(lambda _: self._forget(state, key, shared))
+        else:
+            self.stats['coalesced'] += 1
+
+        shared.waiters += 1
+        try:
+            result = await asyncio.shield(shared.task)
+        except asyncio.CancelledError:
+            shared.waiters -= 1
+            if shared.waiters == 0 and not shared.task.done():
+                # Nobody wants the result any more; later callers start a fresh call
+                self._forget(state, key, shared)
+                shared.task.cancel()
+            raise
+        # Every caller gets its own copy, so one modifying its result cannot change the others'
+        return copy.deepcopy(result)
+
+    async def stream(self, prompt: str, prompt_type: str, response_schema: Optional[Dict] = None,
+                     priority: Optional[int] = None) -> AsyncIterator[str]:
+        """Stream a response through the queue, holding a slot until the stream ends"""
+        state = self._state()
+        self.stats['requests'] += 1
+        await self._acquire(state, prompt_type, priority)
+        try:
+            deadline = self.resilience.deadline_for(prompt_type)
+            await self.resilience.admit(prompt_type, deadline)
+            chunks = self.client.stream(prompt, response_schema=response_schema).__aiter__()
+            error = None
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), max(deadline - time.monotonic(), 0))
+                    except StopAsyncIteration:
+                        break
+                    yield chunk
+            except asyncio.TimeoutError as e:
+                error = e
+                await self.resilience.metrics.aincr('deadline_exceeded')
+                raise LLMUnavailableError(f"Gemini {prompt_type} stream exceeded its deadline")
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                self.resilience.record(prompt_type, error=error)
+        finally:
+            self._release(state, prompt_type)
+
+    async def batch(self, batch_key: str, item: Any,
+                    run_batch: Callable[[List[Any]], Awaitable[List[Any]]]) -> Any:
+        """
+        Fold small requests arriving within LLM_GATEWAY_BATCH_WINDOW_MS into one call
+
+        Args:
+            batch_key: Requests with the same key are batched together
+            item: This caller's request
+            run_batch: Coroutine function turning the collected items into results
+                       in the same order; it should call generate_json itself
+
+        Returns:
+            This caller's result from run_batch
+        """
+        if self.batch_window <= 0:
+            return (await run_batch([item]))[0]
+
+        state = self._state()
+        loop = asyncio.get_running_loop()
+        pending = state.batches.get(batch_key)
+        if pending is None:
+            pending = state.batches[batch_key] = _PendingBatch(run_batch)
+            pending.flush_handle = loop.call_later(self.batch_window, self._flush_batch, state, batch_key)
+
+        result = loop.create_future()
+        pending.items.append(item)
+        pending.futures.append(result)
+        if len(pending.items) >= self.batch_max_size:
+            pending.flush_handle.cancel()
+            self._flush_batch(state, batch_key)
+
+        return await result
+
+    async def _call(self, state: _LoopState, prompt: str, prompt_type: str,
+                    response_schema: Optional[Dict], priority: Optional[int]) -> Any:
+        """One model call through the queue, shared by every caller of an identical prompt"""
+        await self._acquire(state, prompt_type, priority)
+        try:
+            return await self.resilience.call(
+                prompt_type, lambda: self.client.generate_json(prompt, response_schema=response_schema)
+            )
+        finally:
+            self._release(state, prompt_type)
+
+    @staticmethod
+    def _forget(state: _LoopState, key: str, shared: '_SharedCall') -> None:
+        if state.in_flight.get(key) is shared:
+            del state.in_flight[key]
+
+    async def aget_stats(self) -> Dict:
+        """Return queue depth, calls in flight and lifetime counters for the current loop"""
+        state = self._state()
+        return {
+            'queued': len(state.queue),
+            'running': dict(state.running),
+            'in_flight_prompts': len(state.in_flight),
+            'circuit_state': self.resilience.breaker.state,
+            'resilience': await self.resilience.metrics.aget_stats(),
+            **self.stats
+        }
+
+    async def _acquire(self, state: _LoopState, prompt_type: str, priority: Optional[int]) -> None:
+        """Wait in the priority queue until a slot for prompt_type is free"""
+        if priority is None:
+            priority = self.PROMPT_TYPE_PRIORITIES.get(prompt_type, self.PRIORITY_NORMAL)
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(state.queue, (priority, next(self._seq), prompt_type, waiter))
+        self._dispatch(state)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as we were cancelled; hand the slot back
+                self._release(state, prompt_type)
+            raise
+
+    def _release(self, state: _LoopState, prompt_type: str) -> None:
+        state.running[prompt_type] -= 1
+        state.total_running -= 1
+        self._dispatch(state)
+
+    def _dispatch(self, state: _LoopState) -> None:
+        """Admit queued calls in priority order while global and per-type capacity remains"""
+        skipped = []
+        while state.queue and state.total_running < self.max_concurrency:
+            entry = heapq.heappop(state.queue)
+            _, _, prompt_type, waiter = entry
+            if waiter.done():
+                continue  # caller gave up while queued
+            if state.running[prompt_type] >= self.type_concurrency.get(prompt_type, self.max_concurrency):
+                skipped.append(entry)
+                continue
+            state.running[prompt_type] += 1
+            state.total_running += 1
+            waiter.set_result(None)
+
+        for entry in skipped:
+            heapq.heappush(state.queue, entry)
+
+    def _flush_batch(self, state: _LoopState, batch_key: str) -> None:
+        pending = state.batches.pop(batch_key, None)
+        if pending is None:
+            return
+        self.stats['batches'] += 1
+        self.stats['batched_items'] += len(pending.items)
+        task = asyncio.get_running_loop().create_task(self._run_batch(pending))
+        state.tasks.add(task)
+        task.add_done_callback(state.tasks.discard)
+
+    async def _run_batch(self, pending: _PendingBatch) -> None:
+        try:
+            results = await pending.run_batch(pending.items)
+            if len(results) != len(pending.items):
+                raise ValueError(f"Batch returned {len(results)} results for {len(pending.items)} items")
+        except Exception as e:
+            logger.error(f"LLM gateway batch failed: {str(e)}")
+            for future in pending.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result in zip(pending.futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            state = self._states[loop] = _LoopState()
+        return state
+
+    @staticmethod
+    def _prompt_key(prompt_type: str, prompt: str, response_schema: Optional[Dict]) -> str:
+        payload = json.dumps([prompt_type, prompt, response_schema], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Return the shared LLM gateway, creating it on first use"""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+    return _gateway
@@ -0,0 +1,315 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from django.conf import settings
+
+from .redis_pool import async_script, get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+# Strong references to metric increments running in the background so they are not garbage collected
+_metric_tasks = set()
+
+
+class LLMUnavailableError(Exception):
+    """Raised instead of calling the model when the circuit is open or the rate limit can't be met in time"""
+
+
+# Token bucket shared by every worker: refills at ARGV[1] tokens/second up to ARGV[2]
+# tokens. Takes ARGV[3] tokens if available and returns 0, otherwise returns the
+# milliseconds until enough tokens will have accumulated.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) / 1000 * rate)
+
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = math.ceil((requested - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return wait
+"""
+
+
+class RateLimiter:
+    """Redis token bucket limiting Gemini calls across all workers"""
+
+    KEY = "llm:ratelimit"
+
+    def __init__(self, metrics: 'LLMMetrics', redis_client=None):
+        self.metrics = metrics
+        self.rate = getattr(settings, 'GEMINI_RATE_LIMIT_PER_MINUTE', 300) / 60
+        self.capacity = getattr(settings, 'GEMINI_RATE_LIMIT_BURST', 20)
+        # Runs on an asyncio client; by default the shared one of whichever loop is calling
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT) if redis_client else None
+
+    async def acquire(self, deadline: float) -> None:
+        """
+        Wait for a token, raising LLMUnavailableError if none is free before deadline
+
+        Redis errors let the call through rather than blocking on the limiter.
+        """
+        limited = False
+        while True:
+            try:
+                script = self._script or async_script(TOKEN_BUCKET_SCRIPT)
+                wait_ms = int(await script(keys=[self.KEY], args=[self.rate, self.capacity, 1]))
+            except Exception as e:
+                logger.warning(f"Rate limiter unavailable, allowing call: {str(e)}")
+                return
+            if wait_ms <= 0:
+                return
+
+            if not limited:
+                limited = True
+                await self.metrics.aincr('rate_limited')
+            if time.monotonic() + wait_ms / 1000 > deadline:
+                await self.metrics.aincr('rate_limit_rejected')
+                raise LLMUnavailableError("Gemini rate limit exceeded")
+            await asyncio.sleep(wait_ms / 1000)
+
+
+class CircuitBreaker:
+    """
+    Per-process circuit breaker around the model provider
+
+    Opens after LLM_CIRCUIT_FAILURE_THRESHOLD consecutive failures and rejects
+    calls for LLM_CIRCUIT_RESET_TIMEOUT seconds, then lets a single trial call
+    through (half-open) and closes again once it succeeds.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, metrics: 'LLMMetrics'):
+        self.metrics = metrics
+        self.failure_threshold = getattr(settings, 'LLM_CIRCUIT_FAILURE_THRESHOLD', 5)
+        self.reset_timeout = getattr(settings, 'LLM_CIRCUIT_RESET_TIMEOUT', 30)
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+    def before_call(self) -> None:
+        """Raise LLMUnavailableError if calls are currently rejected"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.metrics.incr('circuit_rejected')
+                raise LLMUnavailableError("Gemini circuit breaker is open")
+            self._transition(self.HALF_OPEN)
+
+        if self.state == self.HALF_OPEN:
+            if self.trial_in_flight:
+                self.metrics.incr('circuit_rejected')
+                raise LLMUnavailableError("Gemini circuit breaker is half-open")
+            self.trial_in_flight = True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.trial_in_flight = False
+        if self.state != self.CLOSED:
+            self._transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            if self.state != self.OPEN:
+                self._transition(self.OPEN)
+
+    def _transition(self, state: str) -> None:
+        logger.warning(f"Gemini circuit breaker {self.state} -> {state}")
+        self.state = state
+        self.metrics.incr(f'circuit_{state}')
+
+
+class LLMMetrics:
+    """
+    Counters for limiter, breaker, deadline and hedging events, kept in a Redis hash
+
+    Coroutines record with aincr() and read with aget_stats() on the asyncio
+    client. incr() serves the breaker's sync code: inside a running loop it
+    hands the increment to a background task instead of blocking the loop on
+    the sync client.
+    """
+
+    KEY = "llm:metrics"
+
+    def __init__(self, redis_client, async_redis_client=None):
+        self.redis_client = redis_client
+        # Defaults to the shared asyncio client of whichever loop is calling
+        self.async_redis_client = async_redis_client
+
+    def incr(self, counter: str, amount: int = 1) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            try:
+                self.redis_client.hincrby(self.KEY, counter, amount)
+            except Exception as e:
+                logger.warning(f"Failed to record LLM metric {counter}: {str(e)}")
+            return
+
+        task = loop.create_task(self.aincr(counter, amount))
+        _metric_tasks.add(task)
+        task.add_done_callback(_metric_tasks.discard)
+
+    async def aincr(self, counter: str, amount: int = 1) -> None:
+        try:
+            await (self.async_redis_client or get_async_redis()).hincrby(self.KEY, counter, amount)
+        except Exception as e:
+            logger.warning(f"Failed to record LLM metric {counter}: {str(e)}")
+
+    def get_stats(self) -> Dict[str, int]:
+        return self._counts(self.redis_client.hgetall(self.KEY))
+
+    async def aget_stats(self) -> Dict[str, int]:
+        return self._counts(await (self.async_redis_client or get_async_redis()).hgetall(self.KEY))
+
+    @staticmethod
+    def _counts(fields: Dict) -> Dict[str, int]:
+        return {
+            field.decode() if isinstance(field, bytes) else field: int(value)
+            for field, value in fields.items()
+        }
+
+
+class LLMResilience:
+    """
+    Guards every model call with a shared rate limit, a circuit breaker and a deadline
+
+    Prompt types listed in LLM_HEDGE_PROMPT_TYPES also get a hedged duplicate
+    request once the first has been running longer than that type's recent p95
+    latency; whichever finishes first wins. Failures surface as exceptions, which
+    the services already turn into their default feedback.
+    """
+
+    LATENCY_SAMPLES = 200
+
+    def __init__(self, redis_client=None, async_redis_client=None):
+        self.metrics = LLMMetrics(redis_client or get_redis(), async_redis_client)
+        self.rate_limiter = RateLimiter(self.metrics, async_redis_client)
+        self.breaker = CircuitBreaker(self.metrics)
+        self.deadlines = getattr(settings, 'LLM_DEADLINES', {})
+        self.default_deadline = getattr(settings, 'LLM_DEFAULT_DEADLINE', 30)
+        self.hedge_prompt_types = set(getattr(settings, 'LLM_HEDGE_PROMPT_TYPES', []))
+        self.hedge_min_samples = getattr(settings, 'LLM_HEDGE_MIN_SAMPLES', 20)
+        self._latencies: Dict[str, deque] = {}
+
+    def deadline_for(self, prompt_type: str) -> float:
+        """Monotonic time by which a call of this prompt type must finish"""
+        return time.monotonic() + self.deadlines.get(prompt_type, self.default_deadline)
+
+    async def admit(self, prompt_type: str, deadline: float) -> None:
+        """Check the breaker and take a rate-limit token before calling the model"""
+        self.breaker.before_call()
+        try:
+            await self.rate_limiter.acquire(deadline)
+        except BaseException:
+            # No call is made, so release a half-open trial without judging the provider
+            self.breaker.trial_in_flight = False
+            raise
+
+    def record(self, prompt_type: str, error: Optional[BaseException] = None,
+               latency: Optional[float] = None) -> None:
+        """Report a finished call to the breaker and the latency history"""
+        # ValueError means the provider answered but the output was unusable
+        if error is None or isinstance(error, ValueError):
+            self.breaker.record_success()
+            if latency is not None:
+                self._latencies.setdefault(prompt_type, deque(maxlen=self.LATENCY_SAMPLES)).append(latency)
+        elif isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+            self.breaker.trial_in_flight = False
+        else:
+            self.breaker.record_failure()
+
+    async def call(self, prompt_type: str, make_call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run a model call under the limiter, breaker and deadline, hedging if enabled
+
+        Args:
+            prompt_type: Caller category ('quiz', 'feedback', 'analysis')
+            make_call: Coroutine factory performing one model call
+        """
+        deadline = self.deadline_for(prompt_type)
+        try:
+            return await asyncio.wait_for(
+                self._call_hedged(prompt_type, make_call, deadline),
+                max(deadline - time.monotonic(), 0)
+            )
+        except asyncio.TimeoutError:
+            await self.metrics.aincr('deadline_exceeded')
+            self.breaker.record_failure()
+            raise LLMUnavailableError(f"Gemini {prompt_type} call exceeded its deadline")
+
+    async def _call_hedged(self, prompt_type: str, make_call: Callable[[], Awaitable[Any]],
+                           deadline: float) -> Any:
+        hedge_delay = self._hedge_delay(prompt_type)
+        primary = asyncio.ensure_future(self._attempt(prompt_type, make_call, deadline))
+        attempts = {primary}
+        try:
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(attempts, timeout=hedge_delay)
+                if not done:
+                    try:
+                        await self.rate_limiter.acquire(deadline)
+                        await self.metrics.aincr('hedged')
+                        attempts.add(asyncio.ensure_future(
+                            self._attempt(prompt_type, make_call, deadline, admitted=True)
+                        ))
+                    except LLMUnavailableError:
+                        pass  # no budget for a duplicate; keep waiting on the primary
+
+            error = None
+            while attempts:
+                done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is not primary:
+                            await self.metrics.aincr('hedge_won')
+                        return attempt.result()
+                    error = attempt.exception()
+            raise error
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def _attempt(self, prompt_type: str, make_call: Callable[[], Awaitable[Any]],
+                       deadline: float, admitted: bool = False) -> Any:
+        if not admitted:
+            await self.admit(prompt_type, deadline)
+        started = time.monotonic()
+        try:
+            result = await make_call()
+        except BaseException as e:
+            self.record(prompt_type, error=e)
+            raise
+        self.record(prompt_type, latency=time.monotonic() - started)
+        return result
+
+    def _hedge_delay(self, prompt_type: str) -> Optional[float]:
+        """Recent p95 latency for the prompt type, or None when hedging does not apply"""
+        if prompt_type not in self.hedge_prompt_types:
+            return None
+        latencies = self._latencies.get(prompt_type)
+        if not latencies or len(latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(len(ordered) * 0.95) - 1)]
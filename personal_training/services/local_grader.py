@@ -0,0 +1,68 @@
+from typing import Dict, Optional
+
+
+class LocalGrader:
+    """
+    Deterministic grading and feedback built from the quiz data alone
+
+    MCQ answers are scored by comparing against the correct choice, and
+    feedback is assembled from the stored explanation, so no model call is
+    needed for them.
+    """
+
+    def can_grade(self, question: Dict) -> bool:
+        """Whether the question can be scored without the model"""
+        return question.get('question_type') == 'mcq' and bool(question.get('choices'))
+
+    def correct_answer(self, question: Dict) -> Optional[str]:
+        """The correct choice text for MCQs, or the model answer for open-ended questions"""
+        if question.get('question_type') == 'mcq':
+            return next(
+                (choice['choice_text'] for choice in question.get('choices', []) if choice.get('is_correct')),
+                None
+            )
+        return question.get('model_answer') or question.get('explanation')
+
+    def is_correct(self, question: Dict, answer: str) -> bool:
+        """Score an MCQ answer against the correct choice"""
+        correct_answer = self.correct_answer(question)
+        if correct_answer is None or answer is None:
+            return False
+        return self._normalize(answer) == self._normalize(correct_answer)
+
+    def build_feedback(self, question: Dict, answer: str) -> Dict:
+        """
+        Build feedback in the same shape as the model's answer feedback
+
+        Used for correct MCQ answers, and for every answer when a client
+        opts out of model feedback.
+        """
+        correct_answer = self.correct_answer(question)
+        explanation = question.get('explanation') or "Please review the related course materials"
+
+        if not self.can_grade(question):
+            return {
+                "strengths": "Thank you for sharing your response",
+                "areas_for_improvement": "Compare your response with the model answer",
+                "key_concepts": correct_answer or explanation,
+                "suggestions": "Reflect on the key points and revisit the related course materials"
+            }
+
+        if self.is_correct(question, answer):
+            return {
+                "strengths": f"Correct! You selected the right answer: {correct_answer}",
+                "areas_for_improvement": "None for this question",
+                "key_concepts": explanation,
+                "suggestions": "Keep building on this understanding in the next module"
+            }
+
+        return {
+            "strengths": "You attempted the question",
+            "areas_for_improvement": f"The correct answer is: {correct_answer}",
+            "key_concepts": explanation,
+            "suggestions": "Review the explanation and the related course materials"
+        }
+
+    @staticmethod
+    def _normalize(answer: str) -> str:
+        return ' '.join(str(answer).split()).casefold()
@@ -0,0 +1,95 @@
+import json
+import logging
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+from .redis_pool import async_script, get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] version counter; ARGV[1] feedback key prefix (the version is appended)
+# Returns the current version and the feedback cached under it, in one round trip
+LOOKUP_SCRIPT = """
+local version = redis.call('GET', KEYS[1]) or '0'
+return {version, redis.call('GET', ARGV[1] .. version)}
+"""
+
+
+class PerformanceFeedbackCache:
+    """
+    Generated performance feedback per user, module and time period, keyed by data version
+
+    Each user/module pair has a version counter that is bumped whenever new
+    performance data is committed for it (a PerformanceMetric or QuizAttempt
+    save, see signals.py). Feedback is cached under the version that was current when
+    its generation started, so a repeat view with no new data is a single
+    lookup, and a bump makes every older entry unreachable (they expire on
+    their own) without deleting anything.
+    """
+
+    KEY_PREFIX = "performance_feedback"
+
+    def __init__(self, redis_client=None):
+        # An asyncio client; defaults to the current event loop's shared one
+        self.redis_client = redis_client or get_async_redis()
+        self.ttl = getattr(settings, 'PERFORMANCE_FEEDBACK_CACHE_TTL', 60 * 60 * 24 * 7)
+        self._lookup = (redis_client.register_script(LOOKUP_SCRIPT) if redis_client
+                        else async_script(LOOKUP_SCRIPT))
+
+    async def get(self, user_id: int, module_id: int, time_period: str) -> Tuple[str, Optional[Dict]]:
+        """
+        Return the current data version and the feedback cached for it (None on a miss)
+
+        Pass the version back to set() so feedback generated from older data is
+        never stored under a newer version.
+        """
+        try:
+            version, cached = await self._lookup(
+                keys=[self.version_key(user_id, module_id)],
+                args=[self._feedback_prefix(user_id, module_id, time_period)]
+            )
+        except Exception as e:
+            logger.warning(f"Performance feedback cache lookup failed: {str(e)}")
+            return '', None
+        try:
+            return version, json.loads(cached) if cached is not None else None
+        except ValueError:
+            return version, None
+
+    async def set(self, user_id: int, module_id: int, time_period: str, version: str, feedback: Dict) -> None:
+        if not version:
+            # The lookup failed, so there is no version to store under
+            return
+        try:
+            await self.redis_client.set(
+                self._feedback_prefix(user_id, module_id, time_period) + version,
+                json.dumps(feedback), ex=self.ttl
+            )
+        except Exception as e:
+            logger.warning(f"Performance feedback cache store failed: {str(e)}")
+
+    @classmethod
+    def bump(cls, user_id: int, module_id: int, redis_client=None) -> None:
+        """Mark the user's performance data for a module as changed (sync client)"""
+        key = cls.version_key(user_id, module_id)
+        try:
+            pipeline = (redis_client or get_redis()).pipeline(transaction=False)
+            pipeline.incr(key)
+            pipeline.expire(key, cls.version_ttl())
+            pipeline.execute()
+        except Exception as e:
+            logger.error(f"Error bumping performance feedback version for {user_id}:{module_id}: {str(e)}")
+
+    @staticmethod
+    def version_ttl() -> int:
+        """Version counters outlive every entry cached under their current value"""
+        return getattr(settings, 'PERFORMANCE_FEEDBACK_CACHE_TTL', 60 * 60 * 24 * 7) * 2
+
+    @classmethod
+    def version_key(cls, user_id: int, module_id: int) -> str:
+        return f"{cls.KEY_PREFIX}:version:{user_id}:{module_id}"
+
+    @classmethod
+    def _feedback_prefix(cls, user_id: int, module_id: int, time_period: str) -> str:
+        return f"{cls.KEY_PREFIX}:{user_id}:{module_id}:{time_period}:v"
@@ -1,7 +1,7 @@
 
 from .quiz_module import QuizGenerationService
 from .progress_tracking  import ProgressTrackingService
-from .Feedback_module import FeedbackModule
+from .feedback_module import FeedbackModule
 from .demo import DemoService
 from .video_embeded import VideoEmbededService
 from .articles import ArticleService  # Updated from artilcleservice
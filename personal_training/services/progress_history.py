@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+from typing import List, Optional
+
+from django.conf import settings
+
+from .redis_pool import get_redis
+
+# KEYS[1] daily hash; ARGV[1] day, ARGV[2] items, ARGV[3] oldest day kept, ARGV[4] ttl seconds
+# Days are ISO dates, so string comparison orders them
+RECORD_SCRIPT = """
+local total = redis.call('HINCRBYFLOAT', KEYS[1], ARGV[1], ARGV[2])
+for _, day in ipairs(redis.call('HKEYS', KEYS[1])) do
+    if day < ARGV[3] then
+        redis.call('HDEL', KEYS[1], day)
+    end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return total
+"""
+
+
+class ProgressHistory:
+    """
+    Completed items per learner, course and day
+
+    Each learner/course pair is one Redis hash of ISO day -> items completed
+    that day. Recording increments today's field and drops days older than
+    PROGRESS_HISTORY_RETENTION_DAYS in the same script, so the hash never
+    holds more than the retention window. The total over any window is one
+    HMGET of that window's days, however long the learner's history is.
+    """
+
+    KEY_PREFIX = "progress_history"
+
+    def __init__(self, redis_client=None):
+        self.redis_client = redis_client or get_redis()
+        self.retention_days = getattr(settings, 'PROGRESS_HISTORY_RETENTION_DAYS', 90)
+        self._record = self.redis_client.register_script(RECORD_SCRIPT)
+
+    def record(self, user_id: int, course_id: int, completed_items: float = 1,
+               day: Optional[date] = None) -> float:
+        """Add completed items to a day (today by default) and return that day's total"""
+        today = date.today()
+        day = day or today
+        oldest = today - timedelta(days=self.retention_days - 1)
+        if day < oldest:
+            # Already outside the retention window
+            return 0.0
+        total = self._record(
+            keys=[self.key(user_id, course_id)],
+            args=[day.isoformat(), completed_items, oldest.isoformat(), self.retention_days * 24 * 60 * 60]
+        )
+        return float(total)
+
+    def daily(self, user_id: int, course_id: int, days: int = 7) -> List[float]:
+        """Items completed on each of the last `days` days, oldest first"""
+        return self.parse(self.redis_client.hmget(self.key(user_id, course_id), self.day_fields(days)))
+
+    def total(self, user_id: int, course_id: int, days: int = 7) -> float:
+        """Items completed over the last `days` days, today included"""
+        return sum(self.daily(user_id, course_id, days))
+
+    @classmethod
+    def key(cls, user_id: int, course_id: int) -> str:
+        return f"{cls.KEY_PREFIX}:{user_id}:{course_id}:daily"
+
+    @staticmethod
+    def day_fields(days: int, today: Optional[date] = None) -> List[str]:
+        """Hash fields for the last `days` days, oldest first"""
+        today = today or date.today()
+        return [(today - timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1)]
+
+    @staticmethod
+    def parse(values: List) -> List[float]:
+        """HMGET results as item counts, with missing days as 0"""
+        return [float(value) if value is not None else 0.0 for value in values]
@@ -7,10 +7,11 @@ from django.utils import timezone
 import logging
 import traceback
 from django.conf import settings
-from django_redis import get_redis_connection
 
 from personal_training.models import Course, Module
 from Oauth.models import User
+from .engagement import EngagementTracker
+from .redis_pool import get_redis
 
 class ProgressTrackingService:
     """
@@ -19,7 +20,7 @@ class ProgressTrackingService:
     
     def __init__(self, user: User):
         self.user = user
-        self.redis_client = self._initialize_redis_client()
+        self.redis_client = get_redis()
 
     def track_module_progress(self, module_id: int, progress_data: Dict) -> Dict:
         """
@@ -133,13 +134,17 @@ class ProgressTrackingService:
         # Enhance with advanced metrics
         enhanced_metrics = {
             **base_metrics,
-            'engagement_score': self._calculate_engagement_score(base_metrics),
+            'engagement_score': self._calculate_engagement_score(module.course_id),
             'mastery_level': self._assess_mastery_level(progress_data),
             'learning_velocity': self._calculate_learning_velocity(module, base_metrics)
         }
         
         return enhanced_metrics
 
+    def _calculate_engagement_score(self, course_id: int) -> float:
+        """Current engagement score from the running aggregates"""
+        return EngagementTracker(self.redis_client).get(self.user.id, course_id)['engagement_score']
+
     def _analyze_learning_patterns(self) -> Dict:
         """Analyze user's learning patterns and preferences"""
         recent_activities = self._get_recent_activities()
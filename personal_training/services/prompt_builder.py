@@ -0,0 +1,286 @@
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+from .redis_pool import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+HEADING_RE = re.compile(r"^\s*(#{1,6}\s|\d+(\.\d+)*[.)]\s|[A-Z][^.!?]{0,80}:\s*$)")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers him his how i if in into is it its itself just me more most my no nor not of
+off on once only or other our out over own same she should so some such than that the their them then
+there these they this those through to too under until up very was we were what when where which
+while who whom why will with would you your
+""".split())
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about 4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def compact_json(value: Any, token_budget: Optional[int] = None) -> str:
+    """
+    Encode a prompt payload as JSON without indentation or padding
+
+    When a list payload exceeds token_budget, only as many leading items as
+    fit are kept and the number of omitted items is noted at the end.
+    """
+    encoded = json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=str)
+    if token_budget is None or estimate_tokens(encoded) <= token_budget or not isinstance(value, list):
+        return encoded
+
+    def _encode_prefix(count: int) -> str:
+        omitted = len(value) - count
+        return json.dumps(value[:count] + [f"... {omitted} more items omitted"],
+                          separators=(',', ':'), ensure_ascii=False, default=str)
+
+    low, high = 0, len(value) - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(_encode_prefix(middle)) <= token_budget:
+            low = middle
+        else:
+            high = middle - 1
+    return _encode_prefix(low)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased content words used by the lexical scorer"""
+    return [word for word in WORD_RE.findall(text.lower()) if word not in STOPWORDS and len(word) > 1]
+
+
+class PromptBuilder:
+    """
+    Fits long course content into a prompt's token budget
+
+    Content is split into sections of about PROMPT_SECTION_TOKENS tokens and,
+    when it does not fit, the sections scoring highest (BM25) against the
+    query and the document's own keywords are kept in their original order.
+    The split sections and term counts (the content digest) are cached by
+    content hash in-process and in Redis, so a module's content is only
+    processed again after it changes. Coroutines use afit_content(), which
+    reads and writes digests on the asyncio client.
+    """
+
+    DIGEST_KEY_PREFIX = "prompt:digest"
+    DIGEST_KEYWORDS = 20  # document keywords used as the query when none is given
+    LOCAL_DIGESTS = 128
+
+    # BM25 parameters
+    K1 = 1.2
+    B = 0.75
+
+    # Process-wide digest LRU shared by all instances: content hash -> digest
+    _local = OrderedDict()
+    _local_lock = threading.Lock()
+
+    def __init__(self, redis_client=None, async_redis_client=None):
+        self.redis_client = redis_client or get_redis()
+        # Defaults to the shared asyncio client of whichever loop is calling
+        self.async_redis_client = async_redis_client
+        self.section_tokens = getattr(settings, 'PROMPT_SECTION_TOKENS', 400)
+        self.digest_ttl = getattr(settings, 'PROMPT_DIGEST_TTL', 60 * 60 * 24 * 7)
+
+    def fit_content(self, content: str, token_budget: int, query: Optional[str] = None) -> str:
+        """
+        Return content unchanged if it fits, otherwise its most relevant sections
+
+        Args:
+            content: Source text (e.g. Module.content)
+            token_budget: Maximum tokens the returned text may take
+            query: Text the sections should be relevant to; defaults to the
+                   content's title and keywords
+        """
+        if not content or estimate_tokens(content) <= token_budget:
+            return content
+        return self._select_sections(self.get_digest(content), token_budget, query)
+
+    async def afit_content(self, content: str, token_budget: int, query: Optional[str] = None) -> str:
+        """Async fit_content() reading the digest through the asyncio client"""
+        if not content or estimate_tokens(content) <= token_budget:
+            return content
+        return self._select_sections(await self.aget_digest(content), token_budget, query)
+
+    def get_digest(self, content: str) -> Dict:
+        """Return the cached digest of content, building and caching it on a miss"""
+        key = self._digest_key(content)
+        digest = self._get_local(key)
+        if digest is not None:
+            return digest
+
+        try:
+            cached = self.redis_client.get(key)
+            if cached:
+                digest = json.loads(cached)
+        except Exception as e:
+            logger.warning(f"Prompt digest lookup failed: {str(e)}")
+
+        if digest is None:
+            digest = self._build_digest(content)
+            try:
+                self.redis_client.setex(key, self.digest_ttl, compact_json(digest))
+            except Exception as e:
+                logger.warning(f"Prompt digest store failed: {str(e)}")
+
+        self._set_local(key, digest)
+        return digest
+
+    async def aget_digest(self, content: str) -> Dict:
+        """Async get_digest() on the asyncio client"""
+        key = self._digest_key(content)
+        digest = self._get_local(key)
+        if digest is not None:
+            return digest
+
+        redis_client = self.async_redis_client or get_async_redis()
+        try:
+            cached = await redis_client.get(key)
+            if cached:
+                digest = json.loads(cached)
+        except Exception as e:
+            logger.warning(f"Prompt digest lookup failed: {str(e)}")
+
+        if digest is None:
+            digest = self._build_digest(content)
+            try:
+                await redis_client.setex(key, self.digest_ttl, compact_json(digest))
+            except Exception as e:
+                logger.warning(f"Prompt digest store failed: {str(e)}")
+
+        self._set_local(key, digest)
+        return digest
+
+    def split_sections(self, content: str) -> List[str]:
+        """Split content at headings and paragraphs into sections of about section_tokens tokens"""
+        blocks, current = [], []
+        for line in content.splitlines():
+            if not line.strip() or (HEADING_RE.match(line) and current):
+                if current:
+                    blocks.append("\n".join(current).strip())
+                current = [line] if line.strip() else []
+            else:
+                current.append(line)
+        if current:
+            blocks.append("\n".join(current).strip())
+
+        pieces = []
+        for block in blocks:
+            if estimate_tokens(block) <= self.section_tokens:
+                pieces.append(block)
+                continue
+            for sentence in SENTENCE_RE.split(block):
+                # Split run-on text with no sentence breaks at the last space that fits
+                step = self.section_tokens * 4
+                while len(sentence) > step:
+                    cut = sentence.rfind(' ', 0, step)
+                    cut = cut if cut > 0 else step
+                    pieces.append(sentence[:cut])
+                    sentence = sentence[cut:].lstrip()
+                pieces.append(sentence)
+
+        sections, current_section, current_tokens = [], [], 0
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if current_section and current_tokens + piece_tokens > self.section_tokens:
+                sections.append("\n\n".join(current_section))
+                current_section, current_tokens = [], 0
+            current_section.append(piece)
+            current_tokens += piece_tokens
+        if current_section:
+            sections.append("\n\n".join(current_section))
+        return sections
+
+    def _select_sections(self, digest: Dict, token_budget: int, query: Optional[str]) -> str:
+        """The highest scoring sections that fit token_budget, in their original order"""
+        sections = digest['sections']
+        scores = self._score_sections(digest, query)
+
+        chosen, used = [], 0
+        for index in sorted(range(len(sections)), key=lambda i: (-scores[i], i)):
+            section_tokens = digest['tokens'][index] + 1  # separator
+            if used + section_tokens <= token_budget:
+                chosen.append(index)
+                used += section_tokens
+
+        if not chosen:
+            best = max(range(len(sections)), key=lambda i: (scores[i], -i))
+            return sections[best][:max(token_budget - 1, 0) * 4]
+        return "\n\n".join(sections[index] for index in sorted(chosen))
+
+    def _digest_key(self, content: str) -> str:
+        content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        return f"{self.DIGEST_KEY_PREFIX}:{self.section_tokens}:{content_hash}"
+
+    def _get_local(self, key: str) -> Optional[Dict]:
+        with self._local_lock:
+            digest = self._local.get(key)
+            if digest is not None:
+                self._local.move_to_end(key)
+            return digest
+
+    def _set_local(self, key: str, digest: Dict) -> None:
+        with self._local_lock:
+            self._local[key] = digest
+            while len(self._local) > self.LOCAL_DIGESTS:
+                self._local.popitem(last=False)
+
+    def _build_digest(self, content: str) -> Dict:
+        sections = self.split_sections(content)
+        term_counts = [Counter(tokenize(section)) for section in sections]
+
+        document_counts = Counter()
+        for counts in term_counts:
+            document_counts.update(counts)
+        title = content.strip().splitlines()[0] if content.strip() else ''
+
+        return {
+            'sections': sections,
+            'tokens': [estimate_tokens(section) for section in sections],
+            'terms': [dict(counts) for counts in term_counts],
+            'title_terms': tokenize(title),
+            'keywords': [term for term, _ in document_counts.most_common(self.DIGEST_KEYWORDS)]
+        }
+
+    def _score_sections(self, digest: Dict, query: Optional[str]) -> List[float]:
+        """BM25 score of each section against the query terms"""
+        if query:
+            query_terms = Counter({term: 2 for term in tokenize(query)})
+        else:
+            query_terms = Counter({term: 2 for term in digest['title_terms']})
+        query_terms.update(digest['keywords'])
+
+        terms = digest['terms']
+        section_count = len(terms)
+        lengths = [sum(counts.values()) for counts in terms]
+        average_length = (sum(lengths) / section_count) or 1
+        idf = {}
+        for term in query_terms:
+            containing = sum(1 for counts in terms if term in counts)
+            idf[term] = math.log(1 + (section_count - containing + 0.5) / (containing + 0.5))
+
+        scores = []
+        for counts, length in zip(terms, lengths):
+            score = 0.0
+            for term, weight in query_terms.items():
+                frequency = counts.get(term, 0)
+                if not frequency:
+                    continue
+                score += weight * idf[term] * frequency * (self.K1 + 1) / (
+                    frequency + self.K1 * (1 - self.B + self.B * length / average_length)
+                )
+            scores.append(score)
+        return scores
@@ -0,0 +1,226 @@
+import asyncio
+import functools
+import logging
+import random
+from typing import Dict, List, Optional, Set
+
+from django.conf import settings
+from django.db.models import F, Q
+
+from personal_training.models import Module, QuizBankEntry
+from .llm_gateway import LLMGateway
+from .quiz_module import QuizGenerationService
+from .redis_pool import get_async_redis, get_redis, run_async_pipeline
+
+logger = logging.getLogger(__name__)
+
+# Strong references to running background refills so they are not garbage collected mid-run
+_refill_tasks = set()
+
+
+class QuizBankService:
+    """
+    Service for serving pre-generated quizzes per module and difficulty
+
+    Quizzes are generated ahead of time and stored as QuizBankEntry rows. Serving
+    picks a random entry the user has not seen recently; when a bank runs low a
+    background refill tops it up to the target size. Redis is reached through
+    the calling loop's asyncio client.
+    """
+
+    DIFFICULTIES = ['beginner', 'intermediate', 'advanced']
+
+    def __init__(self):
+        self.question_types = getattr(settings, 'QUIZ_BANK_QUESTION_TYPES', {'mcq': 5})
+        self.target_size = getattr(settings, 'QUIZ_BANK_TARGET_SIZE', 10)
+        self.low_water_mark = getattr(settings, 'QUIZ_BANK_LOW_WATER_MARK', 3)
+        self.max_serves = getattr(settings, 'QUIZ_BANK_MAX_SERVES', 200)
+        self.recent_window = getattr(settings, 'QUIZ_BANK_RECENT_WINDOW', 5)
+        self.refill_concurrency = getattr(settings, 'QUIZ_BANK_REFILL_CONCURRENCY', 3)
+        self.refill_lock_timeout = 60 * 15
+
+    async def get_quiz(self, module_id: int, difficulty: str = 'intermediate',
+                       user_id: Optional[int] = None) -> Optional[Dict]:
+        """
+        Serve a random banked quiz the user has not seen recently
+
+        Args:
+            module_id: The module to quiz on
+            difficulty: Requested difficulty level
+            user_id: Optional user ID used to avoid repeating recent quizzes
+
+        Returns:
+            The quiz data, or None when the bank is empty
+        """
+        module = await Module.objects.only('id', 'updated_at').aget(id=module_id)
+        entry_ids = [
+            entry_id async for entry_id in
+            self._fresh_entries(module, difficulty).values_list('id', flat=True)
+        ]
+
+        if len(entry_ids) < self.low_water_mark:
+            await self.schedule_refill(module_id, difficulty)
+        if not entry_ids:
+            return None
+
+        recently_seen = await self._recently_seen(user_id, module_id) if user_id else set()
+        candidates = [entry_id for entry_id in entry_ids if entry_id not in recently_seen] or entry_ids
+        entry_id = random.choice(candidates)
+
+        entry = await QuizBankEntry.objects.only('quiz_data').aget(id=entry_id)
+        await QuizBankEntry.objects.filter(id=entry_id).aupdate(times_served=F('times_served') + 1)
+        if user_id:
+            await self._mark_seen(user_id, module_id, entry_id)
+
+        return entry.quiz_data
+
+    async def schedule_refill(self, module_id: int, difficulty: str) -> bool:
+        """
+        Start a background refill of a bank unless one is already running
+
+        Returns:
+            True if a refill was scheduled
+        """
+        lock_key = f"quiz_bank:refill:{module_id}:{difficulty}"
+        if not await get_async_redis().set(lock_key, 1, nx=True, ex=self.refill_lock_timeout):
+            return False
+
+        task = asyncio.get_running_loop().create_task(self.refill(module_id, difficulty))
+        # Done callbacks also run for a task cancelled before it started, so the lock is always released
+        task.add_done_callback(functools.partial(self._refill_finished, module_id, difficulty, lock_key))
+        _refill_tasks.add(task)
+        task.add_done_callback(_refill_tasks.discard)
+        return True
+
+    async def refill(self, module_id: int, difficulty: str) -> int:
+        """
+        Drop stale entries and generate quizzes until the bank reaches its target size
+
+        Returns:
+            Number of quizzes added
+        """
+        module = await Module.objects.aget(id=module_id)
+        await self._stale_entries(module, difficulty).adelete()
+
+        missing = self.target_size - await self._fresh_entries(module, difficulty).acount()
+        if missing <= 0:
+            return 0
+
+        # Refills queue behind interactive quiz and feedback calls
+        quiz_service = QuizGenerationService(priority=LLMGateway.PRIORITY_BACKGROUND)
+        content = self.module_content(module)
+        semaphore = asyncio.Semaphore(self.refill_concurrency)
+
+        async def _generate_entry() -> bool:
+            async with semaphore:
+                try:
+                    quiz_data = await quiz_service.generate_quiz(
+                        topic=content,
+                        question_types=self.question_types,
+                        difficulty=difficulty,
+                        use_cache=False
+                    )
+                except Exception as e:
+                    logger.error(f"Error generating bank quiz for module {module_id}: {str(e)}")
+                    return False
+
+                await QuizBankEntry.objects.acreate(
+                    module=module,
+                    difficulty=difficulty,
+                    question_types=self.question_types,
+                    quiz_data=quiz_data,
+                    prompt_version=QuizGenerationService.PROMPT_VERSION
+                )
+                return True
+
+        results = await asyncio.gather(*(_generate_entry() for _ in range(missing)))
+        return sum(results)
+
+    async def warm_course(self, course_id: int, difficulties: Optional[List[str]] = None) -> Dict[str, int]:
+        """
+        Fill the banks of every published module in a course
+
+        Returns:
+            Number of quizzes added per "module_id:difficulty"
+        """
+        difficulties = difficulties or self.DIFFICULTIES
+        results = {}
+
+        async for module in Module.objects.filter(course_id=course_id, is_published=True).only('id'):
+            for difficulty in difficulties:
+                results[f"{module.id}:{difficulty}"] = await self.refill(module.id, difficulty)
+
+        return results
+
+    def _refill_finished(self, module_id: int, difficulty: str, lock_key: str, task: asyncio.Task) -> None:
+        try:
+            if task.cancelled():
+                logger.warning(f"Quiz bank refill for module {module_id} ({difficulty}) was cancelled")
+            elif task.exception() is not None:
+                logger.error(f"Error refilling quiz bank for module {module_id}: {str(task.exception())}")
+            else:
+                logger.info(f"Refilled quiz bank for module {module_id} ({difficulty}) with {task.result()} quizzes")
+        finally:
+            try:
+                release = task.get_loop().create_task(self._release_refill_lock(lock_key))
+            except RuntimeError:
+                # The loop is closing; release through the sync client instead
+                self._release_refill_lock_sync(lock_key)
+            else:
+                _refill_tasks.add(release)
+                release.add_done_callback(_refill_tasks.discard)
+
+    @staticmethod
+    async def _release_refill_lock(lock_key: str) -> None:
+        try:
+            await get_async_redis().delete(lock_key)
+        except Exception as e:
+            logger.error(f"Error releasing quiz bank refill lock {lock_key}: {str(e)}")
+
+    @staticmethod
+    def _release_refill_lock_sync(lock_key: str) -> None:
+        try:
+            get_redis().delete(lock_key)
+        except Exception as e:
+            logger.error(f"Error releasing quiz bank refill lock {lock_key}: {str(e)}")
+
+    def _fresh_entries(self, module: Module, difficulty: str):
+        """Entries generated from the current module content and prompt that are still servable"""
+        return QuizBankEntry.objects.filter(
+            module_id=module.id,
+            difficulty=difficulty,
+            question_types=self.question_types,
+            prompt_version=QuizGenerationService.PROMPT_VERSION,
+            created_at__gte=module.updated_at,
+            times_served__lt=self.max_serves
+        )
+
+    def _stale_entries(self, module: Module, difficulty: str):
+        """Entries built from outdated content or prompts, or served too often"""
+        return QuizBankEntry.objects.filter(
+            module_id=module.id,
+            difficulty=difficulty
+        ).filter(
+            Q(created_at__lt=module.updated_at) |
+            ~Q(prompt_version=QuizGenerationService.PROMPT_VERSION) |
+            Q(times_served__gte=self.max_serves)
+        )
+
+    async def _recently_seen(self, user_id: int, module_id: int) -> Set[int]:
+        seen_key = f"quiz_bank:seen:{user_id}:{module_id}"
+        return {int(entry_id) for entry_id in await get_async_redis().lrange(seen_key, 0, -1)}
+
+    async def _mark_seen(self, user_id: int, module_id: int, entry_id: int) -> None:
+        seen_key = f"quiz_bank:seen:{user_id}:{module_id}"
+
+        def build(pipeline):
+            pipeline.lpush(seen_key, entry_id)
+            pipeline.ltrim(seen_key, 0, self.recent_window - 1)
+            pipeline.expire(seen_key, 60 * 60 * 24 * 30)  # 30 days
+
+        await run_async_pipeline(build, transaction=True)
+
+    @staticmethod
+    def module_content(module: Module) -> str:
+        """Text used as quiz source material for a module"""
+        return f"{module.title}\n\n{module.content or module.description}"
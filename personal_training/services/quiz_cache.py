@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from django.conf import settings
+from redis.exceptions import LockError
+
+from .redis_pool import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class QuizCache:
+    """
+    Content-addressed cache for generated quizzes
+
+    Quizzes are keyed on a hash of the normalized content, question types,
+    difficulty and prompt version. Concurrent misses for the same key are
+    collapsed into a single generation guarded by a Redis lock; the other
+    callers wait for the cached result. Coroutines use the asyncio client, so
+    lookups and lock polling never block the event loop.
+    """
+
+    KEY_PREFIX = "quiz:cache"
+    STATS_KEY = "quiz:cache:stats"
+    POLL_INTERVAL = 0.2  # seconds between cache checks while another worker generates
+
+    def __init__(self, redis_client=None, async_redis_client=None):
+        self.redis_client = redis_client or get_redis()
+        # Defaults to the shared asyncio client of whichever loop is calling
+        self.async_redis_client = async_redis_client
+        self.ttl = getattr(settings, 'QUIZ_CACHE_TTL', 60 * 60 * 24)
+        self.lock_timeout = getattr(settings, 'QUIZ_CACHE_LOCK_TIMEOUT', 120)
+        self.wait_timeout = getattr(settings, 'QUIZ_CACHE_WAIT_TIMEOUT', 90)
+
+    def make_key(self, content: str, question_types: Dict[str, int],
+                 difficulty: str, prompt_version: int) -> str:
+        """Build the cache key for a quiz request"""
+        payload = json.dumps({
+            'content': self._normalize_content(content),
+            'question_types': dict(sorted(question_types.items())),
+            'difficulty': difficulty.strip().lower(),
+            'prompt_version': prompt_version
+        }, sort_keys=True, separators=(',', ':'))
+        digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        return f"{self.KEY_PREFIX}:{digest}"
+
+    async def get_or_generate(self, key: str, generate: Callable[[], Awaitable[Dict]]) -> Dict:
+        """
+        Return the cached quiz for key, generating it at most once across workers
+
+        Args:
+            key: Cache key from make_key
+            generate: Coroutine factory producing the quiz data on a miss
+        """
+        redis_client = self._async_client()
+        quiz_data = await self._aget(redis_client, key)
+        if quiz_data is not None:
+            await self._arecord(redis_client, 'hits')
+            return quiz_data
+
+        await self._arecord(redis_client, 'misses')
+        deadline = time.monotonic() + self.wait_timeout
+
+        while time.monotonic() < deadline:
+            lock = redis_client.lock(f"{key}:lock", timeout=self.lock_timeout)
+            if await lock.acquire(blocking=False):
+                try:
+                    # Another worker may have filled the cache between our miss and the lock
+                    quiz_data = await self._aget(redis_client, key)
+                    if quiz_data is None:
+                        quiz_data = await generate()
+                        await self.aset(key, quiz_data)
+                    return quiz_data
+                finally:
+                    try:
+                        await lock.release()
+                    except LockError:
+                        logger.warning(f"Quiz cache lock for {key} expired before release")
+
+            # Another worker is generating this quiz; wait for its result
+            await self._arecord(redis_client, 'waits')
+            while time.monotonic() < deadline and await redis_client.exists(f"{key}:lock"):
+                await asyncio.sleep(self.POLL_INTERVAL)
+                quiz_data = await self._aget(redis_client, key)
+                if quiz_data is not None:
+                    return quiz_data
+
+            quiz_data = await self._aget(redis_client, key)
+            if quiz_data is not None:
+                return quiz_data
+            # The lock holder failed without caching a result; try to take over
+
+        logger.warning(f"Timed out waiting for quiz cache key {key}, generating directly")
+        return await generate()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached quiz for key without generating, recording a hit or miss"""
+        quiz_data = self._get(key)
+        self._record('hits' if quiz_data is not None else 'misses')
+        return quiz_data
+
+    async def aget(self, key: str) -> Optional[Dict]:
+        """Async get() on the asyncio client"""
+        redis_client = self._async_client()
+        quiz_data = await self._aget(redis_client, key)
+        await self._arecord(redis_client, 'hits' if quiz_data is not None else 'misses')
+        return quiz_data
+
+    def set(self, key: str, quiz_data: Dict) -> None:
+        """Store a quiz produced outside get_or_generate"""
+        self.redis_client.setex(key, self.ttl, json.dumps(quiz_data))
+
+    async def aset(self, key: str, quiz_data: Dict) -> None:
+        """Async set() on the asyncio client"""
+        await self._async_client().setex(key, self.ttl, json.dumps(quiz_data))
+
+    def get_stats(self) -> Dict:
+        """Return hit/miss counters for sizing the cache TTL"""
+        stats = {
+            field.decode() if isinstance(field, bytes) else field: int(value)
+            for field, value in self.redis_client.hgetall(self.STATS_KEY).items()
+        }
+        hits = stats.get('hits', 0)
+        misses = stats.get('misses', 0)
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'waits': stats.get('waits', 0),
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'ttl_seconds': self.ttl
+        }
+
+    def _get(self, key: str) -> Optional[Dict]:
+        cached = self.redis_client.get(key)
+        return json.loads(cached) if cached else None
+
+    def _record(self, counter: str) -> None:
+        try:
+            self.redis_client.hincrby(self.STATS_KEY, counter, 1)
+        except Exception as e:
+            logger.warning(f"Failed to record quiz cache {counter}: {str(e)}")
+
+    def _async_client(self):
+        return self.async_redis_client or get_async_redis()
+
+    @staticmethod
+    async def _aget(redis_client, key: str) -> Optional[Dict]:
+        cached = await redis_client.get(key)
+        return json.loads(cached) if cached else None
+
+    async def _arecord(self, redis_client, counter: str) -> None:
+        try:
+            await redis_client.hincrby(self.STATS_KEY, counter, 1)
+        except Exception as e:
+            logger.warning(f"Failed to record quiz cache {counter}: {str(e)}")
+
+    @staticmethod
+    def _normalize_content(content: str) -> str:
+        """Collapse whitespace so formatting-only differences share a cache entry"""
+        return ' '.join(content.split())
@@ -0,0 +1,126 @@
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+from django.conf import settings
+
+from .redis_pool import async_script, get_async_redis, run_async_pipeline
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] summary hash, KEYS[2] score list
+# ARGV[1] score, ARGV[2] window, ARGV[3] ttl seconds, ARGV[4] attempt timestamp
+RECORD_SCRIPT = """
+if redis.call('TYPE', KEYS[1]).ok == 'string' then
+    -- History written by the old JSON format
+    redis.call('DEL', KEYS[1])
+end
+redis.call('RPUSH', KEYS[2], ARGV[1])
+redis.call('LTRIM', KEYS[2], -tonumber(ARGV[2]), -1)
+local scores = redis.call('LRANGE', KEYS[2], 0, -1)
+local total = 0
+for _, score in ipairs(scores) do
+    total = total + tonumber(score)
+end
+local average = tostring(total / #scores)
+redis.call('HSET', KEYS[1], 'average_score', average, 'last_attempt', ARGV[4])
+redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return average
+"""
+
+
+class QuizHistory:
+    """
+    Recent quiz scores per user and module, used for adaptive difficulty
+
+    The last QUIZ_HISTORY_WINDOW scores live in a Redis list and the rolling
+    average in a hash next to it. Recording a score appends, trims and
+    recomputes the average in one server-side script, so concurrent
+    submissions cannot lose each other's scores.
+    """
+
+    KEY_PREFIX = "quiz:history"
+
+    def __init__(self, redis_client=None):
+        # An asyncio client; defaults to the current event loop's shared one
+        self.redis_client = redis_client or get_async_redis()
+        self.window = getattr(settings, 'QUIZ_HISTORY_WINDOW', 10)
+        self.ttl = getattr(settings, 'QUIZ_HISTORY_TTL', 60 * 60 * 24 * 30)
+        self._record = (redis_client.register_script(RECORD_SCRIPT) if redis_client
+                        else async_script(RECORD_SCRIPT))
+
+    async def record(self, user_id: int, module_id: int, score: float) -> Optional[float]:
+        """Add a score to the history and return the new rolling average (None if Redis failed)"""
+        summary_key, scores_key = self._keys(user_id, module_id)
+        try:
+            average = await self._record(
+                keys=[summary_key, scores_key],
+                args=[score, self.window, self.ttl, datetime.now().isoformat()]
+            )
+            return float(average)
+        except Exception as e:
+            logger.error(f"Error storing quiz result: {str(e)}")
+            return None
+
+    async def get(self, user_id: int, module_id: int) -> Optional[Dict]:
+        """
+        Return the history, or None if there is none
+
+        Returns:
+            Dict with average_score, performance_trend (oldest first), attempts and last_attempt
+        """
+        summary_key, scores_key = self._keys(user_id, module_id)
+
+        def build(pipeline):
+            pipeline.type(summary_key)
+            pipeline.hgetall(summary_key)
+            pipeline.lrange(scores_key, 0, -1)
+
+        key_type, summary, scores = await run_async_pipeline(
+            build, raise_on_error=False, redis_client=self.redis_client
+        )
+
+        # Histories still in the old JSON format are ignored until the next record() replaces them
+        if key_type != 'hash' or not summary:
+            return None
+        return {
+            'average_score': float(summary['average_score']),
+            'performance_trend': [float(score) for score in scores],
+            'attempts': int(summary.get('attempts', 0)),
+            'last_attempt': summary.get('last_attempt')
+        }
+
+    async def adaptive_difficulty(self, user_id: int, module_id: int, default_difficulty: str) -> str:
+        """Step default_difficulty up or down when the last three scores are consistently high or low"""
+        try:
+            history = await self.get(user_id, module_id)
+        except Exception as e:
+            logger.error(f"Error getting adaptive difficulty: {str(e)}")
+            return default_difficulty
+        if not history:
+            return default_difficulty
+
+        average_score = history['average_score']
+        recent_scores = history['performance_trend'][-3:]
+        if len(recent_scores) < 3:
+            return default_difficulty
+
+        if average_score >= 90 and all(score >= 85 for score in recent_scores):
+            if default_difficulty == 'beginner':
+                return 'intermediate'
+            elif default_difficulty == 'intermediate':
+                return 'advanced'
+
+        elif average_score <= 60 and all(score <= 65 for score in recent_scores):
+            if default_difficulty == 'advanced':
+                return 'intermediate'
+            elif default_difficulty == 'intermediate':
+                return 'beginner'
+
+        return default_difficulty
+
+    def _keys(self, user_id: int, module_id: int):
+        summary_key = f"{self.KEY_PREFIX}:{user_id}:{module_id}"
+        return summary_key, f"{summary_key}:scores"
@@ -1,28 +1,47 @@
-import google.generativeai as genai
 from django.conf import settings
-import json
-import os
-from asgiref.sync import sync_to_async
-from typing import Dict, List, Optional
-from django_redis import get_redis_connection
-from datetime import datetime
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from collections import Counter
+from .llm_gateway import get_llm_gateway
+from .quiz_cache import QuizCache
+from .redis_pool import get_redis
+from .feedback_memo import FeedbackMemo
+from .json_stream import IncrementalArrayParser
+from .prompt_builder import PromptBuilder, estimate_tokens
+from .quiz_schema import (
+    BATCH_FEEDBACK_ITEM_VALIDATOR, BATCH_FEEDBACK_RESPONSE_SCHEMA, FEEDBACK_RESPONSE_SCHEMA,
+    FEEDBACK_VALIDATOR, QUESTION_TYPE_DESCRIPTIONS, QUESTION_VALIDATOR, QUIZ_RESPONSE_SCHEMA, QUIZ_VALIDATOR
+)
+
+logger = logging.getLogger(__name__)
 
 class QuizGenerationService:
-    def __init__(self):
-        api_key = os.getenv('GEMINI_API_KEY') or settings.GEMINI_API_KEY
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
-        self.redis_client = get_redis_connection("default")
-
-    def _format_prompt(self, content: str, question_types: Dict[str, int], difficulty: str) -> str:
-        type_descriptions = {
-            'mcq': 'standard multiple choice questions testing knowledge recall',
-            'scenario': 'scenario-based questions that present a situation and ask for analysis',
-            'application': 'questions that test application of concepts to real-world situations',
-            'reflection': 'questions that encourage reflection on personal experiences',
-            'discussion': 'open-ended questions that promote discussion and critical thinking'
-        }
-        
+    # Bump whenever _format_prompt changes so cached quizzes from the old prompt are not reused
+    PROMPT_VERSION = 2
+
+    # Expected output tokens for one answer's feedback, used when batching feedback prompts
+    FEEDBACK_OUTPUT_TOKENS = 150
+
+    def __init__(self, priority: Optional[int] = None):
+        # All model calls go through the shared gateway; priority overrides the
+        # per-prompt-type default (e.g. background bank refills)
+        self.llm = get_llm_gateway()
+        self.priority = priority
+        self.redis_client = get_redis()
+        self.quiz_cache = QuizCache(self.redis_client)
+        self.feedback_memo = FeedbackMemo('quiz', self.redis_client)
+        self.prompt_builder = PromptBuilder(self.redis_client)
+        self.prompt_token_budget = getattr(settings, 'PROMPT_TOKEN_BUDGET', 8000)
+        self.context_token_budget = getattr(settings, 'PROMPT_CONTEXT_TOKEN_BUDGET', 600)
+
+    async def _format_prompt(self, content: str, question_types: Dict[str, int], difficulty: str) -> str:
+        """Quiz prompt with the content cut down to the sections that fit PROMPT_TOKEN_BUDGET"""
+        base_tokens = estimate_tokens(self._quiz_prompt('', question_types, difficulty))
+        content = await self.prompt_builder.afit_content(content, self.prompt_token_budget - base_tokens)
+        return self._quiz_prompt(content, question_types, difficulty)
+
+    def _quiz_prompt(self, content: str, question_types: Dict[str, int], difficulty: str) -> str:
         prompt = f"""
         Generate a quiz based on this content. Format your response as a valid JSON object.
 
@@ -30,7 +49,7 @@ class QuizGenerationService:
         {content}
 
         Question Types Required:
-        {', '.join([f'{count} {type_descriptions[qtype]}' for qtype, count in question_types.items()])}
+        {', '.join([f'{count} {QUESTION_TYPE_DESCRIPTIONS[qtype]}' for qtype, count in question_types.items()])}
 
         Difficulty Level: {difficulty}
 
@@ -79,206 +98,418 @@ class QuizGenerationService:
         """
         return prompt
 
-    def _clean_response(self, response_text: str) -> str:
-        """Clean the response text to extract valid JSON."""
-        # Find the first { and last }
-        start = response_text.find('{')
-        end = response_text.rfind('}') + 1
-        
-        if start == -1 or end == 0:
-            raise ValueError("No JSON object found in response")
-            
-        json_str = response_text[start:end]
-        
-        # Validate it's proper JSON
-        try:
-            json.loads(json_str)
-            return json_str
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON structure in response")
-
     def _validate_quiz_data(self, quiz_data: dict, question_types: Dict[str, int]) -> bool:
-        """Validate the quiz data structure."""
-        if not isinstance(quiz_data, dict) or 'questions' not in quiz_data:
+        """Validate the quiz data against the quiz schema and the requested question counts."""
+        if not QUIZ_VALIDATOR.is_valid(quiz_data):
             return False
             
-        questions = quiz_data['questions']
-        if not isinstance(questions, list) or not questions:
-            return False
-            
-        # Count questions by type
-        type_counts = {}
-        for question in questions:
-            if not all(key in question for key in ['question_text', 'question_type', 'difficulty_level', 'explanation']):
-                return False
-                
-            qtype = question['question_type']
-            type_counts[qtype] = type_counts.get(qtype, 0) + 1
-            
-            # Validate MCQ structure
-            if qtype == 'mcq':
-                if 'choices' not in question:
-                    return False
-                choices = question['choices']
-                if len(choices) != 4:
-                    return False
-                correct_answers = sum(1 for choice in choices if choice['is_correct'])
-                if correct_answers != 1:
-                    return False
-            # Validate scenario questions
-            elif qtype == 'scenario':
-                if not question.get('scenario_context'):
-                    return False
-            # Validate other question types
-            elif qtype in ['application', 'reflection', 'discussion']:
-                if not question.get('model_answer'):
-                    return False
-                    
         # Verify question type counts match requirements
-        for qtype, count in question_types.items():
-            if type_counts.get(qtype, 0) != count:
-                return False
-                
-        return True
+        type_counts = Counter(question['question_type'] for question in quiz_data['questions'])
+        return all(type_counts.get(qtype, 0) == count for qtype, count in question_types.items())
+
+    def _validate_question(self, question: dict) -> bool:
+        """Validate a single question against the question schema."""
+        return QUESTION_VALIDATOR.is_valid(question)
 
     async def generate_quiz(self, topic: str, question_types: Optional[Dict[str, int]] = None, 
-                          difficulty: str = 'intermediate', user_id: Optional[int] = None,
-                          quiz_id: Optional[int] = None) -> dict:
+                          difficulty: str = 'intermediate', use_cache: bool = True) -> dict:
         """Generate a quiz based on the given topic with specified question types and difficulty."""
         try:
             # If no question types specified, default to 5 MCQs
             if not question_types:
                 question_types = {'mcq': 5}
-                
-            # If user_id and quiz_id provided, adjust difficulty based on history
-            if user_id and quiz_id:
-                difficulty = await self._get_adaptive_difficulty(user_id, quiz_id, difficulty)
-            
-            # Generate the prompt
-            prompt = self._format_prompt(topic, question_types, difficulty)
-            
-            # Get response from Gemini
-            response = await sync_to_async(self.model.generate_content)(prompt)
-            
-            # Clean and parse the response
-            json_str = self._clean_response(response.text)
-            quiz_data = json.loads(json_str)
-            
-            # Validate the quiz data
-            if not self._validate_quiz_data(quiz_data, question_types):
-                raise ValueError("Generated quiz data failed validation")
-                
-            return quiz_data
+
+            if not use_cache:
+                return await self._generate_quiz_data(topic, question_types, difficulty)
+
+            # Serve identical requests from the cache, generating at most once per key
+            cache_key = self.quiz_cache.make_key(topic, question_types, difficulty, self.PROMPT_VERSION)
+            return await self.quiz_cache.get_or_generate(
+                cache_key,
+                lambda: self._generate_quiz_data(topic, question_types, difficulty)
+            )
             
         except Exception as e:
             raise ValueError(f"Quiz generation failed: {str(e)}")
-            
-    async def _get_adaptive_difficulty(self, user_id: int, quiz_id: int, default_difficulty: str) -> str:
-        """Determine appropriate difficulty level based on user's quiz history from Redis"""
-        try:
-            # Get quiz history from Redis
-            history_key = f"quiz:history:{user_id}:{quiz_id}"
-            history = self.redis_client.get(history_key)
-            
-            if history:
-                history_data = json.loads(history)
-                average_score = history_data.get('average_score', 0)
-                performance_trend = history_data.get('performance_trend', [])
-                
-                # Rest of the logic remains the same
-                if average_score >= 90 and len(performance_trend) >= 3:
-                    recent_scores = performance_trend[-3:]
-                    if all(score >= 85 for score in recent_scores):
-                        if default_difficulty == 'beginner':
-                            return 'intermediate'
-                        elif default_difficulty == 'intermediate':
-                            return 'advanced'
-                            
-                elif average_score <= 60 and len(performance_trend) >= 3:
-                    recent_scores = performance_trend[-3:]
-                    if all(score <= 65 for score in recent_scores):
-                        if default_difficulty == 'advanced':
-                            return 'intermediate'
-                        elif default_difficulty == 'intermediate':
-                            return 'beginner'
-                            
-        except Exception as e:
-            self._log_error(f"Error getting adaptive difficulty: {str(e)}")
-            
-        return default_difficulty
 
-    def _store_quiz_result(self, user_id: int, quiz_id: int, score: float):
-        """Store quiz results in Redis"""
-        try:
-            history_key = f"quiz:history:{user_id}:{quiz_id}"
-            existing_history = self.redis_client.get(history_key)
-            
-            if existing_history:
-                history_data = json.loads(existing_history)
-                scores = history_data.get('performance_trend', [])
-                scores.append(score)
-                
-                # Keep only last 10 scores
-                if len(scores) > 10:
-                    scores = scores[-10:]
-                    
-                history_data.update({
-                    'average_score': sum(scores) / len(scores),
-                    'performance_trend': scores,
-                    'last_attempt': datetime.now().isoformat()
-                })
-            else:
-                history_data = {
-                    'average_score': score,
-                    'performance_trend': [score],
-                    'last_attempt': datetime.now().isoformat()
-                }
-            
-            # Store with expiry (e.g., 30 days)
-            self.redis_client.setex(
-                history_key,
-                2592000,  # 30 days in seconds
-                json.dumps(history_data)
-            )
+    async def generate_quiz_stream(self, topic: str, question_types: Optional[Dict[str, int]] = None,
+                                   difficulty: str = 'intermediate') -> AsyncIterator[dict]:
+        """
+        Generate a quiz and yield each question as soon as the model has finished writing it
+        
+        Questions that fail validation are skipped. A cached quiz is replayed
+        directly, and a complete valid streamed quiz is stored in the cache.
+        """
+        if not question_types:
+            question_types = {'mcq': 5}
+
+        cache_key = self.quiz_cache.make_key(topic, question_types, difficulty, self.PROMPT_VERSION)
+        cached_quiz = await self.quiz_cache.aget(cache_key)
+        if cached_quiz is not None:
+            for question in cached_quiz['questions']:
+                yield question
+            return
+
+        prompt = await self._format_prompt(topic, question_types, difficulty)
+        parser = IncrementalArrayParser('questions')
+        questions = []
+        remaining = dict(question_types)
+
+        async for chunk in self.llm.stream(prompt, 'quiz', response_schema=QUIZ_RESPONSE_SCHEMA,
+                                        priority=self.priority):
+            for question in parser.feed(chunk):
+                if not self._validate_question(question) or remaining.get(question['question_type'], 0) <= 0:
+                    self._log_error("Skipping invalid or surplus streamed question")
+                    continue
+                remaining[question['question_type']] -= 1
+                questions.append(question)
+                yield question
+
+        # Fill any gap left by skipped questions with a smaller follow-up request
+        shortfall = {qtype: count for qtype, count in remaining.items() if count > 0}
+        if shortfall:
+            for question in await self._top_up_questions(topic, questions, shortfall, difficulty):
+                questions.append(question)
+                yield question
+
+        quiz_data = {'questions': questions}
+        if self._validate_quiz_data(quiz_data, question_types):
+            await self.quiz_cache.aset(cache_key, quiz_data)
+
+    async def _generate_quiz_data(self, topic: str, question_types: Dict[str, int], difficulty: str) -> dict:
+        """Generate and validate a quiz with the model, topping up missing questions if needed"""
+        # Generate the prompt
+        prompt = await self._format_prompt(topic, question_types, difficulty)
+        
+        # Get schema-constrained JSON from Gemini
+        quiz_data = await self.llm.generate_json(
+            prompt, 'quiz', response_schema=QUIZ_RESPONSE_SCHEMA, priority=self.priority
+        )
+        
+        # Validate the quiz data
+        if self._validate_quiz_data(quiz_data, question_types):
+            return quiz_data
+
+        # Keep the valid questions and only ask for the ones that are missing
+        questions, shortfall = self._partition_questions(quiz_data, question_types)
+        questions += await self._top_up_questions(topic, questions, shortfall, difficulty)
+
+        quiz_data = {'questions': questions}
+        if not self._validate_quiz_data(quiz_data, question_types):
+            raise ValueError("Generated quiz data failed validation")
             
-        except Exception as e:
-            self._log_error(f"Error storing quiz result: {str(e)}")
+        return quiz_data
+
+    def _partition_questions(self, quiz_data: dict, question_types: Dict[str, int]) -> Tuple[List[dict], Dict[str, int]]:
+        """
+        Split generated questions into the usable ones and the per-type shortfall
+        
+        Returns:
+            Valid questions up to the requested count per type, and the number
+            of questions still missing per type
+        """
+        remaining = dict(question_types)
+        kept = []
+
+        questions = quiz_data.get('questions') if isinstance(quiz_data, dict) else None
+        for question in questions if isinstance(questions, list) else []:
+            if not self._validate_question(question):
+                continue
+            qtype = question['question_type']
+            if remaining.get(qtype, 0) > 0:
+                kept.append(question)
+                remaining[qtype] -= 1
+
+        return kept, {qtype: count for qtype, count in remaining.items() if count > 0}
+
+    async def _top_up_questions(self, topic: str, existing: List[dict], shortfall: Dict[str, int],
+                                difficulty: str) -> List[dict]:
+        """
+        Request only the missing questions, retrying up to QUIZ_REPAIR_ATTEMPTS times
+        
+        Returns:
+            The additional valid questions (possibly fewer than requested if the
+            retry budget runs out)
+        """
+        attempts = getattr(settings, 'QUIZ_REPAIR_ATTEMPTS', 2)
+        added = []
+
+        for _ in range(attempts):
+            if not shortfall:
+                break
+
+            prompt = await self._format_top_up_prompt(topic, shortfall, difficulty, existing + added)
+            try:
+                top_up_data = await self.llm.generate_json(
+                    prompt, 'quiz', response_schema=QUIZ_RESPONSE_SCHEMA, priority=self.priority
+                )
+            except Exception as e:
+                self._log_error(f"Error generating top-up questions: {str(e)}")
+                continue
+
+            questions, shortfall = self._partition_questions(top_up_data, shortfall)
+            added += questions
 
+        return added
+
+    async def _format_top_up_prompt(self, content: str, shortfall: Dict[str, int], difficulty: str,
+                              existing: List[dict]) -> str:
+        """Prompt for only the missing questions, steering away from the ones already generated"""
+        prompt = await self._format_prompt(content, shortfall, difficulty)
+        if existing:
+            existing_questions = "\n".join(f"- {question['question_text']}" for question in existing)
+            prompt += f"""
+        Do not repeat any of these existing questions:
+        {existing_questions}
+        """
+        return prompt
+            
     async def generate_feedback(self, user_answer: str, correct_answer: str, 
-                              question_type: str, context: Optional[str] = None) -> str:
+                              question_type: str, context: Optional[str] = None,
+                              question_text: Optional[str] = None) -> str:
         """Generate personalized feedback for a user's answer."""
         try:
-            prompt = f"""
-            Analyze this answer and provide constructive feedback.
-            
-            Question Type: {question_type}
-            {"Context: " + context if context else ""}
-            Correct Answer: {correct_answer}
-            User's Answer: {user_answer}
-            
-            Provide feedback that:
-            1. Acknowledges what the user did well
-            2. Identifies areas for improvement
-            3. Explains key concepts they might have missed
-            4. Offers specific suggestions for improvement
-            
-            Format your response as a JSON object with these fields:
-            {{
-                "strengths": "What the user did well",
-                "areas_for_improvement": "What could be better",
-                "key_concepts": "Important concepts to remember",
-                "suggestions": "Specific tips for improvement"
-            }}
-            """
-            
-            response = await sync_to_async(self.model.generate_content)(prompt)
-            feedback_data = json.loads(self._clean_response(response.text))
+            answer = {
+                'user_answer': user_answer,
+                'correct_answer': correct_answer,
+                'question_type': question_type,
+                'context': context,
+                'question_text': question_text
+            }
+            memo_key = self._feedback_memo_key(answer)
+            feedback_data = await self.feedback_memo.aget(memo_key, question_type)
+            if feedback_data is None:
+                # Single answers from concurrent requests share one batched prompt
+                feedback_data = await self.llm.batch('quiz_feedback', answer, self.generate_batched_feedback)
+                if feedback_data != self._default_feedback():
+                    await self.feedback_memo.aset(memo_key, feedback_data)
             return feedback_data
-            
+
         except Exception as e:
-            return {
-                "strengths": "Unable to analyze strengths",
-                "areas_for_improvement": "Unable to analyze areas for improvement",
-                "key_concepts": "Please review the correct answer",
-                "suggestions": "Try reviewing the related course materials"
-            }
\ No newline at end of file
+            return self._default_feedback()
+
+    async def _request_feedback(self, user_answer: str, correct_answer: str,
+                                question_type: str, context: Optional[str] = None,
+                                question_text: Optional[str] = None) -> Dict:
+        """Ask the model for feedback on a single answer"""
+        context = await self._fit_context(context, question_text, correct_answer)
+        prompt = f"""
+        Analyze this answer and provide constructive feedback.
+        
+        Question Type: {question_type}
+        {"Question: " + question_text if question_text else ""}
+        {"Context: " + context if context else ""}
+        Correct Answer: {correct_answer}
+        User's Answer: {user_answer}
+        
+        Provide feedback that:
+        1. Acknowledges what the user did well
+        2. Identifies areas for improvement
+        3. Explains key concepts they might have missed
+        4. Offers specific suggestions for improvement
+        
+        Format your response as a JSON object with these fields:
+        {{
+            "strengths": "What the user did well",
+            "areas_for_improvement": "What could be better",
+            "key_concepts": "Important concepts to remember",
+            "suggestions": "Specific tips for improvement"
+        }}
+        """
+        
+        feedback_data = await self.llm.generate_json(
+            prompt, 'feedback', response_schema=FEEDBACK_RESPONSE_SCHEMA, priority=self.priority
+        )
+        if not FEEDBACK_VALIDATOR.is_valid(feedback_data):
+            raise ValueError("Generated feedback failed validation")
+        return feedback_data
+
+    async def generate_feedback_for_answers(self, answers: List[Dict],
+                                            concurrency: Optional[int] = None,
+                                            timeout: Optional[float] = None,
+                                            mode: Optional[str] = None) -> List[Dict]:
+        """
+        Generate feedback for several answers concurrently
+
+        Args:
+            answers: List of dicts holding the keyword arguments of generate_feedback
+            concurrency: Maximum number of model calls in flight at once
+            timeout: Timeout in seconds for each model call
+            mode: 'batched' to send all answers in as few prompts as possible,
+                  'per_question' for one prompt per answer (defaults to QUIZ_FEEDBACK_MODE)
+
+        Returns:
+            Feedback dicts in the same order as the answers. An answer whose call
+            fails or times out gets the default feedback.
+        """
+        concurrency = concurrency or getattr(settings, 'QUIZ_FEEDBACK_CONCURRENCY', 8)
+        mode = mode or getattr(settings, 'QUIZ_FEEDBACK_MODE', 'batched')
+        semaphore = asyncio.Semaphore(concurrency)
+
+        # Serve answers seen before from the memo; only the rest go to the model
+        memo_keys = [self._feedback_memo_key(answer) for answer in answers]
+        feedback_list = await self.feedback_memo.aget_many(
+            [(memo_key, answer['question_type']) for memo_key, answer in zip(memo_keys, answers)]
+        )
+        pending = [index for index, feedback in enumerate(feedback_list) if feedback is None]
+        if not pending:
+            return feedback_list
+        pending_answers = [answers[index] for index in pending]
+
+        if mode == 'batched':
+            timeout = timeout or getattr(settings, 'QUIZ_FEEDBACK_BATCH_TIMEOUT', 60)
+            batches = await self._chunk_feedback_answers(pending_answers)
+
+            async def _bounded_batch(batch: List[Dict]) -> List[Dict]:
+                async with semaphore:
+                    try:
+                        return await asyncio.wait_for(self.generate_batched_feedback(batch), timeout)
+                    except Exception as e:
+                        self._log_error(f"Error generating batched feedback: {e!r}")
+                        return [self._default_feedback() for _ in batch]
+
+            results = await asyncio.gather(*(_bounded_batch(batch) for batch in batches))
+            generated = [feedback for batch_feedback in results for feedback in batch_feedback]
+        else:
+            timeout = timeout or getattr(settings, 'QUIZ_FEEDBACK_TIMEOUT', 20)
+
+            async def _bounded_feedback(answer: Dict) -> Dict:
+                async with semaphore:
+                    try:
+                        return await asyncio.wait_for(self._request_feedback(**answer), timeout)
+                    except Exception as e:
+                        self._log_error(f"Error generating answer feedback: {e!r}")
+                        return self._default_feedback()
+
+            generated = await asyncio.gather(*(_bounded_feedback(answer) for answer in pending_answers))
+
+        default_feedback = self._default_feedback()
+        for index, feedback in zip(pending, generated):
+            feedback_list[index] = feedback
+            if feedback != default_feedback:
+                await self.feedback_memo.aset(memo_keys[index], feedback)
+
+        return feedback_list
+
+    async def generate_batched_feedback(self, answers: List[Dict]) -> List[Dict]:
+        """
+        Generate feedback for several answers with a single model call
+        
+        Args:
+            answers: List of dicts holding the keyword arguments of generate_feedback
+            
+        Returns:
+            Feedback dicts in the same order as the answers. Answers missing from
+            the model response get the default feedback.
+        """
+        prompt = await self._format_batch_feedback_prompt(answers)
+        response_data = await self.llm.generate_json(
+            prompt, 'feedback', response_schema=BATCH_FEEDBACK_RESPONSE_SCHEMA, priority=self.priority
+        )
+        feedback_items = response_data.get('feedback', []) if isinstance(response_data, dict) else []
+
+        feedback_by_index = {}
+        for item in feedback_items:
+            if BATCH_FEEDBACK_ITEM_VALIDATOR.is_valid(item):
+                feedback_by_index[item['index']] = {
+                    field: value for field, value in item.items() if field != 'index'
+                }
+
+        return [
+            feedback_by_index.get(index) or self._default_feedback()
+            for index in range(1, len(answers) + 1)
+        ]
+
+    async def _format_batch_feedback_prompt(self, answers: List[Dict]) -> str:
+        """Build one feedback prompt covering every answer in the batch"""
+        answer_blocks = "\n".join([
+            await self._format_batch_feedback_item(index, answer)
+            for index, answer in enumerate(answers, start=1)
+        ])
+
+        prompt = f"""
+        Analyze each of these quiz answers and provide constructive feedback for every one.
+
+        {answer_blocks}
+
+        For each answer provide feedback that:
+        1. Acknowledges what the user did well
+        2. Identifies areas for improvement
+        3. Explains key concepts they might have missed
+        4. Offers specific suggestions for improvement
+
+        Return ONLY a JSON object with one entry per answer, in this exact format:
+        {{
+            "feedback": [
+                {{
+                    "index": 1,
+                    "strengths": "What the user did well",
+                    "areas_for_improvement": "What could be better",
+                    "key_concepts": "Important concepts to remember",
+                    "suggestions": "Specific tips for improvement"
+                }}
+            ]
+        }}
+        """
+        return prompt
+
+    async def _format_batch_feedback_item(self, index: int, answer: Dict) -> str:
+        """Format a single answer block of the batched feedback prompt"""
+        lines = [f"Answer {index}:", f"Question Type: {answer['question_type']}"]
+        if answer.get('question_text'):
+            lines.append(f"Question: {answer['question_text']}")
+        context = await self._fit_context(answer.get('context'), answer.get('question_text'), answer['correct_answer'])
+        if context:
+            lines.append(f"Context: {context}")
+        lines.append(f"Correct Answer: {answer['correct_answer']}")
+        lines.append(f"User's Answer: {answer['user_answer']}")
+        return "\n".join(lines) + "\n"
+
+    async def _chunk_feedback_answers(self, answers: List[Dict]) -> List[List[Dict]]:
+        """Split answers into batches whose prompt and expected output fit the token budget"""
+        token_budget = getattr(settings, 'QUIZ_FEEDBACK_BATCH_TOKEN_BUDGET', 6000)
+        base_tokens = estimate_tokens(await self._format_batch_feedback_prompt([]))
+
+        batches, current, current_tokens = [], [], base_tokens
+        for index, answer in enumerate(answers, start=1):
+            answer_tokens = (
+                estimate_tokens(await self._format_batch_feedback_item(index, answer))
+                + self.FEEDBACK_OUTPUT_TOKENS
+            )
+            if current and current_tokens + answer_tokens > token_budget:
+                batches.append(current)
+                current, current_tokens = [], base_tokens
+            current.append(answer)
+            current_tokens += answer_tokens
+
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _fit_context(self, context: Optional[str], question_text: Optional[str],
+                     correct_answer: Optional[str]) -> Optional[str]:
+        """Trim long answer context to the parts relevant to the question"""
+        if not context:
+            return context
+        query = f"{question_text or ''} {correct_answer or ''}"
+        return await self.prompt_builder.afit_content(context, self.context_token_budget, query=query)
+
+    def _feedback_memo_key(self, answer: Dict) -> str:
+        """Memo key for an answer dict holding the keyword arguments of generate_feedback"""
+        question_identity = '\x1f'.join(
+            str(answer.get(field) or '') for field in ('question_text', 'context', 'correct_answer')
+        )
+        return self.feedback_memo.make_key(question_identity, answer['user_answer'], answer['question_type'])
+
+    def _default_feedback(self) -> Dict:
+        """Fallback feedback used when the model call fails"""
+        return {
+            "strengths": "Unable to analyze strengths",
+            "areas_for_improvement": "Unable to analyze areas for improvement",
+            "key_concepts": "Please review the correct answer",
+            "suggestions": "Try reviewing the related course materials"
+        }
+
+    def _log_error(self, error_message: str) -> None:
+        """Log service errors"""
+        logger.error(f"Quiz Generation Error: {error_message}")
\ No newline at end of file
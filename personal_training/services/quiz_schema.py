@@ -0,0 +1,176 @@
+"""
+JSON schemas for generated quizzes and answer feedback
+
+Two flavours of each schema live here:
+
+* ``*_SCHEMA``: full JSON Schema (draft 2020-12) used to validate model
+  output. The quiz format rules (4 choices with exactly one correct for MCQs,
+  scenario_context for scenario questions, model_answer for open-ended
+  questions) are expressed here, and each validator is built once at import.
+* ``*_RESPONSE_SCHEMA``: the subset Gemini accepts as ``response_schema`` for
+  structured output, which constrains the shape of the response but cannot
+  express conditional rules.
+"""
+from jsonschema import Draft202012Validator
+
+QUESTION_TYPES = ['mcq', 'scenario', 'application', 'reflection', 'discussion']
+OPEN_ENDED_TYPES = ['application', 'reflection', 'discussion']
+
+# How each question type is described to the model in the quiz prompt
+QUESTION_TYPE_DESCRIPTIONS = {
+    'mcq': 'standard multiple choice questions testing knowledge recall',
+    'scenario': 'scenario-based questions that present a situation and ask for analysis',
+    'application': 'questions that test application of concepts to real-world situations',
+    'reflection': 'questions that encourage reflection on personal experiences',
+    'discussion': 'open-ended questions that promote discussion and critical thinking'
+}
+
+CHOICE_SCHEMA = {
+    'type': 'object',
+    'required': ['choice_text', 'is_correct'],
+    'properties': {
+        'choice_text': {'type': 'string', 'minLength': 1},
+        'is_correct': {'type': 'boolean'}
+    }
+}
+
+QUESTION_SCHEMA = {
+    'type': 'object',
+    'required': ['question_text', 'question_type', 'difficulty_level', 'explanation'],
+    'properties': {
+        'question_text': {'type': 'string', 'minLength': 1},
+        'question_type': {'enum': QUESTION_TYPES},
+        'difficulty_level': {'type': 'string'},
+        'explanation': {'type': 'string'},
+        'scenario_context': {'type': ['string', 'null']},
+        'model_answer': {'type': ['string', 'null']},
+        'choices': {'type': ['array', 'null']}
+    },
+    'allOf': [
+        {
+            'if': {'properties': {'question_type': {'const': 'mcq'}}},
+            'then': {
+                'required': ['choices'],
+                'properties': {
+                    'choices': {
+                        'type': 'array',
+                        'minItems': 4,
+                        'maxItems': 4,
+                        'items': CHOICE_SCHEMA,
+                        'contains': {'properties': {'is_correct': {'const': True}}},
+                        'minContains': 1,
+                        'maxContains': 1
+                    }
+                }
+            }
+        },
+        {
+            'if': {'properties': {'question_type': {'const': 'scenario'}}},
+            'then': {
+                'required': ['scenario_context'],
+                'properties': {'scenario_context': {'type': 'string', 'minLength': 1}}
+            }
+        },
+        {
+            'if': {'properties': {'question_type': {'enum': OPEN_ENDED_TYPES}}},
+            'then': {
+                'required': ['model_answer'],
+                'properties': {'model_answer': {'type': 'string', 'minLength': 1}}
+            }
+        }
+    ]
+}
+
+QUIZ_SCHEMA = {
+    'type': 'object',
+    'required': ['questions'],
+    'properties': {
+        'questions': {'type': 'array', 'minItems': 1, 'items': QUESTION_SCHEMA}
+    }
+}
+
+FEEDBACK_SCHEMA = {
+    'type': 'object',
+    'required': ['strengths', 'areas_for_improvement', 'key_concepts', 'suggestions'],
+    'properties': {
+        'strengths': {'type': 'string'},
+        'areas_for_improvement': {'type': 'string'},
+        'key_concepts': {'type': 'string'},
+        'suggestions': {'type': 'string'}
+    }
+}
+
+BATCH_FEEDBACK_ITEM_SCHEMA = {
+    **FEEDBACK_SCHEMA,
+    'required': ['index'] + FEEDBACK_SCHEMA['required'],
+    'properties': {'index': {'type': 'integer', 'minimum': 1}, **FEEDBACK_SCHEMA['properties']}
+}
+
+QUESTION_VALIDATOR = Draft202012Validator(QUESTION_SCHEMA)
+QUIZ_VALIDATOR = Draft202012Validator(QUIZ_SCHEMA)
+FEEDBACK_VALIDATOR = Draft202012Validator(FEEDBACK_SCHEMA)
+BATCH_FEEDBACK_ITEM_VALIDATOR = Draft202012Validator(BATCH_FEEDBACK_ITEM_SCHEMA)
+
+
+# Gemini structured-output schemas
+
+_FEEDBACK_RESPONSE_PROPERTIES = {
+    'strengths': {'type': 'string'},
+    'areas_for_improvement': {'type': 'string'},
+    'key_concepts': {'type': 'string'},
+    'suggestions': {'type': 'string'}
+}
+
+QUIZ_RESPONSE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'questions': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'question_text': {'type': 'string'},
+                    'question_type': {'type': 'string', 'enum': QUESTION_TYPES},
+                    'difficulty_level': {'type': 'string'},
+                    'scenario_context': {'type': 'string'},
+                    'choices': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'choice_text': {'type': 'string'},
+                                'is_correct': {'type': 'boolean'}
+                            },
+                            'required': ['choice_text', 'is_correct']
+                        }
+                    },
+                    'model_answer': {'type': 'string'},
+                    'explanation': {'type': 'string'}
+                },
+                'required': ['question_text', 'question_type', 'difficulty_level', 'explanation']
+            }
+        }
+    },
+    'required': ['questions']
+}
+
+FEEDBACK_RESPONSE_SCHEMA = {
+    'type': 'object',
+    'properties': _FEEDBACK_RESPONSE_PROPERTIES,
+    'required': list(_FEEDBACK_RESPONSE_PROPERTIES)
+}
+
+BATCH_FEEDBACK_RESPONSE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'feedback': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {'index': {'type': 'integer'}, **_FEEDBACK_RESPONSE_PROPERTIES},
+                'required': ['index'] + list(_FEEDBACK_RESPONSE_PROPERTIES)
+            }
+        }
+    },
+    'required': ['feedback']
+}
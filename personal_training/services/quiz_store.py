@@ -0,0 +1,171 @@
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+
+from personal_training.models import Choice, Question, Quiz, QuizAttempt, QuizAttemptAnswer
+
+
+class QuizStore:
+    """
+    Persists generated quizzes and graded attempts
+
+    A quiz is stored once per distinct set of questions (keyed by a fingerprint),
+    so repeated cache or bank hits map to the same row. Clients get a view of
+    the quiz without answer keys and submit answers by question and choice id.
+    """
+
+    async def save_quiz(self, quiz_data: Dict, module_id: Optional[int] = None,
+                        difficulty: str = '', prompt_version: int = 1) -> Quiz:
+        """Return the stored quiz for quiz_data, storing it with its questions and choices if new"""
+        fingerprint = self.fingerprint(quiz_data)
+        quiz = await Quiz.objects.filter(fingerprint=fingerprint).afirst()
+        if quiz is not None:
+            return quiz
+
+        try:
+            return await sync_to_async(self._create_quiz)(
+                quiz_data, fingerprint, module_id, difficulty, prompt_version
+            )
+        except IntegrityError:
+            # Another request stored the same quiz first
+            return await Quiz.objects.aget(fingerprint=fingerprint)
+
+    async def load_questions(self, quiz_id: int) -> List[Question]:
+        """Questions of a quiz in order, with their choices prefetched"""
+        return [
+            question async for question in
+            Question.objects.filter(quiz_id=quiz_id).prefetch_related('choices').order_by('order')
+        ]
+
+    async def record_attempt(self, quiz_id: int, user_id: Optional[int], graded_answers: List[Dict],
+                             score: float, correct_answers: int, total_questions: int) -> QuizAttempt:
+        """
+        Store a graded attempt and all of its answers in one bulk insert
+
+        Args:
+            graded_answers: Dicts with question_id, choice_id, answer_text, is_correct and feedback
+        """
+        return await sync_to_async(self._create_attempt)(
+            quiz_id, user_id, graded_answers, score, correct_answers, total_questions
+        )
+
+    def client_quiz(self, quiz: Quiz, quiz_data: Dict, question_ids: List[int],
+                    choice_ids: List[List[int]]) -> Dict:
+        """Quiz as sent to clients: ids and question content, without answer keys"""
+        return {
+            'quiz_id': quiz.id,
+            'questions': [
+                self.client_question(question, question_id, question_choice_ids)
+                for question, question_id, question_choice_ids
+                in zip(quiz_data['questions'], question_ids, choice_ids)
+            ]
+        }
+
+    @staticmethod
+    def client_question(question: Dict, question_id: Optional[int] = None,
+                        choice_ids: Optional[List[int]] = None) -> Dict:
+        """A question dict stripped of its correct answer, explanation and model answer"""
+        client_question = {
+            'id': question_id,
+            'question_text': question['question_text'],
+            'question_type': question['question_type'],
+            'difficulty_level': question.get('difficulty_level')
+        }
+        if question.get('scenario_context'):
+            client_question['scenario_context'] = question['scenario_context']
+        if question.get('choices'):
+            choice_ids = choice_ids or [None] * len(question['choices'])
+            client_question['choices'] = [
+                {'id': choice_id, 'choice_text': choice['choice_text']}
+                for choice, choice_id in zip(question['choices'], choice_ids)
+            ]
+        return client_question
+
+    async def client_quiz_for(self, quiz: Quiz) -> Dict:
+        """Client view of a stored quiz"""
+        questions = await self.load_questions(quiz.id)
+        return self.client_quiz(
+            quiz,
+            {'questions': [self.question_data(question) for question in questions]},
+            [question.id for question in questions],
+            [[choice.id for choice in question.choices.all()] for question in questions]
+        )
+
+    @staticmethod
+    def question_data(question: Question) -> Dict:
+        """A stored question in the generated quiz_data format (as used by LocalGrader)"""
+        data = {
+            'question_text': question.question_text,
+            'question_type': question.question_type,
+            'difficulty_level': question.difficulty_level,
+            'scenario_context': question.scenario_context or None,
+            'model_answer': question.model_answer or None,
+            'explanation': question.explanation
+        }
+        choices = list(question.choices.all())
+        if choices:
+            data['choices'] = [
+                {'choice_text': choice.choice_text, 'is_correct': choice.is_correct} for choice in choices
+            ]
+        return data
+
+    @staticmethod
+    def fingerprint(quiz_data: Dict) -> str:
+        payload = json.dumps(quiz_data['questions'], sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _create_quiz(self, quiz_data: Dict, fingerprint: str, module_id: Optional[int],
+                     difficulty: str, prompt_version: int) -> Quiz:
+        with transaction.atomic():
+            quiz = Quiz.objects.create(
+                module_id=module_id,
+                difficulty=difficulty,
+                fingerprint=fingerprint,
+                prompt_version=prompt_version
+            )
+            questions = Question.objects.bulk_create([
+                Question(
+                    quiz=quiz,
+                    order=order,
+                    question_type=question['question_type'],
+                    question_text=question['question_text'],
+                    difficulty_level=question.get('difficulty_level') or '',
+                    scenario_context=question.get('scenario_context') or '',
+                    model_answer=question.get('model_answer') or '',
+                    explanation=question.get('explanation') or ''
+                )
+                for order, question in enumerate(quiz_data['questions'])
+            ])
+            Choice.objects.bulk_create([
+                Choice(question=question, order=order, choice_text=choice['choice_text'],
+                       is_correct=choice['is_correct'])
+                for question, question_data in zip(questions, quiz_data['questions'])
+                for order, choice in enumerate(question_data.get('choices') or [])
+            ])
+        return quiz
+
+    def _create_attempt(self, quiz_id: int, user_id: Optional[int], graded_answers: List[Dict],
+                        score: float, correct_answers: int, total_questions: int) -> QuizAttempt:
+        with transaction.atomic():
+            attempt = QuizAttempt.objects.create(
+                quiz_id=quiz_id,
+                user_id=user_id,
+                score=score,
+                correct_answers=correct_answers,
+                total_questions=total_questions
+            )
+            QuizAttemptAnswer.objects.bulk_create([
+                QuizAttemptAnswer(
+                    attempt=attempt,
+                    question_id=answer['question_id'],
+                    choice_id=answer.get('choice_id'),
+                    answer_text=answer.get('answer_text') or '',
+                    is_correct=answer.get('is_correct'),
+                    feedback=answer.get('feedback') or {}
+                )
+                for answer in graded_answers
+            ])
+        return attempt
@@ -0,0 +1,141 @@
+"""
+Shared Redis access for the personal_training services
+
+Sync code uses one process-wide client on the Django cache's connection pool;
+coroutines use a native asyncio client with its own pool per event loop
+(asyncio connections cannot cross loops), so they never block the loop or hop
+to a thread. Both pools are sized from REDIS_MAX_CONNECTIONS.
+
+The sync client returns bytes like django_redis always has; the asyncio client
+decodes responses to str. Values are stored as JSON by both, so either side
+can read what the other wrote.
+"""
+
+import asyncio
+import threading
+import weakref
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+import redis.asyncio as aioredis
+from django.conf import settings
+from django_redis import get_redis_connection
+
+_sync_client = None
+_sync_lock = threading.Lock()
+
+# Event loop -> _LoopRedis
+_loop_clients = weakref.WeakKeyDictionary()
+
+_stats = Counter()
+
+
+class _LoopRedis:
+    """The asyncio client and registered scripts for one event loop"""
+
+    def __init__(self):
+        pool = aioredis.BlockingConnectionPool.from_url(
+            getattr(settings, 'REDIS_URL', settings.CACHES['default']['LOCATION']),
+            max_connections=getattr(settings, 'REDIS_MAX_CONNECTIONS', 50),
+            timeout=getattr(settings, 'REDIS_POOL_TIMEOUT', 5),
+            socket_timeout=getattr(settings, 'REDIS_SOCKET_TIMEOUT', 5),
+            decode_responses=True
+        )
+        self.client = aioredis.Redis(connection_pool=pool)
+        self.scripts: Dict[str, Any] = {}
+
+
+def get_redis():
+    """Return the process-wide sync client, sharing the Django cache's connection pool"""
+    global _sync_client
+    if _sync_client is None:
+        with _sync_lock:
+            if _sync_client is None:
+                _sync_client = get_redis_connection("default")
+    return _sync_client
+
+
+def get_async_redis() -> aioredis.Redis:
+    """Return the current event loop's asyncio client"""
+    return _loop_redis().client
+
+
+def async_script(source: str):
+    """Return a Lua script registered on the current loop's asyncio client"""
+    loop_redis = _loop_redis()
+    script = loop_redis.scripts.get(source)
+    if script is None:
+        script = loop_redis.scripts[source] = loop_redis.client.register_script(source)
+    return script
+
+
+def run_pipeline(build: Callable[[Any], None], transaction: bool = False,
+                 redis_client=None) -> List[Any]:
+    """
+    Send several commands in one round trip on the sync client
+
+    Args:
+        build: Called with the pipeline to queue commands on
+        transaction: Wrap the commands in MULTI/EXEC
+        redis_client: Client to pipeline on instead of the shared one
+
+    Returns:
+        The command results in the order they were queued
+    """
+    pipeline = (redis_client or get_redis()).pipeline(transaction=transaction)
+    build(pipeline)
+    _stats['pipelines'] += 1
+    _stats['pipelined_commands'] += len(pipeline)
+    return pipeline.execute()
+
+
+async def run_async_pipeline(build: Callable[[Any], None], transaction: bool = False,
+                             raise_on_error: bool = True, redis_client=None) -> List[Any]:
+    """
+    Send several commands in one round trip on the asyncio client
+
+    Args:
+        build: Called with the pipeline to queue commands on
+        transaction: Wrap the commands in MULTI/EXEC
+        raise_on_error: When False, failed commands return their exception in the results
+        redis_client: Client to pipeline on instead of the current loop's one
+
+    Returns:
+        The command results in the order they were queued
+    """
+    async with (redis_client or get_async_redis()).pipeline(transaction=transaction) as pipeline:
+        build(pipeline)
+        _stats['async_pipelines'] += 1
+        _stats['async_pipelined_commands'] += len(pipeline)
+        return await pipeline.execute(raise_on_error=raise_on_error)
+
+
+def get_pool_stats() -> Dict:
+    """Connection counts for the sync pool and the current loop's asyncio pool, plus pipeline counters"""
+    stats = {'sync': _describe_pool(get_redis().connection_pool), **_stats}
+    try:
+        stats['async'] = _describe_pool(get_async_redis().connection_pool)
+    except RuntimeError:
+        # No running event loop
+        stats['async'] = None
+    return stats
+
+
+def _loop_redis() -> _LoopRedis:
+    loop = asyncio.get_running_loop()
+    loop_redis = _loop_clients.get(loop)
+    if loop_redis is None:
+        loop_redis = _loop_clients[loop] = _LoopRedis()
+    return loop_redis
+
+
+def _describe_pool(pool) -> Optional[Dict]:
+    in_use = getattr(pool, '_in_use_connections', None)
+    if in_use is None:
+        # Pool implementation without the usual bookkeeping
+        return None
+    return {
+        'max_connections': pool.max_connections,
+        'in_use': len(in_use),
+        'idle': len(getattr(pool, '_available_connections', [])),
+    }
@@ -0,0 +1,116 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import LearningActivity, PerformanceMetric, Quiz, QuizAttempt, UserModuleProgress
+from .services.engagement import EngagementTracker
+from .services.learner_analytics import LearnerAnalyticsStore
+from .services.performance_feedback_cache import PerformanceFeedbackCache
+from .services.progress_history import ProgressHistory
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=LearningActivity)
+def track_learning_activity(sender, instance, created, **kwargs):
+    """Fold each new learning activity into the learner's engagement aggregates once it is committed"""
+    if not created:
+        return
+    user_feedback = instance.user_feedback
+    user_id, course_id = user_feedback.user_id, user_feedback.course_id
+    duration_seconds = instance.duration * 60  # duration is stored in minutes
+
+    def record():
+        try:
+            EngagementTracker().record_interaction(user_id, course_id, duration_seconds=duration_seconds)
+        except Exception as e:
+            logger.error(f"Error recording learning activity for {user_id}:{course_id}: {str(e)}")
+
+    transaction.on_commit(record)
+
+
+@receiver(post_save, sender=LearningActivity)
+@receiver(post_save, sender=PerformanceMetric)
+def refresh_feedback_analytics(sender, instance, **kwargs):
+    """Recompute the learner's analytics row once the activity or metric is committed"""
+    user_feedback = instance.user_feedback
+    _refresh_analytics(user_feedback.user_id, user_feedback.course_id)
+
+
+@receiver(post_save, sender=PerformanceMetric)
+def invalidate_performance_feedback(sender, instance, created, **kwargs):
+    """New module metrics make the learner's cached performance feedback stale once they are committed"""
+    user_feedback = instance.user_feedback
+    if not (created and user_feedback.module_id):
+        return
+    user_id, module_id = user_feedback.user_id, user_feedback.module_id
+    # bump() logs its own Redis errors, so a failure cannot escape the commit
+    transaction.on_commit(lambda: PerformanceFeedbackCache.bump(user_id, module_id))
+
+
+@receiver(post_save, sender=QuizAttempt)
+def invalidate_attempt_performance_feedback(sender, instance, created, **kwargs):
+    """A new quiz attempt makes the learner's cached performance feedback for its module stale"""
+    if not (created and instance.user_id):
+        return
+    user_id, quiz_id = instance.user_id, instance.quiz_id
+
+    def bump():
+        try:
+            module_id = Quiz.objects.filter(id=quiz_id).values_list('module_id', flat=True).first()
+        except Exception as e:
+            logger.error(f"Error looking up the module of quiz {quiz_id}: {str(e)}")
+            return
+        if module_id:
+            PerformanceFeedbackCache.bump(user_id, module_id)
+
+    transaction.on_commit(bump)
+
+
+@receiver(pre_save, sender=UserModuleProgress)
+def detect_module_completion(sender, instance, **kwargs):
+    """Note whether this save is the one that marks the module completed"""
+    instance._newly_completed = instance.completed_at is not None and (
+        instance.pk is None or not UserModuleProgress.objects.filter(
+            pk=instance.pk, completed_at__isnull=False
+        ).exists()
+    )
+
+
+@receiver(post_save, sender=UserModuleProgress)
+def record_module_completion(sender, instance, **kwargs):
+    """Count a newly completed module on its completion day once the save is committed"""
+    if not getattr(instance, '_newly_completed', False):
+        return
+    instance._newly_completed = False
+    user_id, course_id = instance.user_id, instance.module.course_id
+    completed_at = instance.completed_at
+    day = timezone.localdate(completed_at) if timezone.is_aware(completed_at) else completed_at.date()
+
+    def record():
+        try:
+            ProgressHistory().record(user_id, course_id, day=day)
+        except Exception as e:
+            logger.error(f"Error recording module completion for {user_id}:{course_id}: {str(e)}")
+
+    transaction.on_commit(record)
+
+
+@receiver(post_save, sender=UserModuleProgress)
+def refresh_progress_analytics(sender, instance, **kwargs):
+    """Recompute the learner's analytics row once the module progress is committed"""
+    _refresh_analytics(instance.user_id, instance.module.course_id)
+
+
+def _refresh_analytics(user_id, course_id: int) -> None:
+    def refresh():
+        # A failed refresh must not fail the save; the next catch-up run repairs the row
+        try:
+            LearnerAnalyticsStore().refresh(user_id, course_id)
+        except Exception as e:
+            logger.error(f"Error refreshing learner analytics for {user_id}:{course_id}: {str(e)}")
+
+    transaction.on_commit(refresh)
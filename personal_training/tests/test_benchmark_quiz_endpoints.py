@@ -0,0 +1,124 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from personal_training.management.commands import benchmark_quiz_endpoints
+from personal_training.management.commands.benchmark_quiz_endpoints import Command, _percentile, _relative
+from personal_training.models import Quiz
+from personal_training.services.fake_llm import FakeLLMClient
+from personal_training.services.quiz_module import QuizGenerationService
+from personal_training.services.quiz_schema import (
+    FEEDBACK_RESPONSE_SCHEMA, FEEDBACK_VALIDATOR, QUESTION_TYPE_DESCRIPTIONS, QUIZ_RESPONSE_SCHEMA, QUIZ_VALIDATOR
+)
+
+from .utils import FakeRedisMixin, requires_fakeredis
+
+
+@requires_fakeredis
+@override_settings(FAKE_LLM_LATENCY_MS=0, FAKE_LLM_ERROR_RATE=0, FAKE_LLM_HANG_RATE=0, FAKE_LLM_SEED=7)
+class FakeLLMClientTests(FakeRedisMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = FakeLLMClient()
+        self.use_llm(self.client)
+        self.service = QuizGenerationService()
+
+    async def test_quizzes_have_the_requested_valid_questions(self):
+        question_types = {qtype: 2 for qtype in QUESTION_TYPE_DESCRIPTIONS}
+        prompt = await self.service._format_prompt('Closures capture their scope.', question_types, 'advanced')
+
+        quiz = await self.client.generate_json(prompt, QUIZ_RESPONSE_SCHEMA)
+
+        self.assertTrue(QUIZ_VALIDATOR.is_valid(quiz))
+        self.assertTrue(self.service._validate_quiz_data(quiz, question_types))
+        self.assertEqual({question['difficulty_level'] for question in quiz['questions']}, {'advanced'})
+
+    async def test_feedback_passes_the_feedback_schemas(self):
+        self.assertTrue(FEEDBACK_VALIDATOR.is_valid(await self.client.generate_json('Q', FEEDBACK_RESPONSE_SCHEMA)))
+
+        answers = [{'user_answer': f"answer {number}", 'correct_answer': 'right', 'question_type': 'scenario'}
+                   for number in range(3)]
+        feedback = await self.service.generate_batched_feedback(answers)
+
+        self.assertEqual([item['strengths'] for item in feedback], ["Simulated strengths"] * 3)
+
+    async def test_free_form_prompts_get_their_template_filled(self):
+        response = await self.client.generate_json('Provide feedback in this JSON format:\n'
+                                                   '{"overall_assessment": "...", "next_steps": ["..."]}')
+
+        self.assertEqual(response, {'overall_assessment': "Simulated overall_assessment",
+                                    'next_steps': ["Simulated next_steps"]})
+
+    @override_settings(FAKE_LLM_ERROR_RATE=1)
+    async def test_simulated_failures_raise(self):
+        with self.assertRaises(ConnectionError):
+            await FakeLLMClient().generate_json('Q', FEEDBACK_RESPONSE_SCHEMA)
+
+
+class BenchmarkStatisticsTests(SimpleTestCase):
+
+    def test_percentiles_use_the_nearest_rank(self):
+        latencies = [float(value) for value in range(1, 101)]
+
+        self.assertEqual(_percentile(latencies, 50), 50.0)
+        self.assertEqual(_percentile(latencies, 99), 99.0)
+        self.assertEqual(_percentile([3.0], 95), 3.0)
+        self.assertEqual(_percentile([], 50), 0.0)
+
+    def test_relative_changes(self):
+        self.assertEqual(_relative(200, 150), "-25.0%")
+        self.assertEqual(_relative(0, 5), "n/a")
+
+    async def test_drive_counts_errors_and_summarises_latency(self):
+        async def app(scope, receive, send):
+            body = (await receive())['body']
+            await send({'type': 'http.response.start', 'status': 500 if body == b'fail' else 200, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b''})
+
+        stats = await Command()._drive(app, '/quiz', ['ok', 'ok', 'ok', 'fail'], concurrency=2)
+
+        self.assertEqual((stats['requests'], stats['errors']), (4, 1))
+        self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+        self.assertLessEqual(stats['p99_ms'], stats['max_ms'])
+        self.assertGreater(stats['throughput_rps'], 0)
+        self.assertGreaterEqual(stats['peak_threads'], 1)
+
+
+@requires_fakeredis
+class BenchmarkCommandTests(FakeRedisMixin, TransactionTestCase):
+    """The tests already run on a test database, so the command's own one is stubbed out"""
+
+    def setUp(self):
+        super().setUp()
+        self.databases_config = object()
+        for name, value in (('setup_databases', mock.Mock(return_value=self.databases_config)),
+                            ('teardown_databases', mock.Mock())):
+            patcher = mock.patch.object(benchmark_quiz_endpoints, name, value)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+        self.output = Path(tempfile.mkdtemp()) / 'results.json'
+
+    def test_runs_every_scenario_on_a_test_database(self):
+        # One request at a time: the in-memory SQLite test database locks tables across threads
+        call_command('benchmark_quiz_endpoints', requests=2, concurrency=1, latency_ms=0,
+                     output=str(self.output), stdout=mock.Mock())
+
+        report = json.loads(self.output.read_text())
+        self.assertEqual(set(report['scenarios']), set(benchmark_quiz_endpoints.SCENARIOS))
+        for name, stats in report['scenarios'].items():
+            self.assertEqual((stats['requests'], stats['errors']), (2, 0), name)
+        self.setup_databases.assert_called_once()
+        self.teardown_databases.assert_called_once_with(self.databases_config, verbosity=0, keepdb=False)
+        self.assertTrue(Quiz.objects.exists())  # written to the (here stubbed) benchmark database
+
+    def test_the_test_database_is_torn_down_when_the_run_fails(self):
+        with mock.patch.object(Command, '_run', side_effect=RuntimeError("boom")), \
+                self.assertRaises(RuntimeError):
+            call_command('benchmark_quiz_endpoints', requests=1, output=str(self.output), stdout=mock.Mock())
+
+        self.teardown_databases.assert_called_once_with(self.databases_config, verbosity=0, keepdb=False)
@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from personal_training.models import (
+    LearningActivity, PerformanceMetric, UserCourseEnrollment, UserFeedback, UserModuleProgress
+)
+from personal_training.services.cohort_analytics import CohortAnalytics, learner_rows
+from personal_training.services.engagement import EngagementTracker
+from personal_training.services.Quizfeedback_module import QuizFeedbackModule
+
+from .utils import FakeRedisMixin, make_course, make_module, make_user, requires_fakeredis
+
+
+@requires_fakeredis
+class CohortAnalyticsTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.course = make_course()
+        self.modules = [make_module(self.course, title=title) for title in ('Closures', 'Generators', 'Decorators')]
+        self.learners = [make_user() for _ in range(3)]
+        self.enrollments = {
+            learner.id: UserCourseEnrollment.objects.create(user=learner, course=self.course)
+            for learner in self.learners
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self._complete(self.learners[0], self.modules[0], days_ago=0)
+            self._complete(self.learners[0], self.modules[1], days_ago=3)
+            self._complete(self.learners[0], self.modules[2], days_ago=20)
+            self._complete(self.learners[1], self.modules[0], days_ago=1)
+            self._scores(self.learners[0], self.modules[0], [90, 85])
+            self._scores(self.learners[0], self.modules[1], [50])
+            self._scores(self.learners[1], self.modules[2], [], average=95)
+            self._activity(self.learners[0], 'video', 30)
+            self._activity(self.learners[0], 'text', 10)
+            self._activity(self.learners[1], 'interactive', 5)
+        EngagementTracker().record_login(self.learners[0].id)
+        EngagementTracker().record_login(self.learners[1].id)
+
+        # Feedback from a learner who is not enrolled does not make them part of the cohort
+        UserFeedback.objects.create(user=make_user(), course=self.course)
+
+    def _complete(self, learner, module, days_ago):
+        UserModuleProgress.objects.create(
+            user=learner, module=module, enrollment=self.enrollments[learner.id],
+            completed_at=timezone.now() - timedelta(days=days_ago), progress_percentage=100
+        )
+
+    def _feedback(self, learner, module=None, **fields):
+        return UserFeedback.objects.get_or_create(user=learner, course=self.course, module=module, defaults=fields)[0]
+
+    def _scores(self, learner, module, scores, average=0):
+        feedback = self._feedback(learner, module, average_quiz_score=average)
+        for score in scores:
+            PerformanceMetric.objects.create(user_feedback=feedback, metric_type='quiz_score', value=score)
+
+    def _activity(self, learner, content_type, minutes):
+        LearningActivity.objects.create(user_feedback=self._feedback(learner), activity_type='content_view',
+                                        content_type=content_type, duration=minutes)
+
+    def test_learners_match_the_single_learner_analysis(self):
+        rows = learner_rows(CohortAnalytics(self.course.id, timeframe_days=14).run())
+        titles = {module.id: module.title for module in self.modules}
+
+        self.assertEqual([row['user_id'] for row in rows], sorted(str(learner.id) for learner in self.learners))
+        analysis = QuizFeedbackModule()
+        for row in rows:
+            expected = analysis.analyze_learning_patterns(row['user_id'], self.course.id, timeframe_days=14)
+            with self.subTest(learner=row['user_id']):
+                for metric in ('completion_rate', 'progress_velocity'):
+                    self.assertAlmostEqual(row[metric], expected[metric])
+                self.assertAlmostEqual(row['timeframe_progress'], expected['timeframe_progress'])
+                self.assertAlmostEqual(row['engagement_score'], expected['engagement_score'], places=3)
+                self.assertEqual(row['learning_style'], expected['learning_style'])
+                self.assertEqual([titles[module_id] for module_id in row['strength_areas']],
+                                 expected['strength_areas'])
+                self.assertEqual([titles[module_id] for module_id in row['challenge_areas']],
+                                 expected['challenge_areas'])
+
+    def test_metric_definitions(self):
+        rows = {row['user_id']: row for row in learner_rows(CohortAnalytics(self.course.id, 14).run())}
+        first, second, idle = (rows[str(learner.id)] for learner in self.learners)
+
+        self.assertEqual([first['completion_rate'], second['completion_rate'], idle['completion_rate']],
+                         [100.0, 1 / 3 * 100, 0.0])
+        self.assertEqual([first['progress_velocity'], first['timeframe_progress']], [2.0, 2.0])
+        self.assertEqual([first['learning_style'], second['learning_style'], idle['learning_style']],
+                         ['video', 'interactive', 'visual'])
+        self.assertEqual(first['strength_areas'], [self.modules[0].id])
+        self.assertEqual(first['challenge_areas'], [self.modules[1].id])
+        self.assertEqual(second['strength_areas'], [self.modules[2].id])
+        self.assertGreater(first['engagement_score'], 0)
+        self.assertEqual(idle['engagement_score'], 0)
+
+    def test_chunking_does_not_change_the_results(self):
+        whole = CohortAnalytics(self.course.id, 14).run()
+        chunked = CohortAnalytics(self.course.id, 14, chunk_size=1).run()
+
+        whole_rows, chunked_rows = learner_rows(whole), learner_rows(chunked)
+        for whole_row, chunked_row in zip(whole_rows, chunked_rows):
+            self.assertEqual(whole_row.keys(), chunked_row.keys())
+            for name, value in whole_row.items():
+                if isinstance(value, float):
+                    self.assertAlmostEqual(value, chunked_row[name], places=3)
+                else:
+                    self.assertEqual(value, chunked_row[name])
+        self.assertEqual(chunked['summary']['learners'], 3)
+
+    def test_empty_course(self):
+        result = CohortAnalytics(make_course().id).run()
+
+        self.assertEqual(result['summary']['learners'], 0)
+        self.assertEqual(learner_rows(result), [])
@@ -0,0 +1,83 @@
+import math
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from personal_training.services import engagement
+from personal_training.services.engagement import EngagementTracker
+
+from .utils import FakeRedisMixin, requires_fakeredis
+
+DAY = 24 * 60 * 60
+
+
+@requires_fakeredis
+@override_settings(ENGAGEMENT_DECAY_DAYS=1, ENGAGEMENT_SESSION_ALPHA=0.5,
+                   ENGAGEMENT_LOGIN_TARGET=1, ENGAGEMENT_INTERACTION_TARGET=10)
+class EngagementTrackerTests(FakeRedisMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tracker = EngagementTracker()
+        self.clock = mock.Mock(wraps=time)
+        self.clock.time.return_value = 1_000_000.0
+        patcher = mock.patch.object(engagement, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_events_are_counted_per_user_and_course(self):
+        self.tracker.record_login(1)
+        self.tracker.record_login(1)
+        self.tracker.record_interaction(1, 10)
+        self.tracker.record_interaction(1, 20)
+
+        summary = self.tracker.get(1, 10)
+
+        self.assertEqual((summary['login_count'], summary['interaction_count']), (2, 1))
+        self.assertEqual(self.tracker.get(2, 10)['login_count'], 0)
+
+    def test_rates_decay_with_the_time_since_the_last_event(self):
+        self.tracker.record_interaction(1, 10)
+        self.clock.time.return_value += DAY
+        self.tracker.record_interaction(1, 10)
+
+        # Each event adds 1/tau; the first has decayed for one time constant
+        self.assertAlmostEqual(self.tracker.get(1, 10)['interactions_per_day'], math.exp(-1) + 1)
+
+        self.clock.time.return_value += DAY
+        self.assertAlmostEqual(self.tracker.get(1, 10)['interactions_per_day'], (math.exp(-1) + 1) * math.exp(-1))
+
+    def test_session_length_is_an_exponentially_weighted_average(self):
+        self.tracker.record_interaction(1, 10, duration_seconds=600)
+        self.tracker.record_interaction(1, 10)  # no duration leaves the average alone
+        self.tracker.record_interaction(1, 10, duration_seconds=1800)
+
+        self.assertEqual(self.tracker.get(1, 10)['avg_session_duration'], 0.5 * 1800 + 0.5 * 600)
+
+    def test_score_weights_each_rate_against_its_target(self):
+        self.tracker.record_login(1)
+        for _ in range(5):
+            self.tracker.record_interaction(1, 10, duration_seconds=1800)
+
+        summary = self.tracker.get(1, 10)
+
+        self.assertAlmostEqual(summary['engagement_score'], (0.3 * 1 + 0.4 * 0.5 + 0.3 * 0.5) * 100)
+
+    def test_summarize_accepts_bytes_and_missing_hashes(self):
+        self.assertEqual(EngagementTracker.summarize({}, None)['engagement_score'], 0)
+
+        summary = EngagementTracker.summarize(
+            {b'rate': b'0', b'last_event_at': b'0', b'login_count': b'3'}, {}, now=1.0
+        )
+        self.assertEqual(summary['login_count'], 3)
+
+    def test_hashes_expire(self):
+        with override_settings(ENGAGEMENT_TTL=60):
+            self.tracker.record_login(1)
+
+        self.assertEqual(self.redis.ttl(EngagementTracker.user_key(1)), 60)
+
+    def test_redis_errors_do_not_escape(self):
+        with mock.patch.object(self.tracker, '_record', side_effect=ConnectionError("down")):
+            self.tracker.record_interaction(1, 10, duration_seconds=60)
@@ -0,0 +1,163 @@
+import asyncio
+import json
+from unittest import mock
+
+from channels.layers import get_channel_layer
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from personal_training.services.feedback_jobs import (
+    FeedbackJobQueueFull, FeedbackJobService, FeedbackJobWorker
+)
+from personal_training.services.Quizfeedback_module import QuizFeedbackModule
+
+from .utils import FakeRedisMixin, make_user, requires_fakeredis, sign_in
+
+
+IN_MEMORY_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+def patch_feedback(**kwargs):
+    return mock.patch.object(QuizFeedbackModule, 'generate_performance_feedback', mock.AsyncMock(**kwargs))
+
+
+@requires_fakeredis
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class FeedbackJobServiceTests(FakeRedisMixin, SimpleTestCase):
+
+    async def test_jobs_run_in_submission_order_with_allowed_params_only(self):
+        service = FeedbackJobService()
+        first = await service.submit('performance_feedback', 'user-1', {'module_id': 3, 'is_staff': True})
+        second = await service.submit('performance_feedback', 'user-1', {'module_id': 4})
+
+        with patch_feedback(return_value={'summary': 'ok'}) as generate:
+            self.assertEqual(await service.claim(lease=30), first)
+            await service.run_job(first)
+
+        generate.assert_awaited_once_with(user_id='user-1', module_id=3)
+        job = await service.get(first)
+        self.assertEqual((job['status'], job['result'], job['attempts']), ('completed', {'summary': 'ok'}, 1))
+        self.assertEqual(await service.redis_client.zcard(FeedbackJobService.PROCESSING_KEY), 0)
+        self.assertEqual(await service.claim(lease=30), second)
+
+    async def test_finished_jobs_are_pushed_to_the_user_group(self):
+        service = FeedbackJobService()
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        await layer.group_add(FeedbackJobService.group_name('user-1'), channel)
+        job_id = await service.submit('performance_feedback', 'user-1', {})
+
+        with patch_feedback(return_value={'summary': 'ok'}):
+            await service.run_job(await service.claim(lease=30))
+
+        message = await asyncio.wait_for(layer.receive(channel), 1)
+        self.assertEqual(message['type'], 'feedback.job')
+        self.assertEqual((message['job']['job_id'], message['job']['status']), (job_id, 'completed'))
+
+    @override_settings(FEEDBACK_JOB_MAX_QUEUE=1)
+    async def test_full_queue_rejects_jobs(self):
+        service = FeedbackJobService()
+        await service.submit('performance_feedback', 'user-1', {})
+
+        with self.assertRaises(FeedbackJobQueueFull):
+            await service.submit('performance_feedback', 'user-1', {})
+
+    async def test_jobs_of_dead_workers_are_queued_again(self):
+        service = FeedbackJobService()
+        job_id = await service.submit('performance_feedback', 'user-1', {})
+        await service.claim(lease=0.01)
+        await asyncio.sleep(0.02)
+
+        self.assertEqual(await service.recover_expired(), [job_id])
+        self.assertEqual(await service.claim(lease=30), job_id)
+        self.assertEqual(await service.recover_expired(), [])
+
+    async def test_live_leases_are_renewed_and_not_recovered(self):
+        service = FeedbackJobService()
+        job_id = await service.submit('performance_feedback', 'user-1', {})
+        await service.claim(lease=0.05)
+        await asyncio.sleep(0.03)
+
+        self.assertTrue(await service.extend(job_id, 30))
+        await asyncio.sleep(0.03)
+        self.assertEqual(await service.recover_expired(), [])
+
+    @override_settings(FEEDBACK_JOB_MAX_ATTEMPTS=2)
+    async def test_job_fails_after_the_maximum_attempts(self):
+        service = FeedbackJobService()
+        job_id = await service.submit('performance_feedback', 'user-1', {})
+        job = await service.get(job_id)
+        await service._save({**job, 'attempts': 2})
+
+        with patch_feedback() as generate:
+            await service.claim(lease=30)
+            await service.run_job(job_id)
+
+        generate.assert_not_awaited()
+        job = await service.get(job_id)
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn('2 attempts', job['result']['error'])
+
+
+@requires_fakeredis
+@override_settings(FEEDBACK_JOB_POLL_INTERVAL=0.01, CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class FeedbackJobWorkerTests(FakeRedisMixin, SimpleTestCase):
+
+    async def test_worker_runs_queued_jobs_with_bounded_concurrency(self):
+        service = FeedbackJobService()
+        job_ids = [await service.submit('performance_feedback', f"user-{n}", {}) for n in range(5)]
+        running = peak = 0
+
+        async def generate(**kwargs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+            return {'summary': kwargs['user_id']}
+
+        stop = asyncio.Event()
+        with mock.patch.object(QuizFeedbackModule, 'generate_performance_feedback', side_effect=generate,
+                               autospec=False):
+            worker = asyncio.ensure_future(FeedbackJobWorker(concurrency=2).run(stop))
+            for _ in range(100):
+                jobs = [await service.get(job_id) for job_id in job_ids]
+                if all(job['status'] == 'completed' for job in jobs):
+                    break
+                await asyncio.sleep(0.01)
+            stop.set()
+            await worker
+
+        self.assertTrue(all(job['status'] == 'completed' for job in jobs))
+        self.assertEqual(peak, 2)
+
+
+@requires_fakeredis
+class FeedbackJobViewTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+
+    def _submit(self):
+        return self.client.post(
+            reverse('personal_training:submit_feedback_job'),
+            json.dumps({'kind': 'performance_feedback', 'params': {'module_id': 1}}),
+            content_type='application/json'
+        )
+
+    def test_submitting_requires_a_signed_in_user(self):
+        self.assertEqual(self._submit().status_code, 401)
+
+    def test_jobs_are_queued_for_and_visible_to_their_owner_only(self):
+        sign_in(self.client, self.user)
+        response = self._submit()
+        self.assertEqual(response.status_code, 202)
+
+        status = self.client.get(response.json()['status_url'])
+        self.assertEqual(status.status_code, 200)
+        self.assertEqual(status.json()['job']['user_id'], str(self.user.id))
+        self.assertEqual(status.json()['job']['status'], 'queued')
+
+        sign_in(self.client, make_user())
+        self.assertEqual(self.client.get(response.json()['status_url']).status_code, 404)
@@ -0,0 +1,95 @@
+import time
+from collections import OrderedDict
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from personal_training.services import feedback_memo, redis_pool
+from personal_training.services.feedback_memo import FeedbackMemo
+
+from .utils import FakeRedisMixin, requires_fakeredis
+
+FEEDBACK = {'strengths': 's', 'areas_for_improvement': 'a', 'key_concepts': 'k', 'suggestions': 'g'}
+
+
+@requires_fakeredis
+class FeedbackMemoTests(FakeRedisMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.memo = FeedbackMemo('quiz')
+
+    def test_keys_ignore_answer_case_and_whitespace(self):
+        key = self.memo.make_key('What is a closure?', '  A Function\n capturing scope', 'scenario')
+
+        self.assertEqual(key, self.memo.make_key('What is a closure?', 'a function capturing SCOPE', 'scenario'))
+        self.assertNotEqual(key, self.memo.make_key('What is a closure?', 'a function capturing scope', 'mcq'))
+        self.assertNotEqual(key, self.memo.make_key('What is a lambda?', 'a function capturing scope', 'scenario'))
+
+    def test_entries_survive_the_local_cache(self):
+        key = self.memo.make_key('Q', 'answer', 'scenario')
+        self.memo.set(key, FEEDBACK)
+
+        with mock.patch.object(FeedbackMemo, '_local', OrderedDict()):
+            self.assertEqual(FeedbackMemo('quiz').get(key, 'scenario'), FEEDBACK)
+        self.assertIsNone(self.memo.get(self.memo.make_key('Q', 'other', 'scenario'), 'scenario'))
+
+    async def test_async_lookups_share_entries_and_stats_with_sync_ones(self):
+        key = self.memo.make_key('Q', 'answer', 'scenario')
+        self.assertIsNone(await self.memo.aget(key, 'scenario'))
+        await self.memo.aset(key, FEEDBACK)
+
+        with mock.patch.object(FeedbackMemo, '_local', OrderedDict()):
+            self.assertEqual(FeedbackMemo('quiz').get(key, 'scenario'), FEEDBACK)
+            self.assertEqual(await FeedbackMemo('quiz').aget(key, 'scenario'), FEEDBACK)
+        self.assertEqual(self.memo.get_stats()['scenario'], {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3})
+
+    async def test_many_lookups_share_one_round_trip(self):
+        keys = [self.memo.make_key('Q', f"answer {number}", 'scenario') for number in range(3)]
+        self.memo.set(keys[0], FEEDBACK)
+        self.memo.set(keys[2], {**FEEDBACK, 'strengths': 'other'})
+        pipelines = redis_pool._stats['async_pipelines']
+
+        with mock.patch.object(FeedbackMemo, '_local', OrderedDict()), \
+                mock.patch.object(FeedbackMemo, '_last_stats_flush', time.monotonic()):
+            found = await self.memo.aget_many([(key, 'scenario') for key in keys])
+
+        self.assertEqual(found, [FEEDBACK, None, {**FEEDBACK, 'strengths': 'other'}])
+        self.assertEqual(redis_pool._stats['async_pipelines'], pipelines + 1)
+        self.assertEqual(self.memo.get_stats()['scenario'], {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3})
+
+    async def test_changing_returned_feedback_leaves_the_memo_intact(self):
+        key = self.memo.make_key('Q', 'answer', 'scenario')
+        stored = dict(FEEDBACK)
+        await self.memo.aset(key, stored)
+        stored['question_id'] = 1
+
+        (await self.memo.aget(key, 'scenario'))['score'] = 0
+        self.memo.get(key, 'scenario')['strengths'] = 'changed'
+        (await self.memo.aget_many([(key, 'scenario')]))[0].clear()
+
+        self.assertEqual(await self.memo.aget(key, 'scenario'), FEEDBACK)
+
+    @override_settings(FEEDBACK_MEMO_MAX_ENTRIES=2)
+    def test_least_recently_used_entries_are_evicted(self):
+        memo = FeedbackMemo('quiz')
+        keys = [memo.make_key('Q', f"answer {number}", 'scenario') for number in range(3)]
+        clock = mock.Mock(wraps=time)
+        clock.time.side_effect = [1, 2, 3, 4]
+        with mock.patch.object(feedback_memo, 'time', clock):
+            memo.set(keys[0], FEEDBACK)
+            memo.set(keys[1], FEEDBACK)
+            with mock.patch.object(FeedbackMemo, '_local', OrderedDict()):
+                memo.get(keys[0], 'scenario')  # refreshes keys[0] in the index
+            memo.set(keys[2], FEEDBACK)
+
+        self.assertEqual([bool(self.redis.exists(key)) for key in keys], [True, False, True])
+
+    def test_hits_and_misses_are_counted_per_question_type(self):
+        key = self.memo.make_key('Q', 'answer', 'scenario')
+        self.memo.get(key, 'scenario')
+        self.memo.set(key, FEEDBACK)
+        self.memo.get(key, 'scenario')
+        self.memo.get(key, 'scenario')
+
+        self.assertEqual(self.memo.get_stats()['scenario'], {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3})
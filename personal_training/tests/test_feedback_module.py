@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from personal_training.models import UserFeedback
+from personal_training.services.feedback_module import FeedbackModule
+
+from .utils import make_course, make_user
+
+
+@override_settings(FEEDBACK_PAGE_SIZE=2, FEEDBACK_PAGE_MAX_SIZE=3)
+class CourseFeedbackPaginationTests(TestCase):
+
+    def setUp(self):
+        self.course = make_course()
+        self.other_course = make_course()
+        self.service = FeedbackModule()
+        now = timezone.now()
+        # Two rows share each timestamp, so pages must break ties on id
+        for hours_ago in (1, 1, 2, 2, 3, 4, 5):
+            feedback = UserFeedback.objects.create(user=make_user(), course=self.course)
+            UserFeedback.objects.filter(pk=feedback.pk).update(updated_at=now - timedelta(hours=hours_ago))
+        UserFeedback.objects.create(user=make_user(), course=self.other_course)
+        self.newest_first = list(
+            UserFeedback.objects.filter(course=self.course).order_by('-updated_at', '-id').values_list('user_id', flat=True)
+        )
+
+    def _walk(self, **filters):
+        pages, cursor = [], None
+        while True:
+            page = self.service.get_course_feedback(course_id=self.course.id, cursor=cursor, **filters)
+            pages.append([feedback['user_id'] for feedback in page['feedbacks']])
+            cursor = page['next_cursor']
+            if cursor is None:
+                return pages
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        pages = self._walk()
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        self.assertEqual([user_id for page in pages for user_id in page], self.newest_first)
+
+    def test_rows_saved_between_pages_do_not_shift_the_next_page(self):
+        first = self.service.get_course_feedback(course_id=self.course.id)
+        UserFeedback.objects.create(user=make_user(), course=self.course)
+
+        second = self.service.get_course_feedback(course_id=self.course.id, cursor=first['next_cursor'])
+
+        self.assertEqual([feedback['user_id'] for feedback in second['feedbacks']], self.newest_first[2:4])
+
+    def test_limits_are_clamped_to_the_maximum(self):
+        pages = self._walk(limit=50)
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+
+    def test_limits_from_query_parameters_are_parsed(self):
+        page = self.service.get_course_feedback(course_id=self.course.id, limit='1')
+
+        self.assertEqual([feedback['user_id'] for feedback in page['feedbacks']], self.newest_first[:1])
+
+    def test_invalid_limits_are_rejected(self):
+        for limit in ('abc', '', '2.5', 2.5, True, 0, '0', -1):
+            with self.subTest(limit=limit), self.assertRaises(ValidationError):
+                self.service.get_course_feedback(course_id=self.course.id, limit=limit)
+
+    def test_invalid_cursors_are_rejected(self):
+        with self.assertRaises(ValidationError):
+            self.service.get_course_feedback(course_id=self.course.id, cursor='not-a-cursor')
+
+    def test_export_walks_the_same_order_in_chunks(self):
+        with override_settings(FEEDBACK_EXPORT_CHUNK_SIZE=3):
+            exported = [feedback['user_id'] for feedback in FeedbackModule().iter_course_feedback(course_id=self.course.id)]
+
+        self.assertEqual(exported, self.newest_first)
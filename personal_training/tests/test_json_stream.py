@@ -0,0 +1,85 @@
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from personal_training.services.json_stream import IncrementalArrayParser
+from personal_training.services.quiz_module import QuizGenerationService
+
+from .utils import FakeRedisMixin, make_mcq, requires_fakeredis
+
+
+def chunks(text: str, size: int):
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+
+class IncrementalArrayParserTests(SimpleTestCase):
+
+    def test_elements_are_returned_as_soon_as_they_close(self):
+        parser = IncrementalArrayParser('questions')
+
+        self.assertEqual(parser.feed('{"title": "x", "questions": [{"a": 1}, {"b"'), [{'a': 1}])
+        self.assertEqual(parser.feed(': 2}'), [{'b': 2}])
+        self.assertEqual(parser.feed(']}'), [])
+        self.assertTrue(parser.finished)
+
+    def test_any_chunking_yields_the_same_elements(self):
+        questions = [
+            {'text': 'Braces { and } and brackets ] in "strings"', 'nested': {'list': [1, {'x': '}'}]}},
+            {'text': 'Escaped backslash \\ then quote \\"', 'n': 2},
+        ]
+        document = json.dumps({'meta': {'questions_total': 2}, 'questions': questions, 'after': [{'ignored': 1}]})
+
+        for size in (1, 2, 3, 7, len(document)):
+            parser = IncrementalArrayParser('questions')
+            parsed = [element for chunk in chunks(document, size) for element in parser.feed(chunk)]
+            self.assertEqual(parsed, questions, f"chunk size {size}")
+
+    def test_malformed_elements_are_skipped(self):
+        parser = IncrementalArrayParser('questions')
+
+        self.assertEqual(parser.feed('{"questions": [{"a": tru}, {"b": 2}]}'), [{'b': 2}])
+
+    def test_buffer_is_compacted_as_elements_complete(self):
+        parser = IncrementalArrayParser('questions')
+        parser.feed('{"questions": [' + ', '.join(json.dumps({'n': n}) for n in range(100)))
+
+        self.assertLess(len(parser._buffer), 20)
+
+
+@requires_fakeredis
+class GenerateQuizStreamTests(FakeRedisMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service = QuizGenerationService()
+
+    def _stream_document(self, document):
+        async def stream(prompt, prompt_type, response_schema=None, priority=None):
+            for chunk in chunks(json.dumps(document), 5):
+                yield chunk
+        return mock.patch.object(self.service.llm, 'stream', stream)
+
+    async def test_invalid_questions_are_skipped_and_topped_up(self):
+        streamed = [make_mcq('First?'), {'question_text': 'Broken?'}, make_mcq('Second?')]
+        top_up = mock.AsyncMock(return_value=[make_mcq('Third?')])
+
+        with self._stream_document({'questions': streamed}), \
+                mock.patch.object(self.service, '_top_up_questions', top_up):
+            questions = [
+                question async for question in self.service.generate_quiz_stream('Closures', {'mcq': 3})
+            ]
+
+        self.assertEqual([question['question_text'] for question in questions], ['First?', 'Second?', 'Third?'])
+        self.assertEqual(top_up.await_args.args[2], {'mcq': 1})
+
+    async def test_complete_quiz_is_cached_and_replayed(self):
+        streamed = [make_mcq('First?'), make_mcq('Second?')]
+        with self._stream_document({'questions': streamed}):
+            first = [question async for question in self.service.generate_quiz_stream('Closures', {'mcq': 2})]
+
+        with self._stream_document({'questions': []}):
+            replay = [question async for question in self.service.generate_quiz_stream('Closures', {'mcq': 2})]
+
+        self.assertEqual(first, streamed)
+        self.assertEqual(replay, streamed)
@@ -0,0 +1,95 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from personal_training.models import LearnerAnalytics, UserCourseEnrollment, UserFeedback, UserModuleProgress
+from personal_training.services.learner_analytics import LearnerAnalyticsStore
+
+from .utils import FakeRedisMixin, make_course, make_module, make_user, requires_fakeredis
+
+
+@requires_fakeredis
+class RefreshChangedTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.store = LearnerAnalyticsStore()
+        self.course = make_course()
+        self.module = make_module(self.course)
+
+    def _feedback(self, learner, course=None):
+        return UserFeedback.objects.create(user=learner, course=course or self.course)
+
+    def _rows(self, course=None):
+        return set(LearnerAnalytics.objects.filter(course=course or self.course).values_list('user_id', flat=True))
+
+    def test_runs_record_their_start_time_as_the_watermark(self):
+        self._feedback(make_user())
+        before = timezone.now()
+
+        self.assertEqual(self.store.refresh_changed(), 1)
+
+        watermark = self.store.watermark()
+        self.assertGreaterEqual(watermark, before)
+        self.assertLessEqual(watermark, timezone.now())
+        self.assertEqual(self.store.refresh_changed(), 0)
+
+    def test_single_pair_refreshes_do_not_move_the_watermark(self):
+        self.store.refresh_changed()
+        waiting, active = make_user(), make_user()
+        self._feedback(waiting)  # no signal refreshes this pair
+        enrollment = UserCourseEnrollment.objects.create(user=active, course=self.course)
+        with self.captureOnCommitCallbacks(execute=True):
+            UserModuleProgress.objects.create(user=active, module=self.module, enrollment=enrollment,
+                                              completed_at=timezone.now())
+        self.assertEqual(self._rows(), {active.id})
+
+        self.assertEqual(self.store.refresh_changed(), 2)
+        self.assertEqual(self._rows(), {waiting.id, active.id})
+
+    def test_failed_runs_keep_the_previous_watermark(self):
+        self.store.refresh_changed()
+        watermark = self.store.watermark()
+        self._feedback(make_user())
+
+        with mock.patch.object(LearnerAnalyticsStore, 'refresh_pairs', side_effect=RuntimeError("database down")):
+            with self.assertRaises(RuntimeError):
+                self.store.refresh_changed()
+
+        self.assertEqual(self.store.watermark(), watermark)
+        self.assertEqual(self.store.refresh_changed(), 1)
+
+    def test_explicit_since_does_not_move_the_watermark(self):
+        self._feedback(make_user())
+
+        self.assertEqual(self.store.refresh_changed(since=timezone.now() + timedelta(minutes=1)), 0)
+
+        self.assertIsNone(self.store.watermark())
+        self.assertEqual(self.store.refresh_changed(), 1)
+
+    def test_course_runs_keep_their_own_watermark(self):
+        other_course = make_course()
+        self._feedback(make_user())
+        self._feedback(make_user(), other_course)
+
+        self.assertEqual(self.store.refresh_changed(course_id=self.course.id), 1)
+
+        self.assertIsNone(self.store.watermark())
+        self.assertIsNotNone(self.store.watermark(self.course.id))
+        self.assertEqual(self.store.refresh_changed(course_id=self.course.id), 0)
+        self.assertEqual(self.store.refresh_changed(), 2)
+        self.assertEqual(self.store.watermark(other_course.id), self.store.watermark())
+
+    def test_full_command_refreshes_everything_and_records_the_watermark(self):
+        learner = make_user()
+        self._feedback(learner)
+        self.store.refresh_changed()
+        LearnerAnalytics.objects.all().delete()
+
+        call_command('refresh_learner_analytics', '--full', stdout=mock.Mock())
+
+        self.assertEqual(self._rows(), {learner.id})
+        self.assertIsNotNone(self.store.watermark())
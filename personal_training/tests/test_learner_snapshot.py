@@ -0,0 +1,105 @@
+import json
+from datetime import date, timedelta
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from django.utils import timezone
+
+from personal_training.models import LearnerAnalytics, UserCourseEnrollment, UserModuleProgress
+from personal_training.services import redis_pool
+from personal_training.services.engagement import EngagementTracker
+from personal_training.services.learner_analytics import LearnerAnalyticsStore
+from personal_training.services.learner_snapshot import LearnerSnapshot, LearnerSnapshotLoader
+from personal_training.services.progress_history import ProgressHistory
+
+from .utils import FakeRedisMixin, make_course, make_module, make_user, requires_fakeredis
+
+
+@requires_fakeredis
+class LearnerSnapshotLoaderTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.course = make_course()
+        self.module = make_module(self.course)
+        self.loader = LearnerSnapshotLoader()
+        self.keys = LearnerSnapshotLoader.keys(self.user.id, self.course.id, self.module.id)
+
+    def _store(self, **values):
+        for name, value in values.items():
+            self.redis.set(self.keys[name], value if isinstance(value, str) else json.dumps(value))
+
+    def _store_analytics(self):
+        self._store(completed_items=3, total_items=4, learning_patterns={'content_type_engagement': {'video': 20}},
+                    topic_performance={'Closures': 80.0})
+
+    def test_reads_every_value_in_one_pipeline(self):
+        self._store_analytics()
+        self._store(recent_activities=[{'activity': 'quiz'}], assessment_scores=[70, 90],
+                    module_progress=50, module_scores=[90], module_time_spent=35)
+        ProgressHistory().record(self.user.id, self.course.id, 2, day=date.today() - timedelta(days=1))
+        ProgressHistory().record(self.user.id, self.course.id)
+        EngagementTracker().record_login(self.user.id)
+        pipelines = redis_pool._stats['pipelines']
+
+        snapshot = self.loader.load(self.user.id, self.course.id, self.module.id, progress_days=3)
+
+        self.assertEqual(redis_pool._stats['pipelines'], pipelines + 1)
+        self.assertEqual((snapshot.completed_items, snapshot.total_items), (3, 4))
+        self.assertEqual(snapshot.topic_performance, {'Closures': 80.0})
+        self.assertEqual(snapshot.learning_patterns, {'content_type_engagement': {'video': 20}})
+        self.assertEqual(snapshot.recent_activities, [{'activity': 'quiz'}])
+        self.assertEqual(snapshot.assessment_scores, [70, 90])
+        self.assertEqual((snapshot.module_progress, snapshot.module_scores, snapshot.module_time_spent),
+                         (50, [90], 35))
+        self.assertEqual(snapshot.daily_progress, [0.0, 2.0, 1.0])
+        self.assertEqual(snapshot.engagement['login_count'], 1)
+
+    def test_malformed_and_mistyped_values_keep_the_defaults(self):
+        self._store_analytics()
+        self._store(recent_activities='{not json', assessment_scores={'unexpected': 'dict'})
+
+        snapshot = self.loader.load(self.user.id, self.course.id)
+
+        self.assertEqual(snapshot.recent_activities, [])
+        self.assertEqual(snapshot.assessment_scores, [])
+        self.assertEqual(snapshot.module_scores, [])
+        self.assertEqual(snapshot.daily_progress, [0.0] * 7)
+
+    def test_missing_analytics_keys_read_through_the_table(self):
+        enrollment = UserCourseEnrollment.objects.create(user=self.user, course=self.course)
+        make_module(self.course)
+        with self.captureOnCommitCallbacks(execute=True):
+            UserModuleProgress.objects.create(user=self.user, module=self.module, enrollment=enrollment,
+                                              completed_at=timezone.now(), progress_percentage=100)
+        self.redis.flushall()
+
+        snapshot = self.loader.load(self.user.id, self.course.id)
+
+        self.assertEqual((snapshot.completed_items, snapshot.total_items), (1, 2))
+        self.assertTrue(LearnerAnalytics.objects.filter(user=self.user, course=self.course).exists())
+        completed_key = LearnerAnalyticsStore.keys(self.user.id, self.course.id)['completed_items']
+        self.assertEqual(json.loads(self.redis.get(completed_key)), 1)
+
+    def test_new_learners_get_an_empty_snapshot(self):
+        learner = make_user()
+
+        snapshot = self.loader.load(learner.id, self.course.id)
+
+        self.assertEqual(snapshot, LearnerSnapshot(
+            user_id=learner.id, course_id=self.course.id, completed_items=0, total_items=1,
+            learning_patterns={'content_type_engagement': {}}, daily_progress=[0.0] * 7,
+            engagement=snapshot.engagement
+        ))
+        self.assertEqual(snapshot.engagement['engagement_score'], 0)
+
+    def test_async_load_matches_the_sync_load(self):
+        self._store_analytics()
+        self._store(assessment_scores=[70, 90])
+        ProgressHistory().record(self.user.id, self.course.id)
+
+        async def load():
+            return await LearnerSnapshotLoader().aload(self.user.id, self.course.id, self.module.id)
+
+        self.assertEqual(async_to_sync(load)(), self.loader.load(self.user.id, self.course.id, self.module.id))
@@ -0,0 +1,61 @@
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from personal_training.services import llm_client
+from personal_training.services.llm_client import LLMClient, get_llm_client, parse_json_response
+
+
+@override_settings(LLM_PROVIDER='gemini')
+class SharedClientTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(llm_client, '_client', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_one_client_per_process_across_threads(self):
+        clients = []
+        threads = [threading.Thread(target=lambda: clients.append(get_llm_client())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len({id(client) for client in clients}), 1)
+        self.assertIs(clients[0], get_llm_client())
+
+    def test_sdk_is_not_loaded_until_first_call(self):
+        client = get_llm_client()
+
+        self.assertIsNone(client._model)
+
+    @override_settings(LLM_PROVIDER='other')
+    def test_unknown_provider_is_rejected(self):
+        with self.assertRaises(ValueError):
+            get_llm_client()
+
+
+class JsonResponseTests(SimpleTestCase):
+
+    def test_plain_and_wrapped_json_parse(self):
+        self.assertEqual(parse_json_response('{"a": 1}'), {'a': 1})
+        self.assertEqual(parse_json_response('```json\n{"a": {"b": 2}}\n```'), {'a': {'b': 2}})
+
+    def test_missing_or_broken_json_raises(self):
+        with self.assertRaises(ValueError):
+            parse_json_response('no json here')
+        with self.assertRaises(ValueError):
+            parse_json_response('{"a": }')
+
+    def test_structured_output_config_follows_setting(self):
+        schema = {'type': 'object'}
+        client = LLMClient('test-model')
+
+        self.assertEqual(
+            client._json_generation_config(schema),
+            {'response_mime_type': 'application/json', 'response_schema': schema}
+        )
+        with override_settings(GEMINI_STRUCTURED_OUTPUT=False):
+            self.assertIsNone(client._json_generation_config(schema))
@@ -0,0 +1,137 @@
+import asyncio
+
+from django.test import SimpleTestCase, override_settings
+
+from personal_training.services.llm_gateway import LLMGateway
+from personal_training.services.quiz_module import QuizGenerationService
+
+from .utils import FakeRedisMixin, ScriptedLLMClient, requires_fakeredis
+
+
+@requires_fakeredis
+class GatewayCoalescingTests(FakeRedisMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = ScriptedLLMClient(lambda prompt, schema: {'prompt': prompt, 'items': [{'index': 1}]}, delay=0.02)
+        self.gateway = self.use_llm(self.client)
+
+    async def test_identical_prompts_in_flight_share_one_call(self):
+        results = await asyncio.gather(*(self.gateway.generate_json('same', 'feedback') for _ in range(3)))
+
+        self.assertEqual(len(self.client.prompts), 1)
+        self.assertEqual(self.gateway.stats['coalesced'], 2)
+        self.assertEqual(results, [{'prompt': 'same', 'items': [{'index': 1}]}] * 3)
+
+    async def test_waiters_get_independent_copies(self):
+        first, second = await asyncio.gather(
+            self.gateway.generate_json('same', 'feedback'),
+            self.gateway.generate_json('same', 'feedback')
+        )
+        first['items'][0].pop('index')
+
+        self.assertIsNot(first, second)
+        self.assertEqual(second['items'], [{'index': 1}])
+
+    async def test_batched_feedback_leaves_a_shared_response_intact(self):
+        response = {'feedback': [{'index': 1, 'strengths': 's', 'areas_for_improvement': 'a',
+                                  'key_concepts': 'k', 'suggestions': 'g'}]}
+        self.client.respond = lambda prompt, schema: response
+        answer = {'user_answer': 'x', 'correct_answer': 'y', 'question_type': 'scenario'}
+
+        feedback, = await QuizGenerationService().generate_batched_feedback([answer])
+
+        self.assertNotIn('index', feedback)
+        self.assertEqual(response['feedback'][0]['index'], 1)
+
+    async def test_failures_reach_every_waiter(self):
+        self.client.respond = lambda prompt, schema: ConnectionError("model unavailable")
+
+        results = await asyncio.gather(
+            *(self.gateway.generate_json('same', 'quiz') for _ in range(2)), return_exceptions=True
+        )
+
+        self.assertTrue(all(isinstance(result, ConnectionError) for result in results))
+        self.assertEqual(len(self.client.prompts), 1)
+
+    async def test_cancelling_the_first_caller_leaves_the_call_to_the_others(self):
+        first = asyncio.ensure_future(asyncio.wait_for(self.gateway.generate_json('same', 'feedback'), 0.005))
+        await asyncio.sleep(0.001)  # first starts the call
+        second = asyncio.ensure_future(self.gateway.generate_json('same', 'feedback'))
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await first
+        self.assertEqual(await second, {'prompt': 'same', 'items': [{'index': 1}]})
+        self.assertEqual(len(self.client.prompts), 1)
+
+    async def test_a_call_nobody_waits_for_is_cancelled(self):
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(self.gateway.generate_json('same', 'feedback'), 0.005)
+
+        self.assertEqual((await self.gateway.aget_stats())['in_flight_prompts'], 0)
+        self.assertEqual(await self.gateway.generate_json('same', 'feedback'), {'prompt': 'same', 'items': [{'index': 1}]})
+        self.assertEqual(len(self.client.prompts), 2)
+
+
+@requires_fakeredis
+class GatewaySchedulingTests(FakeRedisMixin, SimpleTestCase):
+
+    @override_settings(LLM_GATEWAY_MAX_CONCURRENCY=1)
+    async def test_interactive_calls_are_admitted_before_background_calls(self):
+        client = ScriptedLLMClient(lambda prompt, schema: {}, delay=0.01)
+        gateway = self.use_llm(client)
+
+        await asyncio.gather(
+            gateway.generate_json('first', 'quiz'),
+            gateway.generate_json('refill', 'quiz', priority=LLMGateway.PRIORITY_BACKGROUND),
+            gateway.generate_json('feedback', 'feedback'),
+        )
+
+        self.assertEqual(client.prompts, ['first', 'feedback', 'refill'])
+
+    @override_settings(LLM_GATEWAY_TYPE_CONCURRENCY={'quiz': 2})
+    async def test_calls_are_capped_per_prompt_type(self):
+        running = peak = 0
+
+        async def track(prompt, response_schema=None):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return {}
+
+        client = ScriptedLLMClient(lambda prompt, schema: {})
+        client.generate_json = track
+        gateway = self.use_llm(client)
+
+        await asyncio.gather(*(gateway.generate_json(f"quiz {number}", 'quiz') for number in range(6)))
+
+        self.assertEqual(peak, 2)
+
+    @override_settings(LLM_GATEWAY_BATCH_WINDOW_MS=20, LLM_GATEWAY_BATCH_MAX_SIZE=3)
+    async def test_requests_within_the_window_are_batched(self):
+        gateway = self.use_llm(ScriptedLLMClient(lambda prompt, schema: {}))
+        batches = []
+
+        async def run_batch(items):
+            batches.append(list(items))
+            return [item * 10 for item in items]
+
+        results = await asyncio.gather(*(gateway.batch('double', item, run_batch) for item in range(5)))
+
+        self.assertEqual(results, [0, 10, 20, 30, 40])
+        self.assertEqual(batches, [[0, 1, 2], [3, 4]])
+
+    @override_settings(LLM_GATEWAY_BATCH_WINDOW_MS=5)
+    async def test_a_failed_batch_fails_each_item(self):
+        gateway = self.use_llm(ScriptedLLMClient(lambda prompt, schema: {}))
+
+        async def run_batch(items):
+            return items[:1]
+
+        results = await asyncio.gather(
+            *(gateway.batch('short', item, run_batch) for item in range(2)), return_exceptions=True
+        )
+
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
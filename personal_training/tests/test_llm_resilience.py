@@ -0,0 +1,168 @@
+import asyncio
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from personal_training.services import llm_resilience
+from personal_training.services.llm_resilience import (
+    CircuitBreaker, LLMMetrics, LLMResilience, LLMUnavailableError, RateLimiter
+)
+
+from .utils import FakeRedisMixin, requires_fakeredis
+
+
+@requires_fakeredis
+@override_settings(LLM_CIRCUIT_FAILURE_THRESHOLD=2, LLM_CIRCUIT_RESET_TIMEOUT=30)
+class CircuitBreakerTests(FakeRedisMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.metrics = LLMMetrics(self.redis)
+        self.breaker = CircuitBreaker(self.metrics)
+        self.clock = mock.Mock(wraps=time)
+        self.clock.monotonic.return_value = 1000.0
+        patcher = mock.patch.object(llm_resilience, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _fail(self, times=1):
+        for _ in range(times):
+            self.breaker.before_call()
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self._fail()
+        self.breaker.before_call()
+        self.breaker.record_success()
+        self._fail()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+        self._fail()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(LLMUnavailableError):
+            self.breaker.before_call()
+        self.assertEqual(self.metrics.get_stats()['circuit_rejected'], 1)
+
+    def test_half_open_admits_one_trial_then_closes_on_success(self):
+        self._fail(2)
+        self.clock.monotonic.return_value += 31
+
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        with self.assertRaises(LLMUnavailableError):
+            self.breaker.before_call()
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_trial_reopens(self):
+        self._fail(2)
+        self.clock.monotonic.return_value += 31
+
+        self._fail()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(LLMUnavailableError):
+            self.breaker.before_call()
+
+    async def test_unusable_output_does_not_count_against_the_provider(self):
+        resilience = LLMResilience()
+
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                await resilience.call('quiz', mock.AsyncMock(side_effect=ValueError("bad JSON")))
+
+        self.assertEqual(resilience.breaker.state, CircuitBreaker.CLOSED)
+
+
+@requires_fakeredis
+class LLMMetricsTests(FakeRedisMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.metrics = LLMMetrics(self.redis)
+
+    async def test_increments_inside_a_loop_use_the_asyncio_client(self):
+        with mock.patch.object(self.redis, 'hincrby', side_effect=AssertionError("sync client used")), \
+                mock.patch.object(llm_resilience, '_metric_tasks', set()) as tasks:
+            self.metrics.incr('circuit_open')
+            await self.metrics.aincr('hedged', 2)
+            await asyncio.gather(*tasks)
+
+        self.assertEqual(self.metrics.get_stats(), {'circuit_open': 1, 'hedged': 2})
+
+    async def test_stats_read_inside_a_loop_use_the_asyncio_client(self):
+        await self.metrics.aincr('hedged', 3)
+
+        with mock.patch.object(self.redis, 'hgetall', side_effect=AssertionError("sync client used")):
+            self.assertEqual(await self.metrics.aget_stats(), {'hedged': 3})
+
+    def test_increments_outside_a_loop_use_the_sync_client(self):
+        self.metrics.incr('circuit_open')
+
+        self.assertEqual(self.metrics.get_stats(), {'circuit_open': 1})
+
+
+@requires_fakeredis
+@override_settings(GEMINI_RATE_LIMIT_PER_MINUTE=600, GEMINI_RATE_LIMIT_BURST=3)
+class TokenBucketTests(FakeRedisMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.metrics = LLMMetrics(self.redis)
+
+    async def test_burst_then_waits_for_refill(self):
+        limiter = RateLimiter(self.metrics)
+        deadline = time.monotonic() + 5
+
+        started = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire(deadline)
+        self.assertLess(time.monotonic() - started, 0.05)
+
+        await limiter.acquire(deadline)
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)  # 10 tokens/second
+        self.assertEqual(self.metrics.get_stats()['rate_limited'], 1)
+
+    async def test_rejects_when_no_token_arrives_before_the_deadline(self):
+        limiter = RateLimiter(self.metrics)
+        for _ in range(3):
+            await limiter.acquire(time.monotonic() + 5)
+
+        with self.assertRaises(LLMUnavailableError):
+            await limiter.acquire(time.monotonic() + 0.01)
+        self.assertEqual(self.metrics.get_stats()['rate_limit_rejected'], 1)
+
+    async def test_bucket_is_shared_between_limiters(self):
+        deadline = time.monotonic() + 5
+        for limiter in (RateLimiter(self.metrics), RateLimiter(self.metrics), RateLimiter(self.metrics)):
+            await limiter.acquire(deadline)
+
+        with self.assertRaises(LLMUnavailableError):
+            await RateLimiter(self.metrics).acquire(time.monotonic() + 0.01)
+
+
+@requires_fakeredis
+class StatsViewAccessTests(FakeRedisMixin, TestCase):
+
+    URLS = ('quiz_cache_stats', 'llm_stats', 'redis_stats')
+
+    def test_stats_require_staff(self):
+        for name in self.URLS:
+            self.assertEqual(self.client.get(reverse(f"personal_training:{name}")).status_code, 403, name)
+
+        self.client.force_login(get_user_model().objects.create_user('member', password='pw'))
+        for name in self.URLS:
+            self.assertEqual(self.client.get(reverse(f"personal_training:{name}")).status_code, 403, name)
+
+    def test_staff_can_read_stats(self):
+        self.client.force_login(get_user_model().objects.create_user('ops', password='pw', is_staff=True))
+
+        for name in self.URLS:
+            response = self.client.get(reverse(f"personal_training:{name}"))
+            self.assertEqual(response.status_code, 200, name)
+            self.assertTrue(response.json()['success'])
@@ -0,0 +1,81 @@
+import json
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from personal_training.services.local_grader import LocalGrader
+
+from .utils import FakeRedisMixin, ScriptedLLMClient, make_mcq, requires_fakeredis
+
+
+class LocalGraderTests(SimpleTestCase):
+
+    def setUp(self):
+        self.grader = LocalGrader()
+        self.mcq = make_mcq('Which keyword defines a function?', correct='def')
+        self.open_question = {
+            'question_text': 'Explain closures',
+            'question_type': 'reflection',
+            'model_answer': 'A function capturing its enclosing scope',
+            'explanation': 'Closures keep references to outer variables'
+        }
+
+    def test_only_mcqs_with_choices_are_graded_locally(self):
+        self.assertTrue(self.grader.can_grade(self.mcq))
+        self.assertFalse(self.grader.can_grade(self.open_question))
+        self.assertFalse(self.grader.can_grade({**self.mcq, 'choices': []}))
+
+    def test_answers_match_ignoring_case_and_whitespace(self):
+        self.assertTrue(self.grader.is_correct(self.mcq, '  DEF '))
+        self.assertFalse(self.grader.is_correct(self.mcq, 'Wrong 1'))
+        self.assertFalse(self.grader.is_correct(self.mcq, None))
+
+    def test_correct_answer_falls_back_to_model_answer(self):
+        self.assertEqual(self.grader.correct_answer(self.mcq), 'def')
+        self.assertEqual(self.grader.correct_answer(self.open_question), self.open_question['model_answer'])
+        self.assertIsNone(self.grader.correct_answer({**self.mcq, 'choices': []}))
+
+    def test_feedback_has_the_model_feedback_shape(self):
+        fields = {'strengths', 'areas_for_improvement', 'key_concepts', 'suggestions'}
+        for question, answer in ((self.mcq, 'def'), (self.mcq, 'Wrong 2'), (self.open_question, 'text')):
+            self.assertEqual(set(self.grader.build_feedback(question, answer)), fields)
+
+        wrong = self.grader.build_feedback(self.mcq, 'Wrong 2')
+        self.assertEqual(wrong['areas_for_improvement'], 'The correct answer is: def')
+        self.assertEqual(wrong['key_concepts'], 'def is correct')
+
+
+@requires_fakeredis
+class EvaluateQuizGradingTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client_llm = ScriptedLLMClient(lambda prompt, schema: {'feedback': [
+            {'index': 1, 'strengths': 'model', 'areas_for_improvement': 'model',
+             'key_concepts': 'model', 'suggestions': 'model'}
+        ]})
+        self.use_llm(self.client_llm)
+        self.quiz_data = {'questions': [make_mcq('First?', correct='a'), make_mcq('Second?', correct='b')]}
+
+    def _evaluate(self, answers, **payload):
+        return self.client.post(
+            reverse('personal_training:evaluate_quiz'),
+            json.dumps({'quiz_data': self.quiz_data, 'answers': answers, **payload}),
+            content_type='application/json'
+        ).json()
+
+    def test_only_incorrect_mcqs_reach_the_model(self):
+        result = self._evaluate(['a', 'Wrong 1'])
+
+        self.assertEqual((result['correct_answers'], result['score']), (1, 50))
+        self.assertEqual(result['feedback'][0]['areas_for_improvement'], 'None for this question')
+        self.assertEqual(result['feedback'][1]['strengths'], 'model')
+        self.assertEqual(len(self.client_llm.prompts), 1)
+        self.assertNotIn('First?', self.client_llm.prompts[0])
+
+    def test_opting_out_of_model_feedback_makes_no_calls(self):
+        result = self._evaluate(['Wrong 1', 'b'], llm_feedback=False)
+
+        self.assertEqual(result['correct_answers'], 1)
+        self.assertEqual(result['feedback'][0]['areas_for_improvement'], 'The correct answer is: a')
+        self.assertEqual(self.client_llm.prompts, [])
@@ -0,0 +1,135 @@
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from django.utils import timezone
+
+from personal_training.models import LearningActivity, PerformanceMetric, Quiz, QuizAttempt, UserFeedback
+from personal_training.services.engagement import EngagementTracker
+from personal_training.services.performance_feedback_cache import PerformanceFeedbackCache
+from personal_training.services.Quizfeedback_module import QuizFeedbackModule
+
+from .utils import FakeRedisMixin, ScriptedLLMClient, make_course, make_module, make_user, requires_fakeredis
+
+ANALYSIS = {'performance_trend': 'improving', 'study_recommendations': ['practice closures']}
+
+
+@requires_fakeredis
+class PerformanceFeedbackTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.course = make_course()
+        self.module = make_module(self.course)
+        self.feedback = UserFeedback.objects.create(user=self.user, course=self.course, module=self.module)
+        self.llm = ScriptedLLMClient(lambda prompt, schema: ANALYSIS)
+        self.use_llm(self.llm)
+
+    def _metric(self, value, days_ago=0, metric_type='quiz_score'):
+        with self.captureOnCommitCallbacks(execute=True):
+            metric = PerformanceMetric.objects.create(user_feedback=self.feedback, metric_type=metric_type, value=value)
+        PerformanceMetric.objects.filter(pk=metric.pk).update(timestamp=timezone.now() - timedelta(days=days_ago))
+
+    def _attempt(self, score, days_ago=0):
+        quiz = Quiz.objects.create(module=self.module, fingerprint=f"quiz-{Quiz.objects.count()}")
+        attempt = QuizAttempt.objects.create(quiz=quiz, user=self.user, score=score, correct_answers=3, total_questions=4)
+        QuizAttempt.objects.filter(pk=attempt.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+
+    def _generate(self, time_period='last_month'):
+        async def generate():
+            return await QuizFeedbackModule().generate_performance_feedback(self.user.id, self.module.id, time_period)
+
+        return async_to_sync(generate)()
+
+    def test_prompt_carries_the_stored_metrics_and_attempts(self):
+        self._metric(40, days_ago=3)
+        self._metric(12, days_ago=1, metric_type='engagement')
+        self._attempt(80, days_ago=2)
+
+        self.assertEqual(self._generate(), ANALYSIS)
+
+        prompt = self.llm.prompts[0]
+        self.assertIn('"quiz_score":{"count":1,"average":40.0}', prompt)
+        self.assertIn('"quiz_attempt":{"count":1,"average":80.0}', prompt)
+        self.assertIn('"correct_answers":"3/4"', prompt)
+        # Newest first, so trimming to the token budget drops the oldest events
+        self.assertLess(prompt.index('"type":"engagement"'), prompt.index('"type":"quiz_attempt"'))
+        self.assertLess(prompt.index('"type":"quiz_attempt"'), prompt.index('"type":"quiz_score"'))
+
+    def test_rows_outside_the_time_period_are_left_out(self):
+        self._metric(40, days_ago=20)
+        self._attempt(90, days_ago=2)
+
+        self._generate('last_week')
+        self._generate('all_time')
+
+        week, all_time = self.llm.prompts
+        self.assertNotIn('quiz_score', week)
+        self.assertIn('"quiz_attempt":{"count":1', week)
+        self.assertIn('"quiz_score":{"count":1', all_time)
+
+    def test_unknown_time_periods_are_reported(self):
+        feedback = self._generate('last_century')
+
+        self.assertIn('Unknown time period', feedback['error'])
+        self.assertEqual(self.llm.prompts, [])
+
+    def test_feedback_is_cached_until_a_new_metric_is_committed(self):
+        self._metric(40)
+        self._generate()
+        self._generate()
+        self.assertEqual(len(self.llm.prompts), 1)
+
+        self._metric(90)
+        self._generate()
+
+        self.assertEqual(len(self.llm.prompts), 2)
+        self.assertIn('"quiz_score":{"count":2,"average":65.0}', self.llm.prompts[1])
+
+
+@requires_fakeredis
+class PerformanceSignalTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.course = make_course()
+        self.module = make_module(self.course)
+        self.feedback = UserFeedback.objects.create(user=self.user, course=self.course, module=self.module)
+
+    def test_metrics_bump_the_feedback_version_only_once_committed(self):
+        version_key = PerformanceFeedbackCache.version_key(self.user.id, self.module.id)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            PerformanceMetric.objects.create(user_feedback=self.feedback, metric_type='quiz_score', value=70)
+        self.assertIsNone(self.redis.get(version_key))
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.redis.get(version_key), b'1')
+
+    def test_attempts_bump_their_modules_feedback_version_only_once_committed(self):
+        version_key = PerformanceFeedbackCache.version_key(self.user.id, self.module.id)
+        quiz = Quiz.objects.create(module=self.module, fingerprint='quiz')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            QuizAttempt.objects.create(quiz=quiz, user=self.user, score=80, correct_answers=4, total_questions=5)
+            QuizAttempt.objects.create(quiz=quiz, user=None, score=60, correct_answers=3, total_questions=5)
+        self.assertIsNone(self.redis.get(version_key))
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.redis.get(version_key), b'1')
+
+    def test_activities_reach_engagement_only_once_committed(self):
+        tracker = EngagementTracker()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            LearningActivity.objects.create(user_feedback=self.feedback, activity_type='content_view',
+                                            content_type='video', duration=10)
+        self.assertEqual(tracker.get(self.user.id, self.course.id)['interaction_count'], 0)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(tracker.get(self.user.id, self.course.id)['interaction_count'], 1)
@@ -0,0 +1,78 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from personal_training.models import UserCourseEnrollment, UserModuleProgress
+from personal_training.services.progress_history import ProgressHistory
+
+from .utils import FakeRedisMixin, make_course, make_module, make_user, requires_fakeredis
+
+
+@requires_fakeredis
+class ProgressHistoryTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.history = ProgressHistory()
+
+    def test_daily_counts_cover_the_window_oldest_first(self):
+        today = date.today()
+        self.history.record(1, 2, 2, day=today - timedelta(days=2))
+        self.history.record(1, 2)
+        self.history.record(1, 2, 0.5)
+
+        self.assertEqual(self.history.daily(1, 2, days=3), [2.0, 0.0, 1.5])
+        self.assertEqual(self.history.total(1, 2, days=2), 1.5)
+
+    def test_days_outside_the_retention_window_are_dropped(self):
+        self.history.retention_days = 3
+        self.assertEqual(self.history.record(1, 2, day=date.today() - timedelta(days=3)), 0.0)
+
+        self.redis.hset(ProgressHistory.key(1, 2), (date.today() - timedelta(days=5)).isoformat(), 4)
+        self.history.record(1, 2)
+
+        self.assertEqual(self.redis.hkeys(ProgressHistory.key(1, 2)), [date.today().isoformat().encode()])
+
+
+@requires_fakeredis
+class ModuleCompletionTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.course = make_course()
+        self.module = make_module(self.course)
+        self.enrollment = UserCourseEnrollment.objects.create(user=self.user, course=self.course)
+
+    def _daily(self, days=3):
+        return ProgressHistory().daily(self.user.id, self.course.id, days)
+
+    def _progress(self, **fields):
+        return UserModuleProgress.objects.create(
+            user=self.user, module=self.module, enrollment=self.enrollment, **fields
+        )
+
+    def test_completion_is_counted_once_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            progress = self._progress(completed_at=timezone.now(), progress_percentage=100)
+        self.assertEqual(self._daily(), [0.0, 0.0, 0.0])
+
+        for callback in callbacks:
+            callback()
+        with self.captureOnCommitCallbacks(execute=True):
+            progress.progress_percentage = 100
+            progress.save()
+
+        self.assertEqual(self._daily(), [0.0, 0.0, 1.0])
+
+    def test_completing_an_existing_row_counts_on_its_completion_day(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            progress = self._progress(progress_percentage=40)
+        self.assertEqual(self._daily(), [0.0, 0.0, 0.0])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            progress.completed_at = timezone.now() - timedelta(days=1)
+            progress.save()
+
+        self.assertEqual(self._daily(), [0.0, 1.0, 0.0])
@@ -0,0 +1,65 @@
+import json
+from collections import OrderedDict
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from personal_training.services.prompt_builder import PromptBuilder, compact_json, estimate_tokens
+
+from .utils import FakeRedisMixin, requires_fakeredis
+
+
+def section(topic: str, words: int = 120) -> str:
+    return f"{topic.title()}:\n" + ' '.join(f"{topic} detail{number % 7}" for number in range(words // 2)) + '.'
+
+
+class CompactJsonTests(SimpleTestCase):
+
+    def test_encodes_without_padding(self):
+        self.assertEqual(compact_json({'a': [1, 2], 'b': 'é'}), '{"a":[1,2],"b":"é"}')
+
+    def test_long_lists_keep_the_items_that_fit(self):
+        items = [{'activity': f"lesson {number}", 'minutes': number} for number in range(200)]
+
+        encoded = compact_json(items, token_budget=100)
+        decoded = json.loads(encoded)
+
+        self.assertLessEqual(estimate_tokens(encoded), 100)
+        self.assertEqual(decoded[:-1], items[:len(decoded) - 1])
+        self.assertEqual(decoded[-1], f"... {200 - len(decoded) + 1} more items omitted")
+
+
+@requires_fakeredis
+@override_settings(PROMPT_SECTION_TOKENS=100)
+class FitContentTests(FakeRedisMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.builder = PromptBuilder()
+        self.content = "\n\n".join(section(topic) for topic in ('history', 'closures', 'recursion', 'generators'))
+
+    def test_content_that_fits_is_unchanged(self):
+        self.assertEqual(self.builder.fit_content(self.content, 10000), self.content)
+
+    def test_keeps_the_sections_most_relevant_to_the_query_in_order(self):
+        fitted = self.builder.fit_content(self.content, 200, query='closures and generators')
+
+        self.assertLessEqual(estimate_tokens(fitted), 200)
+        self.assertIn('Closures:', fitted)
+        self.assertIn('Generators:', fitted)
+        self.assertNotIn('History:', fitted)
+        self.assertLess(fitted.index('Closures:'), fitted.index('Generators:'))
+
+    async def test_async_fit_reads_the_same_digest(self):
+        fitted = await self.builder.afit_content(self.content, 200, query='closures and generators')
+
+        self.assertEqual(len(self.redis.keys(f"{PromptBuilder.DIGEST_KEY_PREFIX}:*")), 1)
+        with mock.patch.object(PromptBuilder, '_local', OrderedDict()):
+            self.assertEqual(self.builder.fit_content(self.content, 200, query='closures and generators'), fitted)
+
+    def test_digest_is_cached_in_redis_by_content(self):
+        digest = self.builder.get_digest(self.content)
+
+        keys = self.redis.keys(f"{PromptBuilder.DIGEST_KEY_PREFIX}:*")
+        self.assertEqual(len(keys), 1)
+        self.assertEqual(json.loads(self.redis.get(keys[0])), digest)
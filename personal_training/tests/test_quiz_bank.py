@@ -0,0 +1,103 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase
+from django.urls import reverse
+
+from personal_training.models import QuizBankEntry
+from personal_training.services.quiz_bank import QuizBankService
+from personal_training.services.quiz_module import QuizGenerationService
+
+from .utils import FakeRedisMixin, make_course, make_module, requires_fakeredis
+
+
+@requires_fakeredis
+class QuizBankServiceTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.module = make_module(make_course())
+        self.service = QuizBankService()
+        self.lock_key = f"quiz_bank:refill:{self.module.id}:intermediate"
+
+    def _bank(self, count):
+        return [
+            QuizBankEntry.objects.create(
+                module=self.module,
+                difficulty='intermediate',
+                question_types=self.service.question_types,
+                quiz_data={'questions': [], 'entry': number},
+                prompt_version=QuizGenerationService.PROMPT_VERSION
+            )
+            for number in range(count)
+        ]
+
+    @staticmethod
+    async def _finish(task, tasks):
+        """Wait for a refill and then for the lock release its done callback starts"""
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    async def test_serves_entries_the_user_has_not_seen(self):
+        await sync_to_async(self._bank)(self.service.target_size)
+
+        served = [
+            (await self.service.get_quiz(self.module.id, 'intermediate', user_id=7))['entry']
+            for _ in range(self.service.recent_window)
+        ]
+
+        self.assertEqual(len(set(served)), self.service.recent_window)
+        self.assertEqual(await QuizBankEntry.objects.filter(times_served=1).acount(), self.service.recent_window)
+
+    async def test_low_bank_schedules_one_refill(self):
+        with mock.patch.object(QuizBankService, 'schedule_refill', return_value=True) as schedule_refill:
+            self.assertIsNone(await self.service.get_quiz(self.module.id, 'intermediate'))
+
+        schedule_refill.assert_awaited_once_with(self.module.id, 'intermediate')
+
+    async def test_refill_lock_is_released_after_a_failed_refill(self):
+        refill = mock.AsyncMock(side_effect=ValueError("model unavailable"))
+        with mock.patch.object(QuizBankService, 'refill', refill), \
+                mock.patch('personal_training.services.quiz_bank._refill_tasks', set()) as tasks:
+            self.assertTrue(await self.service.schedule_refill(self.module.id, 'intermediate'))
+            self.assertFalse(await self.service.schedule_refill(self.module.id, 'intermediate'))
+            task, = tasks
+            await self._finish(task, tasks)
+
+        refill.assert_awaited_once()
+        self.assertFalse(self.redis.exists(self.lock_key))
+
+    async def test_refill_lock_is_released_when_cancelled_before_starting(self):
+        refill = mock.AsyncMock(return_value=0)
+        with mock.patch.object(QuizBankService, 'refill', refill), \
+                mock.patch('personal_training.services.quiz_bank._refill_tasks', set()) as tasks:
+            await self.service.schedule_refill(self.module.id, 'intermediate')
+            task, = tasks
+            task.cancel()
+            await self._finish(task, tasks)
+
+        refill.assert_not_awaited()
+        self.assertFalse(self.redis.exists(self.lock_key))
+
+
+@requires_fakeredis
+class GenerateQuizViewTests(FakeRedisMixin, TestCase):
+
+    def _post(self, payload):
+        return self.client.post(
+            reverse('personal_training:generate_quiz'), json.dumps(payload), content_type='application/json'
+        )
+
+    def test_unknown_difficulty_is_rejected(self):
+        response = self._post({'course_content': 'Closures', 'difficulty': 'expert'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('beginner, intermediate, advanced', response.json()['error'])
+
+    def test_unknown_module_is_not_found(self):
+        response = self._post({'module_id': 999999})
+
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,82 @@
+import asyncio
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from personal_training.services.quiz_cache import QuizCache
+
+from .utils import FakeRedisMixin, requires_fakeredis
+
+QUIZ = {'questions': [{'question_text': 'What is a closure?'}]}
+
+
+@requires_fakeredis
+@mock.patch.object(QuizCache, 'POLL_INTERVAL', 0.01)
+class QuizCacheTests(FakeRedisMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = QuizCache()
+        self.generations = 0
+
+    async def _generate(self):
+        self.generations += 1
+        await asyncio.sleep(0.05)
+        return QUIZ
+
+    def test_key_ignores_formatting_and_ordering(self):
+        key = self.cache.make_key("Closures  capture\nscope", {'mcq': 3, 'scenario': 1}, 'Advanced', 2)
+
+        self.assertEqual(key, self.cache.make_key("Closures capture scope", {'scenario': 1, 'mcq': 3}, 'advanced ', 2))
+        self.assertNotEqual(key, self.cache.make_key("Closures capture scope", {'mcq': 3, 'scenario': 1}, 'advanced', 3))
+
+    async def test_concurrent_misses_generate_once(self):
+        key = self.cache.make_key("content", {'mcq': 5}, 'intermediate', 2)
+
+        results = await asyncio.gather(*(self.cache.get_or_generate(key, self._generate) for _ in range(4)))
+
+        self.assertEqual(results, [QUIZ] * 4)
+        self.assertEqual(self.generations, 1)
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['misses'], stats['waits']), (4, 3))
+
+    async def test_cached_quiz_is_a_hit(self):
+        key = self.cache.make_key("content", {'mcq': 5}, 'intermediate', 2)
+        await self.cache.get_or_generate(key, self._generate)
+
+        self.assertEqual(await self.cache.get_or_generate(key, self._generate), QUIZ)
+        self.assertEqual(self.generations, 1)
+        self.assertEqual(self.cache.get_stats()['hits'], 1)
+
+    async def test_async_and_sync_access_share_entries(self):
+        key = self.cache.make_key("content", {'mcq': 5}, 'intermediate', 2)
+        self.assertIsNone(await self.cache.aget(key))
+
+        await self.cache.aset(key, QUIZ)
+
+        self.assertEqual(self.cache.get(key), QUIZ)
+        self.assertEqual(await self.cache.aget(key), QUIZ)
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+
+    async def test_waiters_take_over_when_the_generator_fails(self):
+        key = self.cache.make_key("content", {'mcq': 5}, 'intermediate', 2)
+        attempts = []
+
+        async def flaky_generate():
+            attempts.append(1)
+            await asyncio.sleep(0.02)
+            if len(attempts) == 1:
+                raise ValueError("invalid quiz")
+            return QUIZ
+
+        results = await asyncio.gather(
+            self.cache.get_or_generate(key, flaky_generate),
+            self.cache.get_or_generate(key, flaky_generate),
+            return_exceptions=True
+        )
+
+        self.assertIsInstance(results[0], ValueError)
+        self.assertEqual(results[1], QUIZ)
+        self.assertEqual(len(attempts), 2)
+        self.assertFalse(self.redis.exists(f"{key}:lock"))
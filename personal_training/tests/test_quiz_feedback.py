@@ -0,0 +1,146 @@
+import asyncio
+
+from django.test import SimpleTestCase, override_settings
+
+from personal_training.services.quiz_module import QuizGenerationService
+
+from .utils import FakeRedisMixin, ScriptedLLMClient, requires_fakeredis
+
+
+def make_answer(number: int) -> dict:
+    return {
+        'user_answer': f"answer {number}",
+        'correct_answer': f"correct {number}",
+        'question_type': 'scenario',
+        'context': None,
+        'question_text': f"Question {number}?"
+    }
+
+
+def make_feedback(label: str) -> dict:
+    return {
+        'strengths': label,
+        'areas_for_improvement': label,
+        'key_concepts': label,
+        'suggestions': label
+    }
+
+
+@requires_fakeredis
+class PerQuestionFanOutTests(FakeRedisMixin, SimpleTestCase):
+    """generate_feedback_for_answers in per_question mode"""
+
+    def setUp(self):
+        super().setUp()
+        self.service = QuizGenerationService()
+        self.in_flight = 0
+        self.peak = 0
+
+    async def _tracked_feedback(self, delay=0.01, **answer):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(delay)
+            if answer['user_answer'] == 'fail':
+                raise ConnectionError("model unavailable")
+            if answer['user_answer'] == 'hang':
+                await asyncio.sleep(10)
+            return make_feedback(answer['user_answer'])
+        finally:
+            self.in_flight -= 1
+
+    async def test_concurrency_is_bounded_and_order_kept(self):
+        self.service._request_feedback = self._tracked_feedback
+        answers = [make_answer(number) for number in range(7)]
+
+        feedback = await self.service.generate_feedback_for_answers(answers, concurrency=3, mode='per_question')
+
+        self.assertEqual(self.peak, 3)
+        self.assertEqual([item['strengths'] for item in feedback], [f"answer {number}" for number in range(7)])
+
+    async def test_failures_and_timeouts_fall_back_per_answer(self):
+        self.service._request_feedback = self._tracked_feedback
+        answers = [make_answer(0), {**make_answer(1), 'user_answer': 'fail'}, {**make_answer(2), 'user_answer': 'hang'}]
+
+        feedback = await self.service.generate_feedback_for_answers(
+            answers, concurrency=3, timeout=0.1, mode='per_question'
+        )
+
+        self.assertEqual(feedback[0], make_feedback('answer 0'))
+        self.assertEqual(feedback[1], self.service._default_feedback())
+        self.assertEqual(feedback[2], self.service._default_feedback())
+
+    @override_settings(QUIZ_FEEDBACK_CONCURRENCY=2)
+    async def test_concurrency_defaults_to_setting(self):
+        self.service._request_feedback = self._tracked_feedback
+
+        await self.service.generate_feedback_for_answers(
+            [make_answer(number) for number in range(5)], mode='per_question'
+        )
+
+        self.assertEqual(self.peak, 2)
+
+
+def batch_item(index: int, label: str) -> dict:
+    return {'index': index, **make_feedback(label)}
+
+
+@requires_fakeredis
+class BatchedFeedbackTests(FakeRedisMixin, SimpleTestCase):
+    """Whole-quiz feedback from one model call per batch"""
+
+    def setUp(self):
+        super().setUp()
+        self.responses = []
+        self.client = ScriptedLLMClient(lambda prompt, schema: self.responses.pop(0))
+        self.use_llm(self.client)
+        self.service = QuizGenerationService()
+
+    async def test_items_are_matched_by_index(self):
+        self.responses.append({'feedback': [batch_item(3, 'third'), batch_item(1, 'first'), batch_item(2, 'second')]})
+
+        feedback = await self.service.generate_batched_feedback([make_answer(number) for number in range(3)])
+
+        self.assertEqual(feedback, [make_feedback('first'), make_feedback('second'), make_feedback('third')])
+        self.assertEqual(len(self.client.prompts), 1)
+        for number in range(3):
+            self.assertIn(f"Question {number}?", self.client.prompts[0])
+
+    async def test_missing_and_invalid_items_get_default_feedback(self):
+        self.responses.append({'feedback': [
+            batch_item(1, 'first'),
+            {'index': 2, 'strengths': 'incomplete'},
+            batch_item(9, 'out of range')
+        ]})
+
+        feedback = await self.service.generate_batched_feedback([make_answer(number) for number in range(3)])
+
+        default = self.service._default_feedback()
+        self.assertEqual(feedback, [make_feedback('first'), default, default])
+
+    async def test_malformed_response_falls_back_for_every_answer(self):
+        self.responses.append(['not', 'an', 'object'])
+
+        feedback = await self.service.generate_batched_feedback([make_answer(0), make_answer(1)])
+
+        self.assertEqual(feedback, [self.service._default_feedback()] * 2)
+
+    @override_settings(QUIZ_FEEDBACK_BATCH_TOKEN_BUDGET=700)
+    async def test_answers_are_chunked_to_the_token_budget(self):
+        answers = [{**make_answer(number), 'context': 'word ' * 200} for number in range(4)]
+
+        batches = await self.service._chunk_feedback_answers(answers)
+
+        self.assertGreater(len(batches), 1)
+        self.assertEqual([answer for batch in batches for answer in batch], answers)
+
+    async def test_batched_mode_sends_one_call_per_chunk_and_memoizes(self):
+        answers = [make_answer(number) for number in range(3)]
+        self.responses.append({'feedback': [batch_item(index, f"batch {index}") for index in range(1, 4)]})
+
+        first = await self.service.generate_feedback_for_answers(answers, mode='batched')
+        second = await self.service.generate_feedback_for_answers(answers, mode='batched')
+
+        self.assertEqual(first, [make_feedback(f"batch {index}") for index in range(1, 4)])
+        self.assertEqual(second, first)
+        self.assertEqual(len(self.client.prompts), 1)
@@ -0,0 +1,50 @@
+from django.test import SimpleTestCase, override_settings
+
+from personal_training.services.quiz_module import QuizGenerationService
+
+from .utils import FakeRedisMixin, ScriptedLLMClient, make_mcq, requires_fakeredis
+
+
+@requires_fakeredis
+class QuizTopUpTests(FakeRedisMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.responses = []
+        self.client = ScriptedLLMClient(lambda prompt, schema: self.responses.pop(0))
+        self.use_llm(self.client)
+        self.service = QuizGenerationService()
+
+    async def test_only_missing_questions_are_requested(self):
+        self.responses += [
+            {'questions': [make_mcq('One?'), {'question_text': 'Broken?'}, make_mcq('Two?')]},
+            {'questions': [make_mcq('Three?')]},
+        ]
+
+        quiz = await self.service.generate_quiz('Closures', {'mcq': 3}, use_cache=False)
+
+        self.assertEqual([question['question_text'] for question in quiz['questions']], ['One?', 'Two?', 'Three?'])
+        top_up_prompt = self.client.prompts[1]
+        self.assertIn('1 standard multiple choice questions', top_up_prompt)
+        self.assertIn('- One?', top_up_prompt)
+        self.assertIn('- Two?', top_up_prompt)
+
+    async def test_surplus_questions_are_dropped(self):
+        self.responses.append({'questions': [make_mcq(f"Q{number}?") for number in range(4)]})
+
+        quiz = await self.service.generate_quiz('Closures', {'mcq': 2}, use_cache=False)
+
+        self.assertEqual([question['question_text'] for question in quiz['questions']], ['Q0?', 'Q1?'])
+        self.assertEqual(len(self.client.prompts), 1)
+
+    @override_settings(QUIZ_REPAIR_ATTEMPTS=2)
+    async def test_gives_up_after_the_repair_attempts(self):
+        self.responses += [
+            {'questions': [make_mcq('One?')]},
+            {'questions': []},
+            ValueError("model unavailable"),
+        ]
+
+        with self.assertRaisesMessage(ValueError, 'failed validation'):
+            await self.service.generate_quiz('Closures', {'mcq': 2}, use_cache=False)
+        self.assertEqual(len(self.client.prompts), 3)
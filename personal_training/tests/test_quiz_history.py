@@ -0,0 +1,85 @@
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.http import JsonResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from personal_training.services.quiz_bank import QuizBankService
+from personal_training.services.quiz_history import QuizHistory
+
+from .utils import FakeRedisMixin, make_course, make_module, make_user, requires_fakeredis, sign_in
+
+
+@requires_fakeredis
+@override_settings(QUIZ_HISTORY_WINDOW=3)
+class QuizHistoryTests(FakeRedisMixin, SimpleTestCase):
+
+    async def test_scores_are_trimmed_to_the_window_and_averaged(self):
+        history = QuizHistory()
+        for score in (10, 80, 90, 100):
+            average = await history.record('user-1', 5, score)
+
+        self.assertEqual(average, 90)
+        recorded = await history.get('user-1', 5)
+        self.assertEqual(recorded['performance_trend'], [80, 90, 100])
+        self.assertEqual(recorded['attempts'], 4)
+        self.assertIsNone(await history.get('user-2', 5))
+
+    async def test_recording_touches_only_the_history_keys(self):
+        await QuizHistory().record('user-1', 5, 70)
+
+        self.assertEqual(sorted(self.redis.keys()), [b'quiz:history:user-1:5', b'quiz:history:user-1:5:scores'])
+
+    async def test_old_json_histories_are_replaced(self):
+        self.redis.set('quiz:history:user-1:5', json.dumps({'average_score': 50}))
+        history = QuizHistory()
+
+        self.assertIsNone(await history.get('user-1', 5))
+        await history.record('user-1', 5, 95)
+        self.assertEqual((await history.get('user-1', 5))['performance_trend'], [95])
+
+    async def test_difficulty_steps_with_consistent_scores(self):
+        history = QuizHistory()
+        for score in (95, 92, 90):
+            await history.record('strong', 5, score)
+        for score in (40, 55, 60):
+            await history.record('weak', 5, score)
+        for score in (95, 40, 95):
+            await history.record('mixed', 5, score)
+
+        self.assertEqual(await history.adaptive_difficulty('strong', 5, 'intermediate'), 'advanced')
+        self.assertEqual(await history.adaptive_difficulty('strong', 5, 'advanced'), 'advanced')
+        self.assertEqual(await history.adaptive_difficulty('weak', 5, 'intermediate'), 'beginner')
+        self.assertEqual(await history.adaptive_difficulty('mixed', 5, 'intermediate'), 'intermediate')
+        self.assertEqual(await history.adaptive_difficulty('new', 5, 'intermediate'), 'intermediate')
+
+
+@requires_fakeredis
+class SessionUserHistoryTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.module = make_module(make_course())
+
+    def test_generate_quiz_adapts_to_the_session_users_history(self):
+        sign_in(self.client, self.user)
+
+        async def record_scores():
+            for score in (95, 92, 90):
+                await QuizHistory().record(self.user.id, self.module.id, score)
+
+        async_to_sync(record_scores)()
+        get_quiz = mock.AsyncMock(return_value={'questions': []})
+
+        with mock.patch.object(QuizBankService, 'get_quiz', get_quiz), \
+                mock.patch('personal_training.views._stored_quiz_response', mock.AsyncMock(return_value=JsonResponse({}))):
+            self.client.post(
+                reverse('personal_training:generate_quiz'),
+                json.dumps({'module_id': self.module.id, 'difficulty': 'intermediate'}),
+                content_type='application/json'
+            )
+
+        get_quiz.assert_awaited_once_with(self.module.id, 'advanced', self.user.id)
@@ -0,0 +1,52 @@
+from django.test import SimpleTestCase
+
+from personal_training.services.quiz_schema import (
+    FEEDBACK_VALIDATOR, QUESTION_VALIDATOR, QUIZ_RESPONSE_SCHEMA, QUIZ_VALIDATOR
+)
+
+from .utils import make_mcq
+
+
+class QuizSchemaTests(SimpleTestCase):
+
+    def test_mcqs_need_four_choices_with_exactly_one_correct(self):
+        question = make_mcq('Which?')
+        two_correct = {**question, 'choices': [dict(choice, is_correct=True) for choice in question['choices']]}
+
+        self.assertTrue(QUESTION_VALIDATOR.is_valid(question))
+        self.assertFalse(QUESTION_VALIDATOR.is_valid(two_correct))
+        self.assertFalse(QUESTION_VALIDATOR.is_valid({**question, 'choices': question['choices'][:3]}))
+        self.assertFalse(QUESTION_VALIDATOR.is_valid({**question, 'choices': None}))
+
+    def test_scenario_and_open_questions_need_their_context(self):
+        base = {'question_text': 'Why?', 'difficulty_level': 'beginner', 'explanation': 'Because'}
+
+        self.assertFalse(QUESTION_VALIDATOR.is_valid({**base, 'question_type': 'scenario'}))
+        self.assertTrue(QUESTION_VALIDATOR.is_valid({**base, 'question_type': 'scenario', 'scenario_context': 'A team'}))
+        self.assertFalse(QUESTION_VALIDATOR.is_valid({**base, 'question_type': 'reflection', 'model_answer': ''}))
+        self.assertTrue(QUESTION_VALIDATOR.is_valid({**base, 'question_type': 'reflection', 'model_answer': 'Points'}))
+        self.assertFalse(QUESTION_VALIDATOR.is_valid({**base, 'question_type': 'essay'}))
+
+    def test_quizzes_and_feedback_are_validated_whole(self):
+        self.assertTrue(QUIZ_VALIDATOR.is_valid({'questions': [make_mcq('One?')]}))
+        self.assertFalse(QUIZ_VALIDATOR.is_valid({'questions': []}))
+        self.assertFalse(QUIZ_VALIDATOR.is_valid({'questions': [make_mcq('One?'), {'question_text': 'Two?'}]}))
+        self.assertFalse(FEEDBACK_VALIDATOR.is_valid({'strengths': 'Only one field'}))
+
+    def test_response_schema_uses_only_the_gemini_subset(self):
+        unsupported = {'allOf', 'if', 'then', 'minContains', 'maxContains', 'const', '$schema'}
+
+        def keywords(schema):
+            if isinstance(schema, dict):
+                for key, value in schema.items():
+                    yield key
+                    if key != 'properties':
+                        yield from keywords(value)
+                    else:
+                        for property_schema in value.values():
+                            yield from keywords(property_schema)
+            elif isinstance(schema, list):
+                for item in schema:
+                    yield from keywords(item)
+
+        self.assertFalse(unsupported & set(keywords(QUIZ_RESPONSE_SCHEMA)))
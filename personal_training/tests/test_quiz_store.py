@@ -0,0 +1,77 @@
+import json
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from django.urls import reverse
+
+from personal_training.models import Question, QuizAttempt
+from personal_training.services.quiz_store import QuizStore
+
+from .utils import FakeRedisMixin, make_mcq, make_user, requires_fakeredis, sign_in
+
+
+@requires_fakeredis
+class StoredQuizEvaluationTests(FakeRedisMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        quiz_data = {'questions': [make_mcq('First?', correct='a'), make_mcq('Second?', correct='b')]}
+        self.quiz = async_to_sync(QuizStore().save_quiz)(quiz_data)
+        self.questions = list(Question.objects.filter(quiz=self.quiz).order_by('order').prefetch_related('choices'))
+
+    def _choice(self, question, text):
+        return next(choice for choice in question.choices.all() if choice.choice_text == text)
+
+    def _evaluate(self, answers):
+        return self.client.post(
+            reverse('personal_training:evaluate_quiz'),
+            json.dumps({'quiz_id': self.quiz.id, 'answers': answers, 'llm_feedback': False}),
+            content_type='application/json'
+        )
+
+    def test_same_questions_are_stored_once(self):
+        again = async_to_sync(QuizStore().save_quiz)({'questions': [make_mcq('First?', correct='a'),
+                                                                    make_mcq('Second?', correct='b')]})
+
+        self.assertEqual(again.id, self.quiz.id)
+
+    def test_numeric_string_ids_are_accepted(self):
+        first, second = self.questions
+        response = self._evaluate([
+            {'question_id': str(first.id), 'choice_id': str(self._choice(first, 'a').id)},
+            {'question_id': second.id, 'choice_id': self._choice(second, 'Wrong 1').id},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['correct_answers'], 1)
+        attempt = QuizAttempt.objects.get(id=response.json()['attempt_id'])
+        self.assertEqual(
+            sorted(attempt.answers.values_list('question_id', 'is_correct')),
+            [(first.id, True), (second.id, False)]
+        )
+
+    def test_unknown_or_malformed_ids_are_rejected_without_an_attempt(self):
+        first, second = self.questions
+        for answers in (
+            [{'question_id': 999999, 'choice_id': self._choice(first, 'a').id}],
+            [{'question_id': first.id, 'choice_id': self._choice(second, 'b').id}],
+            [{'question_id': 'first', 'answer': 'a'}],
+            [{'question_id': first.id, 'choice_id': 1.5}],
+            ['a'],
+        ):
+            response = self._evaluate(answers)
+            self.assertEqual(response.status_code, 400, answers)
+
+        self.assertFalse(QuizAttempt.objects.exists())
+
+    def test_attempts_belong_to_the_session_user(self):
+        user = make_user()
+        first, _ = self.questions
+        answer = [{'question_id': first.id, 'choice_id': self._choice(first, 'a').id}]
+
+        anonymous = self._evaluate(answer).json()['attempt_id']
+        sign_in(self.client, user)
+        signed_in = self._evaluate(answer).json()['attempt_id']
+
+        self.assertIsNone(QuizAttempt.objects.get(id=anonymous).user_id)
+        self.assertEqual(QuizAttempt.objects.get(id=signed_in).user_id, user.id)
@@ -0,0 +1,141 @@
+import asyncio
+import weakref
+from collections import Counter, OrderedDict
+from typing import Any, Callable, List, Optional
+from unittest import mock, skipUnless
+
+try:
+    import fakeredis
+except ImportError:  # Redis-backed tests are skipped without it
+    fakeredis = None
+
+from personal_training.services import llm_client, llm_gateway, redis_pool
+from personal_training.services.feedback_memo import FeedbackMemo
+from personal_training.services.prompt_builder import PromptBuilder
+
+requires_fakeredis = skipUnless(fakeredis is not None, "fakeredis[lua] is required for Redis-backed tests")
+
+
+class FakeRedisMixin:
+    """
+    Points the shared sync and asyncio Redis clients at one in-memory server per test
+
+    Also resets the process-wide LLM gateway, so it is rebuilt on the test's
+    Redis, and the in-process feedback memo and prompt digests.
+    """
+
+    def setUp(self):
+        super().setUp()
+        server = fakeredis.FakeServer()
+        self.redis = fakeredis.FakeRedis(server=server)
+
+        class FakeLoopRedis:
+            def __init__(self):
+                self.client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+                self.scripts = {}
+
+        for patcher in (
+            mock.patch.object(redis_pool, '_sync_client', self.redis),
+            mock.patch.object(redis_pool, '_LoopRedis', FakeLoopRedis),
+            mock.patch.object(redis_pool, '_loop_clients', weakref.WeakKeyDictionary()),
+            mock.patch.object(llm_gateway, '_gateway', None),
+            mock.patch.object(llm_client, '_client', None),
+            mock.patch.object(FeedbackMemo, '_local', OrderedDict()),
+            mock.patch.object(FeedbackMemo, '_pending_stats', Counter()),
+            mock.patch.object(PromptBuilder, '_local', OrderedDict()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def use_llm(self, client: 'ScriptedLLMClient') -> 'llm_gateway.LLMGateway':
+        """Make client the model behind the shared gateway"""
+        gateway = llm_gateway.LLMGateway(client=client)
+        patcher = mock.patch.object(llm_gateway, '_gateway', gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return gateway
+
+
+class ScriptedLLMClient(llm_client.LLMClient):
+    """LLM client answering every call with respond(prompt, response_schema), after an optional delay"""
+
+    def __init__(self, respond: Callable[[str, Optional[dict]], Any], delay: float = 0):
+        super().__init__('scripted')
+        self.respond = respond
+        self.delay = delay
+        self.prompts: List[str] = []
+
+    @property
+    def model(self):
+        raise RuntimeError("ScriptedLLMClient has no Gemini model")
+
+    async def generate_json(self, prompt: str, response_schema: Optional[dict] = None) -> Any:
+        self.prompts.append(prompt)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        result = self.respond(prompt, response_schema)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+
+def make_course(**fields) -> 'Course':
+    from personal_training.models import Category, Course
+
+    category, _ = Category.objects.get_or_create(slug='testing', defaults={'name': 'Testing', 'description': ''})
+    number = Course.objects.count() + 1
+    return Course.objects.create(**{
+        'category': category,
+        'title': f"Course {number}",
+        'slug': f"course-{number}",
+        'overview': '',
+        'learning_objectives': '',
+        'duration_hours': 1,
+        'difficulty_level': 'beginner',
+        **fields
+    })
+
+
+def make_module(course: 'Course', **fields) -> 'Module':
+    from personal_training.models import Module
+
+    order = course.modules.count() + 1
+    return Module.objects.create(**{
+        'course': course,
+        'title': f"Module {order}",
+        'description': f"About module {order}",
+        'order': order,
+        **fields
+    })
+
+
+def make_user(**fields) -> 'User':
+    from Oauth.models import User
+
+    number = User.objects.count() + 1
+    return User.objects.create(**{
+        'auth0_id': f"auth0|learner{number}",
+        'name': f"Learner {number}",
+        'email': f"learner{number}@example.com",
+        **fields
+    })
+
+
+def make_mcq(text: str, correct: str = 'Right', difficulty: str = 'intermediate') -> dict:
+    """A generated MCQ that passes QUESTION_VALIDATOR"""
+    return {
+        'question_text': text,
+        'question_type': 'mcq',
+        'difficulty_level': difficulty,
+        'choices': [{'choice_text': correct, 'is_correct': True}] + [
+            {'choice_text': f"Wrong {number}", 'is_correct': False} for number in range(1, 4)
+        ],
+        'explanation': f"{correct} is correct"
+    }
+
+
+def sign_in(client, user: 'User') -> None:
+    """Store user in the test client's session the way the Oauth callback does"""
+    session = client.session
+    session['user'] = {'id': str(user.id), 'email': user.email, 'name': user.name}
+    session.save()
@@ -4,5 +4,13 @@ from . import views
 app_name = 'personal_training'
 
 urlpatterns = [
-    
+    path('quiz/generate/', views.generate_quiz, name='generate_quiz'),
+    path('quiz/generate/stream/', views.generate_quiz_stream, name='generate_quiz_stream'),
+    path('quiz/validate-answer/', views.validate_answer, name='validate_answer'),
+    path('quiz/evaluate/', views.evaluate_quiz, name='evaluate_quiz'),
+    path('quiz/cache-stats/', views.quiz_cache_stats, name='quiz_cache_stats'),
+    path('llm/stats/', views.llm_stats, name='llm_stats'),
+    path('redis/stats/', views.redis_stats, name='redis_stats'),
+    path('feedback/jobs/', views.submit_feedback_job, name='submit_feedback_job'),
+    path('feedback/jobs/<str:job_id>/', views.feedback_job_status, name='feedback_job_status'),
 ]
@@ -1,8 +1,20 @@
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
+from django.core.exceptions import ValidationError
+from django.urls import reverse
 from .services.platform import QuizGenerationService
+from .services.quiz_cache import QuizCache
+from .services.quiz_bank import QuizBankService
+from .services.local_grader import LocalGrader
+from .services.quiz_store import QuizStore
+from .services.quiz_history import QuizHistory
+from .services.llm_gateway import get_llm_gateway
+from .services.redis_pool import get_pool_stats
+from .services.feedback_jobs import FeedbackJobQueueFull, FeedbackJobService
+from .models import Module, Quiz
+from Oauth.models import User
 from asgiref.sync import sync_to_async
 import json
 
@@ -13,29 +25,107 @@ async def generate_quiz(request):
     try:
         data = json.loads(request.body)
         course_content = data.get('course_content')
+        module_id = data.get('module_id')
+        difficulty = data.get('difficulty', 'intermediate')
         
-        if not course_content:
+        if not course_content and not module_id:
             return JsonResponse({
-                'error': 'Course content is required'
+                'error': 'Course content or module ID is required'
             }, status=400)
 
+        if difficulty not in QuizBankService.DIFFICULTIES:
+            return JsonResponse({
+                'error': f"difficulty must be one of: {', '.join(QuizBankService.DIFFICULTIES)}"
+            }, status=400)
+
+        user = await _session_user(request)
+        user_id = user.id if user else None
+
+        # Step the difficulty up or down from the user's recent scores on this module
+        if user_id and module_id:
+            difficulty = await QuizHistory().adaptive_difficulty(user_id, module_id, difficulty)
+
+        # Serve a pre-generated quiz from the module's bank when one is available
+        if module_id:
+            bank_service = QuizBankService()
+            quiz_data = await bank_service.get_quiz(module_id, difficulty, user_id)
+            if quiz_data:
+                return await _stored_quiz_response(quiz_data, module_id, difficulty)
+            if not course_content:
+                module = await Module.objects.aget(id=module_id)
+                course_content = bank_service.module_content(module)
+
         # Initialize quiz service through platform
         quiz_service = QuizGenerationService()
         
         # Generate quiz based on course content
         quiz_data = await quiz_service.generate_quiz(
             topic=course_content,
-            user_id=request.user.id if request.user.is_authenticated else None
+            difficulty=difficulty
         )
 
-        return JsonResponse({
-            'success': True,
-            'quiz_data': quiz_data
-        })
+        return await _stored_quiz_response(quiz_data, module_id, difficulty)
 
+    except Module.DoesNotExist:
+        return JsonResponse({'error': 'Module not found'}, status=404)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+@csrf_exempt
+@require_http_methods(["POST"])
+async def generate_quiz_stream(request):
+    """Stream quiz questions as newline-delimited JSON as soon as each one is generated"""
+    try:
+        data = json.loads(request.body)
+        course_content = data.get('course_content')
+        question_types = data.get('question_types')
+        difficulty = data.get('difficulty', 'intermediate')
+        
+        if not course_content:
+            return JsonResponse({
+                'error': 'Course content is required'
+            }, status=400)
+
+        quiz_service = QuizGenerationService()
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+    async def question_events():
+        questions = []
+        try:
+            async for question in quiz_service.generate_quiz_stream(
+                topic=course_content,
+                question_types=question_types,
+                difficulty=difficulty
+            ):
+                # Answer keys stay on the server; ids arrive with the done event
+                yield json.dumps({
+                    'type': 'question',
+                    'index': len(questions),
+                    'question': QuizStore.client_question(question)
+                }) + '\n'
+                questions.append(question)
+
+            done = {'type': 'done', 'total_questions': len(questions)}
+            if questions:
+                quiz_store = QuizStore()
+                quiz = await quiz_store.save_quiz(
+                    {'questions': questions},
+                    difficulty=difficulty,
+                    prompt_version=QuizGenerationService.PROMPT_VERSION
+                )
+                done['quiz_id'] = quiz.id
+                done['quiz_data'] = await quiz_store.client_quiz_for(quiz)
+            yield json.dumps(done) + '\n'
+        except Exception as e:
+            yield json.dumps({'type': 'error', 'error': f"Quiz generation failed: {str(e)}"}) + '\n'
+
+    response = StreamingHttpResponse(question_events(), content_type='application/x-ndjson')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop reverse proxies from buffering the stream
+    return response
+
 @csrf_exempt
 @require_http_methods(["POST"]) 
 async def validate_answer(request):
@@ -73,52 +163,286 @@ async def validate_answer(request):
 @csrf_exempt
 @require_http_methods(["POST"])
 async def evaluate_quiz(request):
-    """Evaluate entire quiz submission"""
+    """
+    Evaluate entire quiz submission
+
+    Submissions reference a stored quiz by quiz_id and carry only answers as
+    {"question_id", "choice_id"} for MCQs or {"question_id", "answer"} for
+    open questions; the graded attempt is stored. Sending the full quiz_data
+    with a list of answers is still accepted for quizzes that were not stored.
+    """
     try:
         data = json.loads(request.body)
+        quiz_id = data.get('quiz_id')
         quiz_answers = data.get('answers')
         quiz_data = data.get('quiz_data')
+        feedback_mode = data.get('feedback_mode')
+        llm_feedback = data.get('llm_feedback', True)
         
-        if not quiz_answers or not quiz_data:
+        if not quiz_answers or not (quiz_id or quiz_data):
             return JsonResponse({
-                'error': 'Quiz answers and data are required'
+                'error': 'Quiz answers and a quiz ID are required'
             }, status=400)
 
         quiz_service = QuizGenerationService()
+        quiz_store = QuizStore()
+        grader = LocalGrader()
+
+        if quiz_id:
+            stored_questions = await quiz_store.load_questions(quiz_id)
+            if not stored_questions:
+                return JsonResponse({'error': 'Quiz not found'}, status=404)
+            total_questions = len(stored_questions)
+            submissions = _stored_submissions(stored_questions, quiz_answers, quiz_store)
+        else:
+            total_questions = len(quiz_data['questions'])
+            submissions = [
+                (question, answer, None) for answer, question in zip(quiz_answers, quiz_data['questions'])
+            ]
         
-        # Calculate score and generate feedback
+        # Grade MCQs locally; only incorrect or open-ended answers need model feedback
         score = 0
-        total_questions = len(quiz_data['questions'])
-        feedback_list = []
-
-        for answer, question in zip(quiz_answers, quiz_data['questions']):
-            feedback = await quiz_service.generate_feedback(
-                user_answer=answer,
-                correct_answer=question.get('model_answer') or question.get('choices')[0]['choice_text'],
-                question_type=question['question_type'],
-                context=question.get('scenario_context')
-            )
-            feedback_list.append(feedback)
-            
-            # For MCQ, check if answer matches correct choice
-            if question['question_type'] == 'mcq':
-                correct_choice = next(
-                    choice['choice_text'] for choice in question['choices'] 
-                    if choice['is_correct']
-                )
-                if answer == correct_choice:
+        feedback_list = [None] * len(submissions)
+        correctness = [None] * len(submissions)
+        llm_requests = []
+
+        for index, (question, answer, _) in enumerate(submissions):
+            if grader.can_grade(question):
+                is_correct = grader.is_correct(question, answer)
+                correctness[index] = is_correct
+                if is_correct:
                     score += 1
+                if is_correct or not llm_feedback:
+                    feedback_list[index] = grader.build_feedback(question, answer)
+                    continue
+            elif not llm_feedback:
+                feedback_list[index] = grader.build_feedback(question, answer)
+                continue
+
+            llm_requests.append((index, {
+                'user_answer': answer,
+                'correct_answer': grader.correct_answer(question),
+                'question_type': question['question_type'],
+                'context': question.get('scenario_context'),
+                'question_text': question.get('question_text')
+            }))
+
+        # Generate the remaining feedback concurrently
+        if llm_requests:
+            llm_feedback_list = await quiz_service.generate_feedback_for_answers(
+                [request_kwargs for _, request_kwargs in llm_requests],
+                mode=feedback_mode
+            )
+            for (index, _), feedback in zip(llm_requests, llm_feedback_list):
+                feedback_list[index] = feedback
 
         # Calculate percentage score
         percentage_score = (score / total_questions) * 100 if total_questions > 0 else 0
 
-        return JsonResponse({
+        response = {
             'success': True,
             'score': percentage_score,
             'total_questions': total_questions,
             'correct_answers': score,
             'feedback': feedback_list
+        }
+
+        if quiz_id:
+            user = await _session_user(request)
+            attempt = await quiz_store.record_attempt(
+                quiz_id,
+                user.id if user else None,
+                [
+                    {**row, 'is_correct': is_correct, 'feedback': feedback}
+                    for (_, _, row), is_correct, feedback in zip(submissions, correctness, feedback_list)
+                ],
+                percentage_score,
+                score,
+                total_questions
+            )
+            response['attempt_id'] = attempt.id
+
+            module_id = await Quiz.objects.filter(id=quiz_id).values_list('module_id', flat=True).afirst()
+            if user and module_id:
+                await QuizHistory().record(user.id, module_id, percentage_score)
+            response['question_ids'] = [row['question_id'] for _, _, row in submissions]
+
+        return JsonResponse(response)
+
+    except ValidationError as e:
+        return JsonResponse({'error': '; '.join(e.messages)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+def _stored_submissions(questions, answers, quiz_store):
+    """
+    Match submitted answers to stored questions
+
+    Ids may be sent as integers or numeric strings.
+
+    Returns:
+        (question dict, answer text, attempt answer row) for each answered
+        question of the quiz, in quiz order
+
+    Raises:
+        ValidationError: An answer is malformed or names a question or choice
+            that is not part of the quiz
+    """
+    if not isinstance(answers, list):
+        raise ValidationError("answers must be a list")
+
+    questions_by_id = {question.id: question for question in questions}
+    answers_by_question = {}
+    for answer in answers:
+        if not isinstance(answer, dict):
+            raise ValidationError("Each answer must be an object with a question_id")
+        question_id = _submitted_id(answer.get('question_id'), 'question_id')
+        if question_id not in questions_by_id:
+            raise ValidationError(f"Unknown question_id: {question_id}")
+        answers_by_question[question_id] = answer
+
+    submissions = []
+    for question in questions:
+        answer = answers_by_question.get(question.id)
+        if answer is None:
+            continue
+
+        choice = None
+        if answer.get('choice_id') is not None:
+            choice_id = _submitted_id(answer['choice_id'], 'choice_id')
+            choice = next((choice for choice in question.choices.all() if choice.id == choice_id), None)
+            if choice is None:
+                raise ValidationError(f"Unknown choice_id {choice_id} for question {question.id}")
+        answer_text = choice.choice_text if choice else str(answer.get('answer') or '')
+        submissions.append((
+            quiz_store.question_data(question),
+            answer_text,
+            {'question_id': question.id, 'choice_id': choice.id if choice else None, 'answer_text': answer_text}
+        ))
+    return submissions
+
+def _submitted_id(value, field):
+    """A submitted id as an int, accepting numeric strings"""
+    try:
+        return int(str(value))
+    except ValueError:
+        raise ValidationError(f"{field} must be an integer, got {value!r}")
+
+async def _session_user(request):
+    """The Oauth user signed in to this session, or None"""
+    session_user = await request.session.aget('user')
+    if not session_user:
+        return None
+    return await User.objects.filter(id=session_user['id']).afirst()
+
+async def _stored_quiz_response(quiz_data, module_id, difficulty):
+    """Store a generated quiz and respond with its id and the client view without answer keys"""
+    quiz_store = QuizStore()
+    quiz = await quiz_store.save_quiz(
+        quiz_data,
+        module_id=module_id,
+        difficulty=difficulty,
+        prompt_version=QuizGenerationService.PROMPT_VERSION
+    )
+    return JsonResponse({
+        'success': True,
+        'quiz_id': quiz.id,
+        'quiz_data': await quiz_store.client_quiz_for(quiz)
+    })
+
+@require_http_methods(["GET"])
+def quiz_cache_stats(request):
+    """Report quiz cache hit/miss counters (staff only)"""
+    try:
+        if not request.user.is_staff:
+            return JsonResponse({'error': 'Staff access required'}, status=403)
+
+        return JsonResponse({
+            'success': True,
+            'stats': QuizCache().get_stats()
+        })
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+async def llm_stats(request):
+    """Report LLM gateway queue, circuit breaker and rate limiter metrics (staff only)"""
+    try:
+        user = await request.auser()
+        if not user.is_staff:
+            return JsonResponse({'error': 'Staff access required'}, status=403)
+
+        return JsonResponse({
+            'success': True,
+            'stats': await get_llm_gateway().aget_stats()
+        })
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+async def redis_stats(request):
+    """Report Redis connection pool usage and pipeline counters (staff only)"""
+    try:
+        user = await request.auser()
+        if not user.is_staff:
+            return JsonResponse({'error': 'Staff access required'}, status=403)
+
+        return JsonResponse({
+            'success': True,
+            'stats': get_pool_stats()
         })
 
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def submit_feedback_job(request):
+    """Queue a learning feedback generation and return its job id immediately"""
+    try:
+        user = await _session_user(request)
+        if user is None:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+
+        data = json.loads(request.body)
+        kind = data.get('kind')
+        if kind not in FeedbackJobService.JOB_KINDS:
+            return JsonResponse({
+                'error': f"kind must be one of: {', '.join(FeedbackJobService.JOB_KINDS)}"
+            }, status=400)
+
+        job_id = await FeedbackJobService().submit(kind, str(user.id), data.get('params', {}))
+
+        return JsonResponse({
+            'success': True,
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': reverse('personal_training:feedback_job_status', args=[job_id])
+        }, status=202)
+
+    except FeedbackJobQueueFull as e:
+        return JsonResponse({'error': str(e)}, status=503)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+@require_http_methods(["GET"])
+async def feedback_job_status(request, job_id):
+    """Report a feedback job's status, including its result once finished"""
+    try:
+        user = await _session_user(request)
+        job = await FeedbackJobService().get(job_id)
+        if job is None or user is None or job['user_id'] != str(user.id):
+            return JsonResponse({'error': 'Job not found'}, status=404)
+
+        return JsonResponse({
+            'success': True,
+            'job': job
+        })
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)